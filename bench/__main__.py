@@ -0,0 +1,85 @@
+"""Run the offline benchmarks: python -m bench --help"""
+
+import shutil
+import sys
+from pathlib import Path
+
+import click
+
+from bench.fixtures import offline_environment
+from bench.suite import CASES, SIZES, BenchRun, History, format_report, get_commit, run_case
+from yt2navidrome.utils.logging import disable_all_logging
+
+DEFAULT_HISTORY_PATH = Path(__file__).parent / "results" / "history.jsonl"
+
+
+@click.command()
+@click.option(
+    "--case", "-c", "cases", type=click.Choice(list(CASES)), multiple=True, help="Cases to run (default: all)"
+)
+@click.option(
+    "--size",
+    "-s",
+    "sizes",
+    type=click.IntRange(min=1),
+    multiple=True,
+    default=SIZES,
+    show_default=True,
+    help="Number of playlist entries/videos/files (sizes above the limit of a case are skipped)",
+)
+@click.option("--repeat", "-r", type=click.IntRange(min=1), default=3, show_default=True, help="Runs of each case")
+@click.option(
+    "--history",
+    "history_path",
+    type=click.Path(dir_okay=False, path_type=Path),
+    default=DEFAULT_HISTORY_PATH,
+    show_default=True,
+    help="File where the results of each run are appended",
+)
+@click.option("--no-history", is_flag=True, default=False, help="Do not record the results")
+@click.option(
+    "--max-regression",
+    type=click.FloatRange(min=0),
+    default=None,
+    help="Fail if a case is slower than in the previous run by more than this fraction (e.g. 0.2)",
+)
+def main(
+    cases: tuple[str, ...],
+    sizes: tuple[int, ...],
+    repeat: int,
+    history_path: Path,
+    no_history: bool,
+    max_regression: float | None,
+) -> None:
+    """Benchmark the download pipeline against a fake YouTube, without network"""
+    disable_all_logging()
+
+    history = History(history_path)
+    previous = history.get_previous()
+    run = BenchRun(commit=get_commit())
+
+    with offline_environment():
+        for name in cases or CASES:
+            case = CASES[name]
+            if case.requires_ffmpeg and not shutil.which("ffmpeg"):
+                click.echo(f"{case.name}: skipped, FFmpeg is not installed", err=True)
+                continue
+            for size in sorted(size for size in sizes if size <= case.max_size):
+                result = run_case(case, size, repeat)
+                result.previous = previous.get((result.case, result.size))
+                run.results.append(result)
+                click.echo(f"{result.case} [{result.size}]: {result.seconds:.4f}s", err=True)
+
+    click.echo(format_report(run))
+
+    if not no_history:
+        history.append(run)
+
+    regressions = [r for r in run.results if max_regression is not None and (r.change or 0) > max_regression]
+    if regressions:
+        click.echo(f"Regressions above {max_regression:.0%}: {', '.join(f'{r.case} [{r.size}]' for r in regressions)}")
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
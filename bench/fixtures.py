@@ -0,0 +1,219 @@
+"""Offline stand-ins for YouTube: a fake yt-dlp extractor and a local HTTP server serving generated media"""
+
+import re
+import shutil
+import struct
+import threading
+from collections.abc import Iterator
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from typing import Any, ClassVar
+
+from yt_dlp.extractor.common import InfoExtractor
+
+from yt2navidrome.downloader.session import YoutubeDLSession
+from yt2navidrome.template.models import Argument, MetadataParser, PostProcessor, Template
+from yt2navidrome.utils.ffmpeg import FFmpegInstaller
+from yt2navidrome.utils.ratelimit import HostRateLimiter, TokenBucket
+
+BENCH_HOST = "bench.invalid"  # Reserved TLD: URLs are only handled by the fake extractor below
+PLAYLIST_URL = f"https://{BENCH_HOST}/playlist?list=bench-{{size}}"
+VIDEO_URL = f"https://{BENCH_HOST}/watch?v=bench{{idx:07d}}"
+
+
+def _atom(kind: bytes, payload: bytes) -> bytes:
+    return struct.pack(">I", 8 + len(payload)) + kind + payload
+
+
+def _full_atom(kind: bytes, payload: bytes, flags: int = 0) -> bytes:
+    return _atom(kind, struct.pack(">I", flags) + payload)
+
+
+def make_m4a(samples: int = 10, sample_size: int = 1000) -> bytes:
+    """
+    Generate a small but valid AAC audio file (silent, moov before mdat as served by YouTube).
+
+    Args:
+        samples: Number of audio samples (of 1024 frames at 44.1kHz)
+        sample_size: Size of each sample in bytes
+
+    Returns:
+        The content of the file
+    """
+    matrix = struct.pack(">9I", 0x10000, 0, 0, 0, 0x10000, 0, 0, 0, 0x40000000)
+    duration = samples * 23
+
+    def moov(mdat_offset: int) -> bytes:
+        mvhd = _full_atom(
+            b"mvhd",
+            struct.pack(">IIII", 0, 0, 1000, duration)
+            + b"\x00\x01\x00\x00\x01\x00"
+            + b"\x00" * 10
+            + matrix
+            # Pre-defined fields then next track ID
+            + b"\x00" * 24
+            + struct.pack(">I", 2),
+        )
+        tkhd = _full_atom(
+            b"tkhd",
+            struct.pack(">IIIII", 0, 0, 1, 0, duration)
+            + b"\x00" * 8
+            + struct.pack(">hhhh", 0, 0, 0x100, 0)
+            + matrix
+            # Width and height (none for audio)
+            + struct.pack(">II", 0, 0),
+            flags=7,
+        )
+        mdhd = _full_atom(b"mdhd", struct.pack(">IIII", 0, 0, 44100, samples * 1024) + struct.pack(">HH", 0x55C4, 0))
+        hdlr = _full_atom(b"hdlr", struct.pack(">I", 0) + b"soun" + b"\x00" * 12 + b"SoundHandler\x00")
+        esds = _full_atom(b"esds", bytes.fromhex("03190000000411401500000000000000000000000502121006010102"))
+        mp4a = _atom(
+            b"mp4a",
+            b"\x00" * 6 + struct.pack(">H", 1) + b"\x00" * 8 + struct.pack(">HHHHI", 2, 16, 0, 0, 44100 << 16) + esds,
+        )
+        stbl = _atom(
+            b"stbl",
+            _full_atom(b"stsd", struct.pack(">I", 1) + mp4a)
+            + _full_atom(b"stts", struct.pack(">III", 1, samples, 1024))
+            + _full_atom(b"stsc", struct.pack(">IIII", 1, 1, samples, 1))
+            + _full_atom(b"stsz", struct.pack(">II", sample_size, samples))
+            + _full_atom(b"stco", struct.pack(">II", 1, mdat_offset)),
+        )
+        dinf = _atom(b"dinf", _full_atom(b"dref", struct.pack(">I", 1) + _full_atom(b"url ", b"", flags=1)))
+        minf = _atom(b"minf", _full_atom(b"smhd", b"\x00" * 4) + dinf + stbl)
+        trak = _atom(b"trak", tkhd + _atom(b"mdia", mdhd + hdlr + minf))
+        return _atom(b"moov", mvhd + trak)
+
+    ftyp = _atom(b"ftyp", b"M4A \x00\x00\x02\x00M4A isomiso2")
+    mdat_offset = len(ftyp) + len(moov(0)) + 8
+    return ftyp + moov(mdat_offset) + _atom(b"mdat", b"\xab" * (samples * sample_size))
+
+
+def video_title(idx: int) -> str:
+    """Title of a fake video, shaped like the titles the templates parse"""
+    return f"artist {idx % 97} x guest {idx % 7} feat. someone - Song {idx} (Official Audio)"
+
+
+def video_uploader(idx: int) -> str:
+    return f"Channel {idx % 13}"
+
+
+def make_template(size: int) -> Template:
+    """Return a template of a fake playlist, with the kind of parsers found in real templates"""
+    parsers = [
+        MetadataParser(
+            source="title",
+            pattern=r"(?P<artist>.+?) - (?P<title>[^(]+)(?:\((?P<version>.+)\))?",
+            post_processors=[
+                PostProcessor("strip_feat", "artist", "artist"),
+                PostProcessor("split", "artist", "artist", [Argument("separators", [" x "]), Argument("glue", "; ")]),
+                PostProcessor("title_case", "artist", "artist"),
+                PostProcessor("regex_sub", "title", "title", [Argument("pattern", r"\s+$"), Argument("repl", "")]),
+                PostProcessor("default", "version", "version", [Argument("value", "original")]),
+            ],
+        ),
+        MetadataParser(source="uploader", pattern=r"(?P<album>.+)", post_processors=[]),
+    ]
+    return Template(name=f"bench-{size}", url=PLAYLIST_URL.format(size=size), playlist=True, parsers=parsers)
+
+
+class MediaServer:
+    """Local HTTP server answering every request with the same generated audio file"""
+
+    def __init__(self, content: bytes) -> None:
+        self.content = content
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self) -> None:
+                self.send_response(200)
+                self.send_header("Content-Type", "audio/mp4")
+                self.send_header("Content-Length", str(len(server.content)))
+                self.end_headers()
+                self.wfile.write(server.content)
+
+            def log_message(self, format: str, *args: Any) -> None:  # noqa: A002
+                pass
+
+        self._httpd = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+        self._thread = threading.Thread(target=self._httpd.serve_forever, name="bench-media-server", daemon=True)
+
+    @property
+    def url(self) -> str:
+        host, port = self._httpd.server_address[:2]
+        return f"http://{host!s}:{port}"
+
+    def start(self) -> None:
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._httpd.shutdown()
+        self._httpd.server_close()
+
+
+class GenericIE(InfoExtractor):
+    """
+    Fake extractor of the playlists and videos above.
+    Named after yt-dlp's generic extractor since our profiles force it.
+    """
+
+    _VALID_URL = r"https://bench\.invalid/(?:watch\?v=bench(?P<idx>\d+)|playlist\?list=bench-(?P<size>\d+))"
+
+    media_url: ClassVar[str] = ""
+    complete_entries: ClassVar[bool] = True  # Whether flat playlist entries carry the title and uploader
+
+    def _real_extract(self, url: str) -> dict[str, Any]:
+        match = re.match(self._VALID_URL, url)
+        assert match, url  # noqa: S101 - Only called for URLs matching _VALID_URL
+
+        if match.group("size"):
+            size = int(match.group("size"))
+            return self.playlist_result(
+                [self.flat_entry(idx) for idx in range(size)], playlist_id=f"bench-{size}", playlist_title=url
+            )
+
+        idx = int(match.group("idx"))
+        return {
+            "id": f"bench{idx:07d}",
+            "title": video_title(idx),
+            "uploader": video_uploader(idx),
+            "formats": [{"url": f"{self.media_url}/{idx}.m4a", "ext": "m4a", "acodec": "mp4a.40.2", "vcodec": "none"}],
+        }
+
+    def flat_entry(self, idx: int) -> dict[str, Any]:
+        entry = {"_type": "url", "url": VIDEO_URL.format(idx=idx), "id": f"bench{idx:07d}"}
+        if self.complete_entries:
+            entry.update({"title": video_title(idx), "uploader": video_uploader(idx)})
+        return entry
+
+
+@contextmanager
+def offline_environment() -> Iterator[MediaServer]:
+    """
+    Route yt-dlp to the fake extractor and the local media server, without rate limits.
+
+    Yields:
+        The running media server
+    """
+    server = MediaServer(make_m4a())
+    server.start()
+
+    GenericIE.media_url = server.url
+    extractors = YoutubeDLSession._extractors
+    YoutubeDLSession._extractors = [GenericIE]
+    YoutubeDLSession.close_all()
+
+    # Benchmarks measure our code: no throttling, and FFmpeg is looked up in PATH instead of being installed
+    HostRateLimiter._buckets[BENCH_HOST] = TokenBucket(rate=1e9, capacity=1e9)
+    ffmpeg_paths = FFmpegInstaller._paths
+    if not ffmpeg_paths:
+        FFmpegInstaller._paths = (shutil.which("ffmpeg") or "", shutil.which("ffprobe") or "")
+
+    try:
+        yield server
+    finally:
+        YoutubeDLSession.close_all()
+        YoutubeDLSession._extractors = extractors
+        HostRateLimiter._buckets.pop(BENCH_HOST, None)
+        FFmpegInstaller._paths = ffmpeg_paths
+        server.stop()
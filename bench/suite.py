@@ -0,0 +1,212 @@
+"""Benchmark cases of the download pipeline, and the history of their results"""
+
+import json
+import platform
+import subprocess
+import tempfile
+import time
+from collections.abc import Callable
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from bench.fixtures import VIDEO_URL, GenericIE, make_m4a, make_template, video_title, video_uploader
+from yt2navidrome.commands.download import DownloadOptions, process_template
+from yt2navidrome.downloader.metadata import MetadataUtils
+from yt2navidrome.downloader.models import Video
+from yt2navidrome.downloader.planner import DownloadPlanner
+from yt2navidrome.template import TemplateCompiler
+from yt2navidrome.utils.ffmpeg import FFmpegHelper
+
+SIZES = [10, 100, 1000, 10000]
+
+
+@dataclass
+class BenchCase:
+    """A benchmark, run once per size (number of playlist entries, videos or files)"""
+
+    name: str
+    func: Callable[[int, Path], float]  # Runs the case in a work directory and returns the measured seconds
+    max_size: int  # Larger sizes are skipped to keep the suite fast
+    requires_ffmpeg: bool = False  # Skipped when FFmpeg is not in PATH
+
+
+@dataclass
+class BenchResult:
+    case: str
+    size: int
+    seconds: float  # Best of all repeats
+    previous: float | None = None  # Result of the previous run in the history (if any)
+
+    @property
+    def per_item_ms(self) -> float:
+        return self.seconds / self.size * 1000
+
+    @property
+    def change(self) -> float | None:
+        """Relative change since the previous run (e.g. 0.1 when 10% slower)"""
+        return self.seconds / self.previous - 1 if self.previous else None
+
+
+@dataclass
+class BenchRun:
+    timestamp: float = field(default_factory=time.time)
+    commit: str | None = None
+    python: str = field(default_factory=platform.python_version)
+    machine: str = field(default_factory=platform.machine)
+    results: list[BenchResult] = field(default_factory=list)
+
+
+def make_videos(size: int) -> list[Video]:
+    return [
+        Video(url=VIDEO_URL.format(idx=idx), title=video_title(idx), uploader=video_uploader(idx))
+        for idx in range(size)
+    ]
+
+
+def bench_plan_playlist(size: int, workdir: Path) -> float:
+    # Playlist extraction and resolution of its entries, as run before the downloads
+    start = time.perf_counter()
+    plan = DownloadPlanner.plan([make_template(size)], workdir)
+    videos = list(DownloadPlanner.stream_videos(plan, workdir))
+    elapsed = time.perf_counter() - start
+
+    assert len(videos) == size  # noqa: S101
+    return elapsed
+
+
+def bench_plan_playlist_incomplete(size: int, workdir: Path) -> float:
+    # Flat entries without title/uploader: each video has to be extracted
+    GenericIE.complete_entries = False
+    try:
+        return bench_plan_playlist(size, workdir)
+    finally:
+        GenericIE.complete_entries = True
+
+
+def bench_run_parser(size: int, workdir: Path) -> float:
+    template = TemplateCompiler.get(make_template(size))
+    videos = make_videos(size)
+
+    start = time.perf_counter()
+    for video in videos:
+        for parser in template.parsers:
+            MetadataUtils.run_parser(video, parser)
+    return time.perf_counter() - start
+
+
+def bench_run_parser_batch(size: int, workdir: Path) -> float:
+    template = TemplateCompiler.get(make_template(size))
+    videos = make_videos(size)
+
+    start = time.perf_counter()
+    for parser in template.parsers:
+        MetadataUtils.run_parser_batch(videos, parser)
+    return time.perf_counter() - start
+
+
+def bench_add_metadata(size: int, workdir: Path) -> float:
+    content = make_m4a()
+    paths = [workdir / f"{idx}.m4a" for idx in range(size)]
+    for path in paths:
+        path.write_bytes(content)
+    entries = {"title": "Song", "artist": "Artist; Guest", "album": "Album", "album_artist": "Artist; Guest"}
+
+    start = time.perf_counter()
+    for path in paths:
+        FFmpegHelper.add_metadata(path, entries)
+    return time.perf_counter() - start
+
+
+def bench_process_template(size: int, workdir: Path) -> float:
+    # Whole pipeline: playlist extraction, metadata parsing, download from the local server, tagging and checks
+    start = time.perf_counter()
+    process_template(make_template(size), workdir, DownloadOptions(jobs=4))
+    elapsed = time.perf_counter() - start
+
+    assert len(list(workdir.rglob("*.m4a"))) == size  # noqa: S101
+    return elapsed
+
+
+CASES = {
+    case.name: case
+    for case in [
+        BenchCase("plan_playlist", bench_plan_playlist, max_size=10000),
+        BenchCase("plan_playlist_incomplete", bench_plan_playlist_incomplete, max_size=1000),
+        BenchCase("run_parser", bench_run_parser, max_size=10000),
+        BenchCase("run_parser_batch", bench_run_parser_batch, max_size=10000),
+        BenchCase("add_metadata", bench_add_metadata, max_size=1000, requires_ffmpeg=True),
+        BenchCase("process_template", bench_process_template, max_size=100, requires_ffmpeg=True),
+    ]
+}
+
+
+def run_case(case: BenchCase, size: int, repeat: int = 3) -> BenchResult:
+    """
+    Run a case several times, each time in a new work directory.
+
+    Args:
+        case: The case to run
+        size: Number of entries/videos/files handled by the case
+        repeat: Number of runs (the best one is kept)
+
+    Returns:
+        The result of the case
+    """
+    timings = []
+    for _ in range(repeat):
+        with tempfile.TemporaryDirectory(prefix=f"bench-{case.name}-") as workdir:
+            timings.append(case.func(size, Path(workdir)))
+    return BenchResult(case=case.name, size=size, seconds=min(timings))
+
+
+def get_commit() -> str | None:
+    """Return the current git commit (if any), to relate results to changes"""
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"],  # noqa: S607
+            capture_output=True,
+            text=True,
+            check=True,
+            cwd=Path(__file__).parent,
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+class History:
+    """Results of previous runs, stored as one JSON line per run"""
+
+    def __init__(self, path: Path) -> None:
+        self.path = path
+
+    def load(self) -> list[dict[str, Any]]:
+        if not self.path.is_file():
+            return []
+        with open(self.path, encoding="utf-8") as f:
+            return [json.loads(line) for line in f if line.strip()]
+
+    def get_previous(self) -> dict[tuple[str, int], float]:
+        """Return the latest result of each case and size"""
+        previous: dict[tuple[str, int], float] = {}
+        for run in self.load():
+            for result in run["results"]:
+                previous[(result["case"], result["size"])] = result["seconds"]
+        return previous
+
+    def append(self, run: BenchRun) -> None:
+        data = asdict(run)
+        for result in data["results"]:
+            result.pop("previous")
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        with open(self.path, "a", encoding="utf-8") as f:
+            f.write(json.dumps(data) + "\n")
+
+
+def format_report(run: BenchRun) -> str:
+    lines = [f"{'case':<34}{'size':>7}{'seconds':>11}{'ms/item':>10}{'change':>9}"]
+    for result in run.results:
+        change = f"{result.change:+.1%}" if result.change is not None else "-"
+        lines.append(f"{result.case:<34}{result.size:>7}{result.seconds:>11.4f}{result.per_item_ms:>10.3f}{change:>9}")
+    return "\n".join(lines)
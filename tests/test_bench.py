@@ -0,0 +1,62 @@
+import json
+import logging
+import shutil
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from bench.__main__ import main
+from bench.fixtures import offline_environment
+from bench.suite import CASES, BenchCase, run_case
+from yt2navidrome.utils.ffmpeg import FFmpegInstaller
+
+SIZE = 10
+
+
+@pytest.fixture(scope="module")
+def offline() -> Iterator[None]:
+    with offline_environment():
+        yield
+
+
+@pytest.mark.usefixtures("offline")
+@pytest.mark.parametrize("case", CASES.values(), ids=list(CASES))
+def test_case_runs_offline(case: BenchCase) -> None:
+    if case.requires_ffmpeg and shutil.which("ffmpeg") is None:
+        pytest.skip("FFmpeg is not installed")
+    result = run_case(case, SIZE, repeat=1)
+
+    assert result.case == case.name
+    assert result.seconds > 0
+
+
+@pytest.fixture
+def restore_logging() -> Iterator[None]:
+    # The bench command disables all logs, which must not leak into other tests (e.g. timing comparisons)
+    yield
+    logging.disable(logging.NOTSET)
+
+
+@pytest.mark.usefixtures("restore_logging")
+def test_history_and_regressions(tmp_path: Path) -> None:
+    history_path = tmp_path / "history.jsonl"
+    args = ["-c", "run_parser_batch", "-s", str(SIZE), "-r", "1", "--history", str(history_path)]
+
+    main.main(args, standalone_mode=False)
+    [run] = [json.loads(line) for line in history_path.read_text().splitlines()]
+    assert [(r["case"], r["size"]) for r in run["results"]] == [("run_parser_batch", SIZE)]
+
+    # Pretend the previous run was much faster
+    run["results"][0]["seconds"] = 1e-9
+    history_path.write_text(json.dumps(run) + "\n")
+    with pytest.raises(SystemExit) as exc_info:
+        main.main([*args, "--max-regression", "0.5"], standalone_mode=False)
+    assert exc_info.value.code == 1
+
+
+def test_offline_environment_restores_ffmpeg_paths(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(FFmpegInstaller, "_paths", None)
+    with offline_environment():
+        assert FFmpegInstaller._paths is not None
+    assert FFmpegInstaller._paths is None
@@ -0,0 +1,38 @@
+import pytest
+
+from yt2navidrome.utils.duration import InvalidDurationError, format_duration, parse_duration
+
+
+@pytest.mark.parametrize(
+    ("value", "seconds"),
+    [
+        (90, 90),
+        (1.5, 1.5),
+        ("90", 90),
+        ("45s", 45),
+        ("30m", 1800),
+        ("6h", 21600),
+        ("1d12h", 129600),
+        ("1.5h", 5400),
+        ("2w", 1209600),
+        ("6h30", 21630),  # Units default to seconds
+        (" 6H ", 21600),
+        ("0", 0),
+    ],
+)
+def test_parse_duration(value: str | float, seconds: float) -> None:
+    assert parse_duration(value) == seconds
+
+
+@pytest.mark.parametrize("value", ["", "h", "6x", "-1", "1 h", "6h 30m", -1, True])
+def test_parse_invalid_duration(value: str | float) -> None:
+    with pytest.raises(InvalidDurationError) as exc_info:
+        parse_duration(value)
+    assert repr(value) in str(exc_info.value)
+
+
+@pytest.mark.parametrize(
+    ("seconds", "text"), [(0, "0s"), (45, "45s"), (720, "12m"), (23400, "6h30m"), (93784, "1d2h"), (59.6, "1m")]
+)
+def test_format_duration(seconds: float, text: str) -> None:
+    assert format_duration(seconds) == text
@@ -0,0 +1,99 @@
+import json
+from pathlib import Path
+
+import pytest
+from click.testing import CliRunner
+
+from bench.fixtures import make_m4a
+from yt2navidrome.commands.edit import InvalidManifestError, collect_files, edit, read_manifest
+from yt2navidrome.config import STATE_DIR_NAME
+from yt2navidrome.utils.mp4 import MP4TagReader, MP4TagWriter
+
+
+def write_file(path: Path, content: bytes = b"") -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(content)
+    return path
+
+
+def test_collect_files(tmp_path: Path) -> None:
+    song = write_file(tmp_path / "library" / "artist" / "song.m4a")
+    other = write_file(tmp_path / "library" / "other" / "other.MP3")
+    write_file(tmp_path / "library" / "artist" / "cover.jpg")
+    write_file(tmp_path / "library" / STATE_DIR_NAME / "state.m4a")
+    single = write_file(tmp_path / "single.opus")
+
+    # Directories are walked (video files only, the state directory is skipped), missing paths are skipped
+    files = collect_files((str(tmp_path / "library"), str(single), str(tmp_path / "missing.m4a")))
+    assert sorted(files) == sorted([song, other, single])
+
+    # Glob patterns, recursive or not
+    assert collect_files((str(tmp_path / "**" / "*.m4a"),)) == [song]
+    assert collect_files((str(tmp_path / "*.opus"),)) == [single]
+    assert collect_files((str(tmp_path / "*.flac"),)) == []
+
+
+def test_read_csv_manifest(tmp_path: Path) -> None:
+    manifest = tmp_path / "manifests" / "tags.csv"
+    manifest.parent.mkdir()
+    absolute = tmp_path / "absolute.m4a"
+    manifest.write_text(
+        "\n".join([
+            "path,artist,album",
+            "songs/one.m4a,Artist,Album",
+            f"{absolute},,Other",
+            ",Ignored,Ignored",
+            "songs/one.m4a,,Album 2",
+        ]),
+        encoding="utf-8",
+    )
+
+    # Relative paths are relative to the manifest, empty cells and rows without path are ignored
+    assert read_manifest(manifest) == {
+        manifest.parent / "songs" / "one.m4a": {"artist": "Artist", "album": "Album 2"},
+        absolute: {"album": "Other"},
+    }
+
+
+def test_read_json_manifest(tmp_path: Path) -> None:
+    manifest = tmp_path / "tags.json"
+    manifest.write_text(json.dumps({"songs/one.m4a": {"artist": "Artist", "track": 3}}), encoding="utf-8")
+
+    assert read_manifest(manifest) == {tmp_path / "songs" / "one.m4a": {"artist": "Artist", "track": "3"}}
+
+
+@pytest.mark.parametrize(
+    ("name", "content"),
+    [
+        ("tags.json", "{"),
+        ("tags.json", '["songs/one.m4a"]'),
+        ("tags.json", '{"songs/one.m4a": "Artist"}'),
+        ("tags.csv", "file,artist\nsongs/one.m4a,Artist\n"),
+    ],
+)
+def test_invalid_manifest(tmp_path: Path, name: str, content: str) -> None:
+    manifest = tmp_path / name
+    manifest.write_text(content, encoding="utf-8")
+
+    with pytest.raises(InvalidManifestError):
+        read_manifest(manifest)
+
+    # The command fails without editing anything
+    result = CliRunner().invoke(edit, ["--manifest", str(manifest)])
+    assert result.exit_code == -1
+
+
+def test_dry_run(tmp_path: Path) -> None:
+    path = write_file(tmp_path / "song.m4a", make_m4a())
+    MP4TagWriter.write_tags(path, {"artist": "Artist", "title": "Song"})
+    content = path.read_bytes()
+    args = ["-t", "artist", "-v", "Other", "-t", "title", "-v", "Song", str(path)]
+
+    # Nothing is written
+    result = CliRunner().invoke(edit, [*args, "--dry-run"])
+    assert result.exit_code == 0
+    assert path.read_bytes() == content
+
+    result = CliRunner().invoke(edit, args)
+    assert result.exit_code == 0
+    assert MP4TagReader.read_tags(path).items() >= {"artist": "Other", "title": "Song"}.items()
@@ -0,0 +1,30 @@
+from pathlib import Path
+
+import pytest
+
+from yt2navidrome.utils import files
+from yt2navidrome.utils.files import write_atomic
+
+
+def test_write_atomic(tmp_path: Path) -> None:
+    path = tmp_path / "state" / "file.json"
+    write_atomic(path, "first")
+    write_atomic(path, b"second")
+    assert path.read_text() == "second"
+    assert [child.name for child in path.parent.iterdir()] == ["file.json"]
+
+
+def test_write_atomic_keeps_previous_content_on_failure(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    path = tmp_path / "file.json"
+    write_atomic(path, "first")
+
+    def fail(source: Path, destination: Path) -> None:
+        raise OSError
+
+    monkeypatch.setattr(files.os, "replace", fail)
+    with pytest.raises(OSError):
+        write_atomic(path, "second")
+
+    # The temporary file is removed
+    assert path.read_text() == "first"
+    assert [child.name for child in tmp_path.iterdir()] == ["file.json"]
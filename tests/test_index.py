@@ -0,0 +1,67 @@
+from pathlib import Path
+
+from yt2navidrome.config import STATE_DIR_NAME
+from yt2navidrome.downloader.index import IndexEntry, LibraryIndex
+
+
+def write_file(path: Path) -> Path:
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(b"")
+    return path
+
+
+def test_add_contains_remove(tmp_path: Path) -> None:
+    index = LibraryIndex.open(tmp_path)
+    assert index is LibraryIndex.open(tmp_path)
+    assert len(index) == 0
+
+    index.add("video0", tmp_path / "Uploader" / "video0" / "Song.m4a", uploader="Uploader", title="Song")
+    assert index.contains("video0")
+    assert not index.contains("video1")
+    assert index.get("video0") == IndexEntry(
+        "video0", str(Path("Uploader", "video0", "Song.m4a")), "Uploader", "Song", tagged=None
+    )
+
+    # Added again (e.g. downloaded again): replaced
+    index.add("video0", tmp_path / "Other" / "video0" / "Song.opus", uploader="Other", title="Song", tagged=False)
+    index.set_tagged("video0", True)
+    entry = index.get("video0")
+    assert entry
+    assert (entry.path, entry.tagged) == (str(Path("Other", "video0", "Song.opus")), True)
+    assert index.video_ids() == {"video0"}
+
+    index.remove("video0")
+    assert not index.contains("video0")
+    assert len(index) == 0
+
+
+def test_built_from_disk_on_first_open(tmp_path: Path) -> None:
+    write_file(tmp_path / "Uploader" / "video0" / "Song.m4a")
+    write_file(tmp_path / "Uploader" / "video0" / "Song.jpg")
+    write_file(tmp_path / "Uploader" / "video1" / "cover.jpg")  # No media file
+    write_file(tmp_path / "Loose.m4a")  # Not in a video directory
+    write_file(tmp_path / STATE_DIR_NAME / "video2" / "Song.m4a")
+
+    index = LibraryIndex.open(tmp_path)
+    assert index.video_ids() == {"video0"}
+    assert index.get("video0") == IndexEntry(
+        "video0", str(Path("Uploader", "video0", "Song.m4a")), "Uploader", "Song", tagged=None
+    )
+
+
+def test_rebuild_drops_deleted_files(tmp_path: Path) -> None:
+    index = LibraryIndex.open(tmp_path)
+    kept = write_file(tmp_path / "Uploader" / "video0" / "Song.m4a")
+    deleted = write_file(tmp_path / "Uploader" / "video1" / "Other.m4a")
+    index.add("video0", kept, uploader="Uploader", title="Song", tagged=True)
+    index.add("video1", deleted, uploader="Uploader", title="Other", tagged=True)
+
+    # Files deleted by hand are still indexed until the index is rebuilt
+    deleted.unlink()
+    assert index.contains("video1")
+
+    assert index.rebuild() == 1
+    assert index.video_ids() == {"video0"}
+    entry = index.get("video0")
+    assert entry
+    assert entry.tagged is None  # Unknown once rebuilt from disk
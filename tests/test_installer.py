@@ -0,0 +1,33 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+
+from yt2navidrome.utils.ffmpeg import FFmpegInstaller
+
+
+def test_ensure_ffmpeg_installed_checks_once(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(FFmpegInstaller, "_paths", None)
+    monkeypatch.setattr(FFmpegInstaller, "_installed", None)
+
+    checks = 0
+    started = threading.Event()
+    release = threading.Event()
+
+    def check_or_install() -> bool:
+        nonlocal checks
+        checks += 1
+        started.set()
+        assert release.wait(10)
+        return False
+
+    monkeypatch.setattr(FFmpegInstaller, "_check_or_install", check_or_install)
+
+    # Workers check FFmpeg lazily: all of them wait for the first check, failed or not
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        results = [executor.submit(FFmpegInstaller.ensure_ffmpeg_installed) for _ in range(16)]
+        assert started.wait(10)
+        release.set()
+
+    assert [result.result() for result in results] == [False] * 16
+    assert checks == 1
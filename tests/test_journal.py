@@ -0,0 +1,129 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from bench.fixtures import make_m4a
+from yt2navidrome.commands.download import DownloadOptions, process_job
+from yt2navidrome.downloader.formats import FORMAT_PROFILES, FormatProfile
+from yt2navidrome.downloader.index import LibraryIndex
+from yt2navidrome.downloader.journal import Job, JobJournal, JobState
+from yt2navidrome.downloader.models import Video
+from yt2navidrome.downloader.video import VideoUtils
+from yt2navidrome.utils.mp4 import MP4TagReader, MP4TagWriter
+
+SOURCE = "https://stub.invalid/playlist?list=source"
+METADATA = {"title": "Song", "artist": "Artist", "album": "Album", "album_artist": "Artist"}
+
+
+def stub_video(video_id: str) -> Video:
+    return Video(url=f"https://stub.invalid/watch?v={video_id}", title=f"Title {video_id}", uploader="Uploader")
+
+
+def write_file(output_dir: Path, job: Job) -> Path:
+    path = output_dir / job.uploader / job.video_id / f"{job.title}.m4a"
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(make_m4a(10, 1000))
+    return path
+
+
+@pytest.fixture
+def downloads(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """Stub VideoUtils.download, which writes an untagged file, and record the downloaded video URLs"""
+    urls: list[str] = []
+
+    def download(video: Video, output_dir: Path, *args: object, **kwargs: object) -> tuple[Path, FormatProfile]:
+        urls.append(video.url)
+        job = JobJournal.open(output_dir).get(video.url.rsplit("=", 1)[-1])
+        assert job
+        return write_file(output_dir, job), FORMAT_PROFILES["m4a"]
+
+    monkeypatch.setattr(VideoUtils, "download", download)
+    return urls
+
+
+def test_enqueue_and_get_unfinished(tmp_path: Path) -> None:
+    journal = JobJournal.open(tmp_path)
+    videos = [
+        stub_video("video0"),
+        stub_video("video1"),
+        Video(url="https://stub.invalid/no-id", title="", uploader=""),
+    ]
+
+    # Videos without an ID are left out
+    jobs = journal.enqueue(SOURCE, videos, [METADATA] * len(videos))
+    assert [job.video_id for job in jobs] == ["video0", "video1"]
+    assert [job.state for job in journal.get_jobs()] == [JobState.QUEUED] * 2
+    assert journal.get_unfinished() == []
+
+    journal.set_state(jobs[0], JobState.DOWNLOADED, path=tmp_path / "Uploader" / "video0" / "Title video0.m4a")
+    journal.set_state(jobs[1], JobState.QUEUED, error="Download failed")
+    assert journal.get_unfinished(SOURCE) == [jobs[0]]
+    assert journal.get_unfinished("https://stub.invalid/playlist?list=other") == []
+    assert journal.get("video0") == jobs[0]
+    assert jobs[0].path == str(Path("Uploader", "video0", "Title video0.m4a"))
+    assert journal.get("video1") == jobs[1]
+    assert jobs[1].attempts == 1
+
+    journal.set_state(jobs[0], JobState.TAGGED)
+    assert journal.get_unfinished(SOURCE) == [jobs[0]]
+    journal.set_state(jobs[0], JobState.VERIFIED)
+    assert journal.get_unfinished(SOURCE) == []
+    assert journal.count_states() == {SOURCE: {JobState.VERIFIED: 1, JobState.QUEUED: 1}}
+
+    # Queued again (e.g. its file was deleted): the job starts over
+    journal.enqueue(SOURCE, [stub_video("video0")], [METADATA])
+    recorded = journal.get("video0")
+    assert recorded
+    assert recorded.state == JobState.QUEUED
+    assert recorded.path is None
+    assert journal.get("video1") == jobs[1]
+
+
+def test_journal_shares_index_connection(tmp_path: Path) -> None:
+    journal = JobJournal.open(tmp_path)
+    index = LibraryIndex.open(tmp_path)
+    assert journal._connection is index._connection
+
+    # Workers update both at the same time
+    jobs = journal.enqueue(SOURCE, [stub_video(f"video{idx}") for idx in range(8)], [METADATA] * 8)
+    barrier = threading.Barrier(len(jobs))
+
+    def update(job: Job) -> None:
+        barrier.wait(10)
+        path = tmp_path / job.uploader / job.video_id / f"{job.title}.m4a"
+        journal.set_state(job, JobState.DOWNLOADED, path=path)
+        index.add(job.video_id, path, job.uploader, job.title)
+        index.set_tagged(job.video_id, True)
+
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(update, jobs))
+
+    assert sorted(job.video_id for job in journal.get_unfinished()) == [job.video_id for job in jobs]
+    assert all(index.contains(job.video_id) for job in jobs)
+
+
+def test_resume_from_each_stage(tmp_path: Path, downloads: list[str]) -> None:
+    journal = JobJournal.open(tmp_path)
+    videos = [stub_video(f"video{idx}") for idx in range(4)]
+    downloaded, tagged, missing, queued = journal.enqueue(SOURCE, videos, [METADATA] * len(videos))
+
+    # Interrupted run: a file downloaded but not tagged, a file tagged but not verified,
+    # and a file recorded as downloaded but deleted since
+    journal.set_state(downloaded, JobState.DOWNLOADED, path=write_file(tmp_path, downloaded))
+    tagged_path = write_file(tmp_path, tagged)
+    MP4TagWriter.write_tags(tagged_path, METADATA)
+    journal.set_state(tagged, JobState.TAGGED, path=tagged_path)
+    journal.set_state(missing, JobState.DOWNLOADED, path=tmp_path / "deleted.m4a")
+
+    jobs = journal.get_jobs(SOURCE)
+    for idx, job in enumerate(jobs):
+        process_job(job, tmp_path, DownloadOptions(), idx)
+
+    # Only the queued job and the job whose file is missing are downloaded
+    assert sorted(downloads) == sorted([missing.url, queued.url])
+    assert [job.state for job in journal.get_jobs(SOURCE)] == [JobState.VERIFIED] * 4
+    for job in journal.get_jobs(SOURCE):
+        assert job.path
+        assert MP4TagReader.read_tags(tmp_path / job.path).items() >= METADATA.items()
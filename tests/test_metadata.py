@@ -0,0 +1,128 @@
+import logging
+
+import pytest
+
+from yt2navidrome.downloader.metadata import MetadataUtils
+from yt2navidrome.downloader.models import Video
+from yt2navidrome.downloader.video import VideoUtils
+from yt2navidrome.template import TemplateCompileError, TemplateCompiler
+from yt2navidrome.template.models import Argument, MetadataParser, PostProcessor, Template
+
+
+def make_template(*post_processors: PostProcessor, pattern: str = r"(?P<artist>.+?) - (?P<title>[^(]+)") -> Template:
+    parsers = [MetadataParser(source="title", pattern=pattern, post_processors=list(post_processors))]
+    return Template(name="test", url="https://stub.invalid", playlist=True, parsers=parsers)
+
+
+def make_videos(count: int) -> list[Video]:
+    return [
+        Video(
+            url=f"https://stub.invalid/watch?v={idx}",
+            title=f"artist {idx} x guest feat. other - Song {idx}",
+            uploader="u",
+        )
+        for idx in range(count)
+    ]
+
+
+def test_actions() -> None:
+    template = make_template(
+        PostProcessor("strip_feat", "artist", "artist"),
+        PostProcessor("split", "artist", "artist", [Argument("separators", [" x "]), Argument("glue", "; ")]),
+        PostProcessor("title_case", "artist", "artist"),
+        PostProcessor("replace", "title", "title", [Argument("old", "Song"), Argument("new", "Track")]),
+        PostProcessor("regex_sub", "title", "title", [Argument("pattern", r"\s+$"), Argument("repl", "")]),
+        PostProcessor(
+            "map", "artist", "album", [Argument("table", {"artist 1; guest": "Album"}), Argument("ignore_case", True)]
+        ),
+        PostProcessor("default", "version", "version", [Argument("value", "original")]),
+        pattern=r"(?P<artist>.+?) - (?P<title>[^(]+)(?:\((?P<version>.+)\))?",
+    )
+
+    [metadata] = VideoUtils.parse_metadata_from_videos(make_videos(2)[1:], TemplateCompiler.get(template))
+
+    assert metadata == {
+        "artist": "Artist 1; Guest",
+        "title": "Track 1",
+        "album": "Album",
+        "version": "original",
+    }
+
+
+@pytest.mark.parametrize(
+    "post_processor",
+    [
+        PostProcessor("unknown", "artist", "artist"),
+        PostProcessor("split", "artist", "artist", [Argument("glue", "; ")]),
+        PostProcessor("regex_sub", "artist", "artist", [Argument("pattern", "("), Argument("repl", "")]),
+        PostProcessor("title_case", "missing", "artist"),
+    ],
+)
+def test_invalid_post_processor(post_processor: PostProcessor) -> None:
+    with pytest.raises(TemplateCompileError):
+        TemplateCompiler.compile(make_template(post_processor))
+
+
+def test_batch_matches_per_video() -> None:
+    template = TemplateCompiler.get(
+        make_template(
+            PostProcessor("split", "artist", "artist", [Argument("separators", [" x "]), Argument("glue", "; ")])
+        )
+    )
+    videos = make_videos(10)
+
+    assert VideoUtils.parse_metadata_from_videos(videos, template) == [
+        VideoUtils.parse_metadata_from_info(video, template) for video in videos
+    ]
+
+
+@pytest.mark.parametrize(
+    ("value", "source"),
+    [
+        (None, None),
+        ("Song", "Song"),
+        ("", ""),
+        (215, "215"),
+        (1.5, "1.5"),
+        (("rock", "pop"), "rock, pop"),
+        (["rock"], "rock"),
+        ((), ""),
+    ],
+)
+def test_to_source(value: object, source: str | None) -> None:
+    assert MetadataUtils.to_source(value) == source
+
+
+def test_description_source() -> None:
+    template = TemplateCompiler.get(
+        Template(
+            name="test",
+            url="https://stub.invalid",
+            playlist=True,
+            parsers=[MetadataParser(source="description", pattern=r"Album: (?P<album>.+)")],
+        )
+    )
+    videos = [
+        Video.from_info("https://stub.invalid/watch?v=0", "Title", "Uploader", {"description": "Album: Name\nMore"}),
+        Video(url="https://stub.invalid/watch?v=1", title="Title", uploader="Uploader"),  # Description not extracted
+    ]
+
+    assert VideoUtils.parse_metadata_from_videos(videos, template) == [{"album": "Name"}, {}]
+
+
+class BrokenVideo:
+    @property
+    def title(self) -> str:
+        raise RuntimeError
+
+
+def test_failing_source_is_logged(caplog: pytest.LogCaptureFixture) -> None:
+    [parser] = TemplateCompiler.get(make_template()).parsers
+    videos = [*make_videos(1), BrokenVideo()]
+
+    with caplog.at_level(logging.ERROR):
+        results = MetadataUtils.run_parser_batch(videos, parser)
+
+    assert results == [{"artist": "artist 0 x guest feat. other", "title": "Song 0"}, {}]
+    assert [record.exc_info[0] for record in caplog.records if record.exc_info] == [RuntimeError]
+    assert results == [MetadataUtils.run_parser(video, parser) for video in videos]
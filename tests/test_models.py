@@ -0,0 +1,62 @@
+import sys
+
+import yaml
+
+from yt2navidrome.downloader.models import Video
+from yt2navidrome.template.models import MetadataParser, Template, get_yaml_loader
+
+DESCRIPTION = "Tracklist:\n" + "\n".join(f"{idx:02d}. Artist - Song {idx}" for idx in range(50))
+
+
+def test_video_is_compact() -> None:
+    video = Video.from_info(
+        "https://stub.invalid/watch?v=video0",
+        "Artist - Song",
+        "".join(["Up", "loader"]),
+        {"duration": 215.4, "channel_id": "".join(["chan", "nel"]), "tags": ["".join(["ro", "ck"])], "extra": 1},
+    )
+
+    assert not hasattr(video, "__dict__")
+    assert video.duration == 215
+    # Strings shared by all the videos of a channel are interned
+    assert video.uploader is sys.intern("Uploader")
+    assert video.channel_id is sys.intern("channel")
+    assert video.tags == ("rock",)
+    assert video.tags[0] is sys.intern("rock")
+
+
+def test_video_description() -> None:
+    info = {"description": DESCRIPTION}
+    video = Video.from_info("https://stub.invalid/watch?v=video0", "Title", "Uploader", info)
+
+    # Stored compressed, read back as is
+    assert video._description is not None
+    assert len(video._description) < len(DESCRIPTION.encode())
+    assert video.description == DESCRIPTION
+
+    # Not extracted: no description, and nothing is fetched on access
+    assert Video("https://stub.invalid/watch?v=video1", "Title", "Uploader").description is None
+    assert (
+        Video.from_info("https://stub.invalid/watch?v=video1", "Title", "Uploader", {"description": ""}).description
+        == ""
+    )
+
+
+def test_template_round_trips_through_yaml() -> None:
+    template = Template(
+        name="name",
+        url="https://stub.invalid/playlist?list=name",
+        playlist=True,
+        parsers=[MetadataParser(source="title", pattern="(?P<title>.+)")],
+        refresh_interval="6h",
+        priority=2,
+    )
+
+    # The interval is dumped as written, its parsed value is kept apart
+    assert template.refresh_seconds == 21600
+    dumped = yaml.dump(template)
+    assert "refresh_interval: 6h" in dumped
+    loaded = yaml.load(dumped, Loader=get_yaml_loader())  # noqa: S506
+    assert loaded == template
+    assert loaded.refresh_seconds == 21600
+    assert yaml.dump(loaded) == dumped
@@ -0,0 +1,193 @@
+import json
+import shutil
+import subprocess
+from pathlib import Path
+
+import pytest
+
+from bench.fixtures import make_m4a
+from yt2navidrome.utils.ffmpeg import FFmpegHelper, FFmpegInstaller
+from yt2navidrome.utils.mp4 import MP4Error, MP4TagReader, MP4TagWriter
+from yt2navidrome.utils.mp4.atoms import Atom, build_atom, iter_atoms
+from yt2navidrome.utils.mp4.ilst import DATA_TYPE_INTEGER, IlstItem, build_data_atom, decode_item, encode_item
+from yt2navidrome.utils.mp4.writer import DEFAULT_PADDING
+
+SAMPLES, SAMPLE_SIZE = 10, 1000
+MEDIA_DATA = b"\xab" * (SAMPLES * SAMPLE_SIZE)
+
+TAGS = {
+    "title": "Song",
+    "artist": "Artist",
+    "album": "Album",
+    "album_artist": "Artist",
+    "date": "2024",
+    "genre": "Rock",
+    "track": "3/12",
+    "disc": "1/2",
+    "compilation": "1",
+    "season_number": "200",
+    "episode_sort": "7",
+}
+
+requires_ffprobe = pytest.mark.skipif(shutil.which("ffprobe") is None, reason="ffprobe is not installed")
+requires_ffmpeg = pytest.mark.skipif(
+    shutil.which("ffmpeg") is None or shutil.which("ffprobe") is None, reason="FFmpeg is not installed"
+)
+
+
+def top_level_atoms(path: Path) -> list[Atom]:
+    with open(path, "rb") as f:
+        return list(iter_atoms(f, 0, f.seek(0, 2)))
+
+
+def read_media_data(path: Path) -> bytes:
+    mdat = next(atom for atom in top_level_atoms(path) if atom.type == "mdat")
+    with open(path, "rb") as f:
+        f.seek(mdat.offset + mdat.header_size)
+        return f.read(mdat.size - mdat.header_size)
+
+
+def ffprobe_tags(path: Path) -> dict[str, str]:
+    command = ["ffprobe", "-v", "error", "-print_format", "json", "-show_format", str(path)]
+    output = subprocess.run(command, capture_output=True, check=True, text=True).stdout  # noqa: S603
+    tags: dict[str, str] = json.loads(output)["format"].get("tags", {})
+    return tags
+
+
+@pytest.fixture
+def m4a_file(tmp_path: Path) -> Path:
+    path = tmp_path / "song.m4a"
+    path.write_bytes(make_m4a(SAMPLES, SAMPLE_SIZE))
+    return path
+
+
+@pytest.mark.parametrize(
+    ("key", "value"),
+    [("track", "3/12"), ("track", "7"), ("disc", "1/2"), ("compilation", "1"), ("media_type", "10")],
+)
+def test_encode_item_round_trip(key: str, value: str) -> None:
+    assert decode_item(encode_item(key, value)) == value
+
+
+@pytest.mark.parametrize(
+    ("atom_type", "payload", "value"),
+    [
+        # Written by other taggers: ffprobe only reads a single unsigned byte
+        ("tvsn", b"\x00\x00\x01\x2c", "44"),
+        ("cpil", b"\xff", "255"),
+        ("stik", b"\x00\x05", "0"),
+        # Track without total
+        ("trkn", b"\x00\x00\x00\x07", "7"),
+    ],
+)
+def test_decode_item_as_ffprobe(atom_type: str, payload: bytes, value: str) -> None:
+    item = IlstItem(type=atom_type, raw=build_atom(atom_type, build_data_atom(DATA_TYPE_INTEGER, payload)))
+    assert decode_item(item) == value
+
+
+@pytest.mark.parametrize(
+    ("key", "value"),
+    [
+        ("track", "70000/1"),
+        ("track", "-1"),
+        ("disc", "1/70000"),
+        ("compilation", "256"),
+        ("season_number", "300"),
+        ("episode_sort", "-1"),
+    ],
+)
+def test_encode_item_out_of_range(key: str, value: str) -> None:
+    with pytest.raises(ValueError, match=f"Value of {key} out of range"):
+        encode_item(key, value)
+
+
+def test_encode_item_invalid_number() -> None:
+    with pytest.raises(ValueError, match="invalid literal"):
+        encode_item("disc", "x/2")
+
+
+def test_write_tags_layouts(m4a_file: Path) -> None:
+    # moov is before mdat without free space: it is moved to the end of the file, its previous place is freed
+    assert [atom.type for atom in top_level_atoms(m4a_file)] == ["ftyp", "moov", "mdat"]
+    MP4TagWriter.write_tags(m4a_file, TAGS)
+    atoms = top_level_atoms(m4a_file)
+    assert [atom.type for atom in atoms] == ["ftyp", "free", "mdat", "moov"]
+    assert read_media_data(m4a_file) == MEDIA_DATA
+    assert MP4TagReader.read_tags(m4a_file).items() >= TAGS.items()
+
+    # The moved moov was given some padding: next edits fit in place, the size of the file does not change
+    size = m4a_file.stat().st_size
+    MP4TagWriter.write_tags(m4a_file, {"title": "Another song", "genre": ""})
+    assert m4a_file.stat().st_size == size
+    assert [atom.type for atom in top_level_atoms(m4a_file)] == ["ftyp", "free", "mdat", "moov"]
+    tags = MP4TagReader.read_tags(m4a_file)
+    assert tags["title"] == "Another song"
+    assert "genre" not in tags
+
+    # Tags larger than the padding: moov is the last atom, it grows where it is
+    lyrics = "la " * DEFAULT_PADDING
+    MP4TagWriter.write_tags(m4a_file, {"lyrics": lyrics})
+    new_atoms = top_level_atoms(m4a_file)
+    assert [atom.type for atom in new_atoms] == ["ftyp", "free", "mdat", "moov"]
+    assert new_atoms[-1].offset == atoms[-1].offset
+    assert m4a_file.stat().st_size == new_atoms[-1].offset + new_atoms[-1].size
+    assert read_media_data(m4a_file) == MEDIA_DATA
+    assert MP4TagReader.read_tags(m4a_file)["lyrics"] == lyrics
+
+
+def test_add_metadata_in_place_falls_back_on_invalid_values(m4a_file: Path) -> None:
+    content = m4a_file.read_bytes()
+    assert not FFmpegHelper.add_metadata_in_place(m4a_file, {"title": "Song", "track": "70000/1"})
+    assert m4a_file.read_bytes() == content  # Nothing written, ffmpeg takes over
+
+
+@requires_ffprobe
+def test_written_tags_read_by_ffprobe(m4a_file: Path) -> None:
+    MP4TagWriter.write_tags(m4a_file, TAGS)
+    assert ffprobe_tags(m4a_file) == MP4TagReader.read_tags(m4a_file)
+
+    MP4TagWriter.write_tags(m4a_file, {"lyrics": "la " * DEFAULT_PADDING})
+    assert ffprobe_tags(m4a_file) == MP4TagReader.read_tags(m4a_file)
+
+
+def tag_with_ffmpeg(path: Path, tags: dict[str, str], *options: str) -> Path:
+    output = path.with_name(f"tagged{path.suffix}")
+    command = ["ffmpeg", "-v", "error", "-y", "-i", str(path), "-c", "copy", *options]
+    for key, value in tags.items():
+        command.extend(["-metadata", f"{key}={value}"])
+    subprocess.run([*command, str(output)], check=True)  # noqa: S603
+    return output
+
+
+@requires_ffmpeg
+def test_read_tags_matches_ffprobe(m4a_file: Path) -> None:
+    # Tagged by ffmpeg, with values which do not fit their atom
+    tags = {
+        **TAGS,
+        "title": "Chanson \u00e9t\u00e9 \u2014 \U0001f3b5",
+        "track": "70000/3",
+        "compilation": "300",
+        "season_number": "300",
+        "episode_sort": "70000",
+        "media_type": "1",
+        "gapless_playback": "1",
+    }
+    output = tag_with_ffmpeg(m4a_file, tags)
+    assert MP4TagReader.read_tags(output) == ffprobe_tags(output)
+
+
+@requires_ffmpeg
+def test_quicktime_metadata_falls_back_to_ffmpeg(m4a_file: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(FFmpegInstaller, "_paths", (shutil.which("ffmpeg"), shutil.which("ffprobe")))
+    output = tag_with_ffmpeg(m4a_file, {**TAGS, "custom_tag": "Custom value"}, "-movflags", "use_metadata_tags")
+    content = output.read_bytes()
+
+    # Items named by a keys atom are not read (nor written) in-process
+    with pytest.raises(MP4Error):
+        MP4TagReader.read_tags(output)
+    with pytest.raises(MP4Error):
+        MP4TagWriter.write_tags(output, {"title": "Another song"})
+    assert output.read_bytes() == content
+
+    assert FFmpegHelper.get_tags(output) == ffprobe_tags(output)
+    assert not FFmpegHelper.add_metadata_in_place(output, {"title": "Another song"})
@@ -0,0 +1,30 @@
+import click
+import pytest
+from click.testing import CliRunner
+
+from yt2navidrome.commands.params import DURATION
+
+
+@click.command()
+@click.option("--max-age", type=DURATION)
+def command(max_age: float | None) -> None:
+    click.echo(repr(max_age))
+
+
+@pytest.mark.parametrize(("value", "seconds"), [("90", 90.0), ("30m", 1800.0), ("1d12h", 129600.0), ("1.5h", 5400.0)])
+def test_duration_param(value: str, seconds: float) -> None:
+    result = CliRunner().invoke(command, ["--max-age", value])
+    assert result.exit_code == 0, result.output
+    assert result.output == f"{seconds!r}\n"
+
+
+def test_duration_param_default() -> None:
+    assert DURATION.convert(600.0, None, None) == 600.0
+    assert CliRunner().invoke(command, []).output == "None\n"
+
+
+@pytest.mark.parametrize("value", ["soon", "6 hours", "-5", "1h-2m", ""])
+def test_invalid_duration_param(value: str) -> None:
+    result = CliRunner().invoke(command, ["--max-age", value])
+    assert result.exit_code == 2
+    assert f"Invalid value for '--max-age': {value!r} is not a valid duration" in result.output
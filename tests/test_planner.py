@@ -0,0 +1,130 @@
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from yt2navidrome.commands.download import DownloadOptions, stream_jobs
+from yt2navidrome.downloader.journal import JobJournal
+from yt2navidrome.downloader.planner import DownloadPlanner
+from yt2navidrome.downloader.playlist import PlaylistUtils
+from yt2navidrome.downloader.resolver import AsyncResolver
+from yt2navidrome.downloader.snapshot import PlaylistSnapshot, SnapshotEntry
+from yt2navidrome.template.errors import InvalidPriorityError
+from yt2navidrome.template.models import MetadataParser, Template
+
+WAIT_TIMEOUT = 10  # Only reached if the test fails, so that it does not hang
+
+
+def stub_url(video_id: str) -> str:
+    return f"https://stub.invalid/watch?v={video_id}"
+
+
+def make_template(name: str, parsers: list[MetadataParser] | None = None, priority: int = 0) -> Template:
+    return Template(
+        name=name,
+        url=f"https://stub.invalid/playlist?list={name}",
+        playlist=True,
+        parsers=parsers or [],
+        priority=priority,
+    )
+
+
+def make_entry(video_id: str, complete: bool = True) -> SnapshotEntry:
+    if not complete:
+        return SnapshotEntry(video_id=video_id, url=stub_url(video_id))
+    return SnapshotEntry(video_id=video_id, url=stub_url(video_id), title=f"Artist - {video_id}", uploader="Label")
+
+
+@pytest.fixture
+def playlists(monkeypatch: pytest.MonkeyPatch) -> Iterator[dict[str, list[SnapshotEntry]]]:
+    """Missing entries of the stub playlists, by playlist URL"""
+    missing: dict[str, list[SnapshotEntry]] = {}
+
+    def get_missing_entries(
+        playlist_url: str, output_dir: Path, max_age: float | None = None
+    ) -> tuple[PlaylistSnapshot, list[SnapshotEntry]]:
+        return PlaylistSnapshot(url=playlist_url, title=playlist_url), missing[playlist_url]
+
+    monkeypatch.setattr(PlaylistUtils, "get_missing_entries", get_missing_entries)
+    yield missing
+    AsyncResolver.close_all()
+
+
+def test_plan_deduplicates_videos(tmp_path: Path, playlists: dict[str, list[SnapshotEntry]]) -> None:
+    first, second = make_template("first"), make_template("second", priority=1)
+    playlists[first.url] = [make_entry("video1"), make_entry("video2", complete=False), make_entry("video3")]
+    playlists[second.url] = [make_entry("video2"), make_entry("video4")]
+    single = Template(name="single", url=stub_url("video5"), playlist=False, parsers=[])
+
+    plan = DownloadPlanner.plan([first, second, single], tmp_path)
+
+    # Round-robin across templates, each video once
+    assert list(plan.videos) == ["video1", "video2", "video5", "video4", "video3"]
+    assert len(plan.snapshots) == 2
+
+    # Shared video: owned by the template with the highest priority, resolved from its most complete entry
+    shared = plan.videos["video2"]
+    assert shared.templates == [second, first]
+    assert shared.entries[0].title == "Artist - video2"
+    assert len(shared.entries) == 2
+
+
+def test_plan_fetches_playlists_in_parallel(tmp_path: Path, playlists: dict[str, list[SnapshotEntry]]) -> None:
+    templates = [make_template(f"playlist{idx}") for idx in range(3)]
+    fetching = threading.Barrier(len(templates))
+    get_missing_entries = PlaylistUtils.get_missing_entries
+
+    def wait_for_others(
+        playlist_url: str, output_dir: Path, max_age: float | None = None
+    ) -> tuple[PlaylistSnapshot, list[SnapshotEntry]] | None:
+        # Only returns once all playlists are being fetched at once
+        fetching.wait(WAIT_TIMEOUT)
+        return get_missing_entries(playlist_url, output_dir, max_age)
+
+    for idx, template in enumerate(templates):
+        playlists[template.url] = [make_entry(f"video{idx}")]
+
+    with pytest.MonkeyPatch.context() as monkeypatch:
+        monkeypatch.setattr(PlaylistUtils, "get_missing_entries", wait_for_others)
+        plan = DownloadPlanner.plan(templates, tmp_path, workers=len(templates))
+
+    assert list(plan.videos) == ["video0", "video1", "video2"]
+
+
+def test_parse_metadata_merges_by_precedence(tmp_path: Path, playlists: dict[str, list[SnapshotEntry]]) -> None:
+    title_parser = MetadataParser(source="title", pattern=r"(?P<artist>.+?) - (?P<title>.+)")
+    uploader_parser = MetadataParser(source="uploader", pattern=r"(?P<artist>.+)")
+    album_parser = MetadataParser(source="uploader", pattern=r"(?P<album>.+)")
+    templates = [
+        make_template("low", [title_parser, album_parser], priority=-1),
+        make_template("high", [uploader_parser], priority=1),
+        make_template("default", [MetadataParser(source="title", pattern=r"(?P<album>.+?) -")]),
+    ]
+    for template in templates:
+        playlists[template.url] = [make_entry("video0")]
+
+    plan = DownloadPlanner.plan(templates, tmp_path)
+    items = list(DownloadPlanner.stream_videos(plan, tmp_path))
+
+    # Each entry comes from the first template (by precedence) defining it
+    assert DownloadPlanner.parse_metadata(items) == [{"artist": "Label", "album": "Artist", "title": "video0"}]
+
+
+def test_jobs_are_owned_by_highest_precedence(tmp_path: Path, playlists: dict[str, list[SnapshotEntry]]) -> None:
+    first, second = make_template("first"), make_template("second", priority=1)
+    playlists[first.url] = [make_entry("video0"), make_entry("video1")]
+    playlists[second.url] = [make_entry("video1"), make_entry("video2")]
+
+    plan = DownloadPlanner.plan([first, second], tmp_path)
+    jobs = list(stream_jobs(plan, tmp_path, DownloadOptions(), resumed_jobs=[]))
+
+    assert [job.video_id for job in jobs] == ["video0", "video1", "video2"]
+    assert [job.source for job in jobs] == [first.url, second.url, second.url]
+    assert JobJournal.open(tmp_path).count_states().keys() == {first.url, second.url}
+
+
+@pytest.mark.parametrize("priority", ["high", 1.5, True, None])
+def test_priority_must_be_an_integer(priority: object) -> None:
+    with pytest.raises(InvalidPriorityError):
+        make_template("invalid", priority=priority)  # type: ignore[arg-type]
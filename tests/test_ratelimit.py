@@ -0,0 +1,219 @@
+import json
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+import pytest
+
+from yt2navidrome.config import (
+    DOWNLOADS_PER_HOST_BURST,
+    DOWNLOADS_PER_HOST_MAX_RATE,
+    DOWNLOADS_PER_HOST_MIN_RATE,
+    DOWNLOADS_PER_HOST_RATE,
+    RATE_DECREASE_COOLDOWN,
+    RATE_DECREASE_FACTOR,
+    RATE_INCREASE,
+    THROTTLING_BACKOFF_BASE,
+    THROTTLING_BACKOFF_MAX,
+    THROTTLING_RETRIES,
+)
+from yt2navidrome.utils import ratelimit
+from yt2navidrome.utils.ratelimit import HostRateLimiter, ThrottledError, TokenBucket
+
+URL = "https://www.youtube.com/watch?v=video0"
+
+
+class FakeClock:
+    """Stub of the time module: sleeping advances the monotonic clock instantly"""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+        self.sleeps: list[float] = []
+
+    def monotonic(self) -> float:
+        return self.now
+
+    def time(self) -> float:
+        return self.now
+
+    def sleep(self, seconds: float) -> None:
+        self.sleeps.append(seconds)
+        self.now += seconds
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> Iterator[FakeClock]:
+    fake_clock = FakeClock()
+    monkeypatch.setattr(ratelimit, "time", fake_clock)
+    monkeypatch.setattr(HostRateLimiter, "_buckets", {})
+    monkeypatch.setattr(HostRateLimiter, "_last_decrease", {})
+    monkeypatch.setattr(HostRateLimiter, "_loaded_rates", {})
+    yield fake_clock
+
+
+def test_token_bucket_burst_then_rate(clock: FakeClock) -> None:
+    bucket = TokenBucket(rate=0.5, capacity=2)
+
+    # Full bucket: the burst does not wait, then one token every 2s
+    assert [bucket.acquire() for _ in range(4)] == [0, 0, 2, 2]
+    assert clock.sleeps == [2, 2]
+
+    # Tokens do not pile up beyond the capacity
+    clock.now += 60
+    assert [bucket.acquire() for _ in range(3)] == [0, 0, 2]
+
+
+def test_token_bucket_rate_changes(clock: FakeClock) -> None:
+    bucket = TokenBucket(rate=1, capacity=2)
+    bucket.acquire(2)
+    clock.now += 1  # One token added at the previous rate
+
+    assert bucket.increase_rate(2, max_rate=2) == 2
+    assert bucket.increase_rate(2, max_rate=2) == 2
+    assert bucket.acquire() == 0
+    assert bucket.acquire() == 0.5
+
+    # Decreased: no burst until the bucket refills
+    clock.now += 60
+    assert bucket.decrease_rate(0.5, min_rate=0.5) == 1
+    assert bucket.decrease_rate(0.5, min_rate=0.5) == 0.5
+    assert bucket.acquire() == 2
+
+
+@pytest.mark.parametrize(
+    ("url", "host"),
+    [
+        (URL, "youtube.com"),
+        ("https://music.youtube.com/watch?v=video0", "youtube.com"),
+        ("https://youtu.be/video0", "youtube.com"),
+        ("https://rr1---sn-abc.googlevideo.com/videoplayback", "googlevideo.com"),
+    ],
+)
+def test_get_host(url: str, host: str) -> None:
+    assert HostRateLimiter.get_host(url) == host
+
+
+def test_host_rate_does_not_depend_on_workers(clock: FakeClock) -> None:
+    # Requests of any number of workers share the bucket of their host
+    for _ in range(DOWNLOADS_PER_HOST_BURST + 3):
+        HostRateLimiter.acquire(URL)
+    HostRateLimiter.acquire("https://other.invalid/file")
+
+    assert clock.sleeps == [1 / DOWNLOADS_PER_HOST_RATE] * 3
+    assert HostRateLimiter.get_bucket("youtube.com") is HostRateLimiter.get_bucket(HostRateLimiter.get_host(URL))
+
+
+def test_rate_increases_while_requests_succeed(clock: FakeClock) -> None:
+    bucket = HostRateLimiter.get_bucket("youtube.com")
+
+    # Concurrent increases all count
+    with ThreadPoolExecutor(max_workers=8) as executor:
+        list(executor.map(lambda _: HostRateLimiter.report_success(URL), range(40)))
+    assert bucket.rate == pytest.approx(DOWNLOADS_PER_HOST_RATE + 40 * RATE_INCREASE)
+
+    for _ in range(1000):
+        HostRateLimiter.report_success(URL)
+    assert bucket.rate == DOWNLOADS_PER_HOST_MAX_RATE
+
+
+def test_rate_decreases_once_per_cooldown(clock: FakeClock) -> None:
+    bucket = HostRateLimiter.get_bucket("youtube.com")
+
+    # Requests throttled together only decrease the rate once
+    HostRateLimiter.report_throttled(URL)
+    HostRateLimiter.report_throttled(URL)
+    assert bucket.rate == DOWNLOADS_PER_HOST_RATE * RATE_DECREASE_FACTOR
+
+    clock.now += RATE_DECREASE_COOLDOWN
+    HostRateLimiter.report_throttled(URL)
+    assert bucket.rate == DOWNLOADS_PER_HOST_RATE * RATE_DECREASE_FACTOR**2
+
+    for _ in range(20):
+        clock.now += RATE_DECREASE_COOLDOWN
+        HostRateLimiter.report_throttled(URL)
+    assert bucket.rate == DOWNLOADS_PER_HOST_MIN_RATE
+
+
+def test_call_retries_throttled_requests(clock: FakeClock, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(HostRateLimiter, "get_backoff", staticmethod(lambda attempt: 2.0**attempt))
+    attempts = 0
+
+    def request() -> str:
+        nonlocal attempts
+        attempts += 1
+        if attempts < 3:
+            raise ThrottledError
+        return "result"
+
+    assert HostRateLimiter.call(URL, request, rate_limited=False) == "result"
+    assert attempts == 3
+    assert clock.sleeps == [1, 2]  # Backoffs only, requests which are not rate limited do not wait for tokens
+    assert HostRateLimiter.get_bucket("youtube.com").rate == DOWNLOADS_PER_HOST_RATE * RATE_DECREASE_FACTOR
+
+    # Rate limited requests take a token (the bucket was drained when throttled), and drive the rate up
+    clock.now += 1 / (DOWNLOADS_PER_HOST_RATE * RATE_DECREASE_FACTOR)
+    assert HostRateLimiter.call(URL, lambda: "result") == "result"
+    assert clock.sleeps == [1, 2]
+    assert HostRateLimiter.get_bucket("youtube.com").rate == pytest.approx(
+        DOWNLOADS_PER_HOST_RATE * RATE_DECREASE_FACTOR + RATE_INCREASE
+    )
+
+
+def test_call_gives_up_after_retries(clock: FakeClock, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(HostRateLimiter, "get_backoff", staticmethod(lambda attempt: 1.0))
+    attempts = 0
+
+    def request() -> str:
+        nonlocal attempts
+        attempts += 1
+        raise ThrottledError
+
+    with pytest.raises(ThrottledError):
+        HostRateLimiter.call(URL, request, rate_limited=False)
+    assert attempts == THROTTLING_RETRIES + 1
+    assert clock.sleeps == [1] * THROTTLING_RETRIES
+
+
+def test_backoff_bounds(monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(ratelimit.random, "uniform", lambda low, high: (low, high))
+
+    assert HostRateLimiter.get_backoff(0) == (0, THROTTLING_BACKOFF_BASE)
+    assert HostRateLimiter.get_backoff(1) == (0, THROTTLING_BACKOFF_BASE * 2)
+    assert HostRateLimiter.get_backoff(20) == (0, THROTTLING_BACKOFF_MAX)
+
+
+def test_save_and_load_rates(clock: FakeClock, tmp_path: Path) -> None:
+    path = tmp_path / "state" / "ratelimits.json"
+    path.parent.mkdir()
+    path.write_text(json.dumps({"a.com": 100, "b.com": 0.0001, "c.com": "fast", "d.com": -1, "e.com": 0.2}))
+
+    # Rates out of bounds are clamped, invalid ones are ignored
+    HostRateLimiter.load(path)
+    assert HostRateLimiter._loaded_rates == {
+        "a.com": DOWNLOADS_PER_HOST_MAX_RATE,
+        "b.com": DOWNLOADS_PER_HOST_MIN_RATE,
+        "e.com": 0.2,
+    }
+    assert HostRateLimiter.get_bucket("e.com").rate == 0.2
+
+    # Hosts already requested by this run keep their rate
+    HostRateLimiter.get_bucket("youtube.com")
+    path.write_text(json.dumps({"youtube.com": 0.3}))
+    HostRateLimiter.load(path)
+    assert HostRateLimiter.get_bucket("youtube.com").rate == DOWNLOADS_PER_HOST_RATE
+
+    HostRateLimiter.save(path)
+    assert json.loads(path.read_text()) == {
+        "a.com": DOWNLOADS_PER_HOST_MAX_RATE,
+        "b.com": DOWNLOADS_PER_HOST_MIN_RATE,
+        "e.com": 0.2,
+        "youtube.com": DOWNLOADS_PER_HOST_RATE,
+    }
+
+
+def test_load_invalid_file(clock: FakeClock, tmp_path: Path) -> None:
+    path = tmp_path / "ratelimits.json"
+    HostRateLimiter.load(path)  # Missing
+    path.write_text("{")
+    HostRateLimiter.load(path)
+    assert HostRateLimiter._loaded_rates == {}
@@ -0,0 +1,100 @@
+import os
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+
+from yt2navidrome.config import TEMPLATES_PARALLEL_THRESHOLD
+from yt2navidrome.template import TemplateReader, cache
+from yt2navidrome.template.cache import TemplateCache
+from yt2navidrome.template.models import Template
+
+TEMPLATE = """!Template
+name: {name}
+url: https://www.youtube.com/playlist?list={name}
+playlist: true
+parsers:
+  - !MetadataParser
+    source: title
+    pattern: '{pattern}'
+"""
+
+
+def test_invalid_template_read_in_parallel(tmp_path: Path) -> None:
+    # Enough templates to be read in worker processes, one of them with an invalid pattern
+    count = TEMPLATES_PARALLEL_THRESHOLD + 3
+    for idx in range(count):
+        pattern = "(?P<title>.*" if idx == 5 else "(?P<title>.*)"
+        (tmp_path / f"template{idx:02}.yaml").write_text(TEMPLATE.format(name=f"template{idx:02}", pattern=pattern))
+
+    templates = TemplateReader.read_directory(tmp_path, use_cache=False)
+    assert [template.name for template in templates] == [f"template{idx:02}" for idx in range(count) if idx != 5]
+
+
+@pytest.fixture
+def parsed(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """Store the template cache in a temporary directory, and record the names of the parsed files"""
+    monkeypatch.setattr(cache, "CACHE_DIR", str(tmp_path / "cache"))
+    names: list[str] = []
+    read_files = TemplateReader.read_files
+
+    def record(file_paths: list[Path]) -> Iterator[tuple[Path, Template | None]]:
+        names.extend(file_path.name for file_path in file_paths)
+        return read_files(file_paths)
+
+    monkeypatch.setattr(TemplateReader, "read_files", record)
+    return names
+
+
+def write_templates(directory: Path, *names: str) -> None:
+    directory.mkdir(exist_ok=True)
+    for name in names:
+        (directory / f"{name}.yaml").write_text(TEMPLATE.format(name=name, pattern="(?P<title>.*)"))
+
+
+def test_cache_hits_and_invalidation(tmp_path: Path, parsed: list[str]) -> None:
+    directory = tmp_path / "templates"
+    write_templates(directory, "first", "second", "third")
+    assert len(TemplateReader.read_directory(directory)) == 3
+    assert parsed == ["first.yaml", "second.yaml", "third.yaml"]
+
+    # Unchanged files are loaded from the cache
+    parsed.clear()
+    templates = TemplateReader.read_directory(directory)
+    assert [template.name for template in templates] == ["first", "second", "third"]
+    assert parsed == []
+
+    # Modified (mtime or size) files are parsed again
+    first = directory / "first.yaml"
+    stat = first.stat()
+    os.utime(first, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+    (directory / "second.yaml").write_text(TEMPLATE.format(name="renamed", pattern="(?P<title>.*)"))
+    templates = TemplateReader.read_directory(directory)
+    assert [template.name for template in templates] == ["first", "renamed", "third"]
+    assert parsed == ["first.yaml", "second.yaml"]
+
+
+def test_cache_drops_deleted_files(tmp_path: Path, parsed: list[str]) -> None:
+    directory = tmp_path / "templates"
+    write_templates(directory, "first", "second")
+    TemplateReader.read_directory(directory)
+
+    (directory / "second.yaml").unlink()
+    assert [template.name for template in TemplateReader.read_directory(directory)] == ["first"]
+    assert list(TemplateCache.load(directory).entries) == ["first.yaml"]
+
+
+def test_cache_written_by_other_models_is_ignored(
+    tmp_path: Path, parsed: list[str], monkeypatch: pytest.MonkeyPatch
+) -> None:
+    directory = tmp_path / "templates"
+    write_templates(directory, "first")
+    TemplateReader.read_directory(directory)
+    assert TemplateCache.load(directory).entries
+
+    # The models changed since the cache was written
+    monkeypatch.setattr(cache, "get_cache_key", lambda: (cache.TEMPLATE_CACHE_VERSION, "other"))
+    assert not TemplateCache.load(directory).entries
+    parsed.clear()
+    TemplateReader.read_directory(directory)
+    assert parsed == ["first.yaml"]
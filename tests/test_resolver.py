@@ -0,0 +1,176 @@
+import logging
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any, ClassVar
+
+import pytest
+from yt_dlp.extractor.common import InfoExtractor
+
+from yt2navidrome.downloader.planner import DownloadPlan, DownloadPlanner, PlannedVideo
+from yt2navidrome.downloader.playlist import PlaylistUtils
+from yt2navidrome.downloader.resolver import AsyncResolver
+from yt2navidrome.downloader.session import YoutubeDLSession
+from yt2navidrome.downloader.snapshot import SnapshotEntry
+from yt2navidrome.template.models import MetadataParser, Template
+
+WORKERS = 3
+WAIT_TIMEOUT = 10  # Only reached if the test fails, so that it does not hang
+
+
+class GenericIE(InfoExtractor):
+    """
+    Local stub extractor, blocked until the gate of its video (if any) is opened. Counts concurrent extractions.
+    When `saturation` is set, other extractions wait for that many extractions to run at once.
+    """
+
+    _VALID_URL = r"https?://stub\.invalid/watch\?v=(?P<id>[\w-]+)"
+
+    lock = threading.Lock()
+    running = 0
+    max_running = 0
+    saturation = 0
+    saturated = threading.Event()
+    gates: ClassVar[dict[str, threading.Event]] = {}
+    finished: ClassVar[dict[str, threading.Event]] = {}
+
+    def _real_extract(self, url: str) -> dict[str, Any]:
+        video_id = self._match_id(url)
+        with GenericIE.lock:
+            GenericIE.running += 1
+            GenericIE.max_running = max(GenericIE.max_running, GenericIE.running)
+            if GenericIE.saturation and GenericIE.running >= GenericIE.saturation:
+                GenericIE.saturated.set()
+
+        try:
+            if video_id in GenericIE.gates:
+                assert GenericIE.gates[video_id].wait(WAIT_TIMEOUT)
+            elif GenericIE.saturation:
+                assert GenericIE.saturated.wait(WAIT_TIMEOUT)
+        finally:
+            with GenericIE.lock:
+                GenericIE.running -= 1
+            if video_id in GenericIE.finished:
+                GenericIE.finished[video_id].set()
+
+        return {
+            "id": video_id,
+            "title": f"Title {video_id}",
+            "uploader": "Stub Uploader",
+            "description": f"Description {video_id}",
+            "url": url,
+            "ext": "m4a",
+        }
+
+
+@pytest.fixture
+def stub_extractor(monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    monkeypatch.setattr(YoutubeDLSession, "_extractors", [GenericIE])
+    monkeypatch.setattr(GenericIE, "gates", {})
+    monkeypatch.setattr(GenericIE, "finished", {})
+    monkeypatch.setattr(GenericIE, "saturated", threading.Event())
+    YoutubeDLSession.close_all()
+    GenericIE.saturation = 0
+    GenericIE.max_running = 0
+    yield
+    # Release extractions still blocked (e.g. after a failed assertion)
+    for gate in GenericIE.gates.values():
+        gate.set()
+    AsyncResolver.close_all()
+    YoutubeDLSession.close_all()
+
+
+def stub_url(video_id: str) -> str:
+    return f"https://stub.invalid/watch?v={video_id}"
+
+
+@pytest.mark.usefixtures("stub_extractor")
+def test_submit_runs_workers_at_once(tmp_path: Path) -> None:
+    urls = [stub_url(f"video{idx}") for idx in range(8)]
+    # The first extraction only returns once all others are done, the others wait for all workers to be busy
+    GenericIE.gates["video0"] = threading.Event()
+    GenericIE.saturation = WORKERS
+
+    with AsyncResolver(workers=WORKERS, timeout=None) as resolver:
+        futures = [resolver.submit(url, tmp_path) for url in urls]
+        for future in futures[1:]:
+            assert future.result(WAIT_TIMEOUT)
+
+        # The slowest extraction does not hold back the others
+        assert not futures[0].done()
+        GenericIE.gates["video0"].set()
+        assert futures[0].result(WAIT_TIMEOUT)
+
+    assert GenericIE.max_running == WORKERS
+
+
+@pytest.mark.usefixtures("stub_extractor")
+def test_iter_missing_videos_keeps_order_and_skips_timeouts(tmp_path: Path) -> None:
+    entries = [SnapshotEntry(video_id=f"video{idx}", url=stub_url(f"video{idx}")) for idx in range(4)]
+    GenericIE.gates["video1"] = threading.Event()
+    GenericIE.finished["video1"] = threading.Event()
+
+    videos = list(PlaylistUtils.iter_missing_videos(entries, tmp_path, workers=2, timeout=1))
+
+    # The timed out extraction is not waited for: it is still blocked once all videos were yielded
+    assert not GenericIE.finished["video1"].is_set()
+    assert [video.url for video in videos] == [entries[idx].url for idx in (0, 2, 3)]
+    assert entries[0].title == "Title video0"  # Resolved info is stored back into the entries
+    assert entries[1].title is None
+
+
+@pytest.mark.usefixtures("stub_extractor")
+def test_iter_missing_videos_reuses_resolver(tmp_path: Path) -> None:
+    resolvers = []
+    for idx in range(3):
+        entries = [SnapshotEntry(video_id=f"video{idx}", url=stub_url(f"video{idx}"))]
+        assert [video.url for video in PlaylistUtils.iter_missing_videos(entries, tmp_path, workers=2)] == [
+            entries[0].url
+        ]
+        resolvers.append(AsyncResolver.shared(workers=2))
+
+    assert all(resolver is resolvers[0] for resolver in resolvers)
+    assert sum(1 for thread in threading.enumerate() if thread.name == "resolver") == 1
+
+    AsyncResolver.close_all()
+    assert resolvers[0].closed
+    assert AsyncResolver.shared(workers=2) is not resolvers[0]
+
+
+@pytest.mark.usefixtures("stub_extractor")
+def test_stream_videos_extracts_parsed_descriptions(tmp_path: Path) -> None:
+    plan = DownloadPlan()
+    for idx, source in enumerate(["description", "title", "tags"]):
+        template = Template(
+            name=source,
+            url=f"https://stub.invalid/playlist?list={source}",
+            playlist=True,
+            parsers=[MetadataParser(source=source, pattern=r"(?P<album>.+)")],
+        )
+        # Complete playlist entries, without description
+        entry = SnapshotEntry(video_id=f"video{idx}", url=stub_url(f"video{idx}"), title="Flat title", uploader="Flat")
+        plan.videos[entry.video_id] = PlannedVideo(entry.video_id, [entry], [template])
+
+    videos = [video for video, _ in DownloadPlanner.stream_videos(plan, tmp_path, workers=2)]
+
+    # Only the video whose template parses the description is extracted, before being parsed
+    assert [video.title for video in videos] == ["Title video0", "Flat title", "Flat title"]
+    assert [video.description for video in videos] == ["Description video0", None, None]
+
+
+@pytest.mark.usefixtures("stub_extractor")
+def test_close_with_running_extraction(tmp_path: Path, caplog: pytest.LogCaptureFixture) -> None:
+    GenericIE.gates["video0"] = threading.Event()
+    GenericIE.finished["video0"] = threading.Event()
+
+    resolver = AsyncResolver(workers=1, timeout=0.1)
+    assert resolver.submit(stub_url("video0"), tmp_path).result() is None  # Timed out
+    resolver.close()
+
+    # The extraction finishing after the loop was closed must not post to it
+    with caplog.at_level(logging.ERROR):
+        GenericIE.gates["video0"].set()
+        assert GenericIE.finished["video0"].wait(WAIT_TIMEOUT)
+        resolver._executor.shutdown(wait=True)
+
+    assert not [record for record in caplog.records if record.levelno >= logging.ERROR]
@@ -0,0 +1,78 @@
+import os
+from pathlib import Path
+
+from click.testing import CliRunner
+
+from bench.fixtures import make_m4a
+from yt2navidrome.commands.scan import scan
+from yt2navidrome.config import DEFAULT_TITLE
+from yt2navidrome.downloader.scan import LibraryScanner, ScanCache
+from yt2navidrome.utils.mp4 import MP4TagWriter
+
+
+def write_track(output_dir: Path, relative_path: str, tags: dict[str, str]) -> Path:
+    path = output_dir / relative_path
+    path.parent.mkdir(parents=True, exist_ok=True)
+    path.write_bytes(make_m4a())
+    MP4TagWriter.write_tags(path, tags)
+    return path
+
+
+def test_scan_report_and_cache(tmp_path: Path) -> None:
+    album = {"album": "Live", "album_artist": "Band"}
+    write_track(tmp_path, "band/a/One.m4a", {"artist": "Band", "title": "One", **album})
+    write_track(tmp_path, "band/b/Two.m4a", {"artist": "Band", "title": DEFAULT_TITLE, "album": "Live"})
+    write_track(tmp_path, "other/c/Three.m4a", {"artist": "Other", "title": "Three", "album": "Live"})
+    untagged = write_track(tmp_path, "other/d/Four.m4a", {})
+    (tmp_path / ".yt2navidrome").mkdir()
+    (tmp_path / ".yt2navidrome" / "ignored.m4a").write_bytes(b"")
+
+    report = LibraryScanner.scan(tmp_path, workers=2)
+    assert (report.files, report.read) == (4, 4)
+    assert report.missing == {os.path.join("other", "d", "Four.m4a"): ["artist", "title", "album"]}
+    assert report.placeholders == {os.path.join("band", "b", "Two.m4a"): ["title"]}
+    assert report.album_artists == {("band", "Live"): {"Band": 1, "": 1}}  # Other has a "Live" album of its own
+
+    # Only the modified file is read again
+    MP4TagWriter.write_tags(untagged, {"artist": "Other", "title": "Four", "album": "Other"})
+    report = LibraryScanner.scan(tmp_path, workers=2)
+    assert (report.files, report.read) == (4, 1)
+    assert not report.missing
+    assert report.placeholders == {os.path.join("band", "b", "Two.m4a"): ["title"]}
+
+
+def test_same_named_albums_in_different_directories(tmp_path: Path) -> None:
+    for artist in ("First", "Second"):
+        for title in ("One", "Two"):
+            tags = {"artist": artist, "title": title, "album": "Greatest Hits", "album_artist": artist}
+            write_track(tmp_path, f"{artist.lower()}/{title.lower()}/{title}.m4a", tags)
+
+    report = LibraryScanner.scan(tmp_path, workers=2, use_cache=False)
+    assert report.files == 4
+    assert not report.album_artists
+    assert report.issues == 0
+
+
+def test_deleted_files_are_dropped_from_cache(tmp_path: Path) -> None:
+    write_track(tmp_path, "band/a/One.m4a", {"artist": "Band", "title": "One", "album": "Live"})
+    deleted = write_track(tmp_path, "band/b/Two.m4a", {"artist": "Band", "title": "Two", "album": "Live"})
+    LibraryScanner.scan(tmp_path, workers=2)
+    assert len(ScanCache.load(tmp_path).entries) == 2
+
+    deleted.unlink()
+    LibraryScanner.scan(tmp_path, workers=2)
+    assert list(ScanCache.load(tmp_path).entries) == [os.path.join("band", "a", "One.m4a")]
+
+
+def test_scan_exit_status(tmp_path: Path) -> None:
+    tags = {"artist": "Band", "title": "One", "album": "Live", "album_artist": "Band"}
+    write_track(tmp_path, "band/a/One.m4a", tags)
+    result = CliRunner().invoke(scan, ["--output", str(tmp_path)])
+    assert result.exit_code == 0
+    assert result.output.endswith("0 issues\n")
+
+    # Issues make the command fail, so that scans can be scripted
+    write_track(tmp_path, "band/b/Two.m4a", {**tags, "title": DEFAULT_TITLE})
+    result = CliRunner().invoke(scan, ["--output", str(tmp_path)])
+    assert result.exit_code == 1
+    assert "Placeholder tags (1 files)" in result.output
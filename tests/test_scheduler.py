@@ -0,0 +1,79 @@
+import pytest
+
+from yt2navidrome.utils import scheduler
+from yt2navidrome.utils.scheduler import JitterScheduler
+
+
+class FakeClock:
+    """Stub of the time module, advanced by the tests"""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    fake_clock = FakeClock()
+    monkeypatch.setattr(scheduler, "time", fake_clock)
+    return fake_clock
+
+
+def test_jitter_bounds() -> None:
+    jobs: JitterScheduler[str] = JitterScheduler(jitter=0.1)
+    intervals = [jobs.jittered(100) for _ in range(1000)]
+
+    assert all(90 <= interval <= 110 for interval in intervals)
+    # Shifted both ways, not always by the same amount
+    assert min(intervals) < 95
+    assert max(intervals) > 105
+    assert JitterScheduler[str](jitter=0).jittered(100) == 100
+
+
+def test_pop_due_in_order(clock: FakeClock) -> None:
+    jobs: JitterScheduler[str] = JitterScheduler()
+    jobs.schedule("late", 30)
+    jobs.schedule("early", 10)
+    jobs.schedule("middle", 20)
+    assert len(jobs) == 3
+    assert jobs.next_delay() == 10
+    assert jobs.pop_due() == []
+
+    clock.now += 25
+    assert jobs.pop_due() == ["early", "middle"]
+    assert "early" not in jobs
+    assert jobs.next_delay() == 5
+
+    clock.now += 10
+    assert jobs.next_delay() == 0
+    assert jobs.pop_due() == ["late"]
+    assert jobs.next_delay() is None
+
+
+def test_reschedule_and_cancel(clock: FakeClock) -> None:
+    jobs: JitterScheduler[str] = JitterScheduler()
+    jobs.schedule("first", 10)
+    jobs.schedule("second", 20)
+
+    # Rescheduled: its previous entry is stale
+    jobs.schedule("first", 30)
+    assert len(jobs) == 2
+    assert jobs.next_delay() == 20
+
+    jobs.cancel("second")
+    jobs.cancel("unknown")
+    assert jobs.next_delay() == 30
+
+    clock.now += 30
+    assert jobs.pop_due() == ["first"]
+    assert len(jobs) == 0
+
+
+def test_schedule_next_is_jittered(clock: FakeClock, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(scheduler.random, "uniform", lambda low, high: high)
+    jobs: JitterScheduler[str] = JitterScheduler(jitter=0.2)
+
+    jobs.schedule_next("job", 100)
+    assert jobs.next_delay() == pytest.approx(120)
@@ -0,0 +1,155 @@
+import threading
+import time
+from pathlib import Path
+
+import pytest
+
+from yt2navidrome.commands import serve
+from yt2navidrome.commands.download import DownloadOptions
+from yt2navidrome.commands.serve import TemplateScheduler
+from yt2navidrome.config import SERVE_STARTUP_SPREAD
+from yt2navidrome.downloader.snapshot import PlaylistSnapshot
+from yt2navidrome.template import cache
+from yt2navidrome.template.models import Template
+from yt2navidrome.utils import scheduler
+
+DEFAULT_INTERVAL = 6 * 3600
+
+TEMPLATE = """!Template
+name: {name}
+url: https://stub.invalid/playlist?list={name}
+playlist: true
+parsers: []
+"""
+
+
+class FakeClock:
+    """Stub of the time module of the scheduler, advanced by the tests"""
+
+    def __init__(self) -> None:
+        self.now = 1000.0
+
+    def monotonic(self) -> float:
+        return self.now
+
+
+@pytest.fixture
+def clock(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> FakeClock:
+    fake_clock = FakeClock()
+    monkeypatch.setattr(scheduler, "time", fake_clock)
+    monkeypatch.setattr(cache, "CACHE_DIR", str(tmp_path / "cache"))
+    return fake_clock
+
+
+@pytest.fixture
+def synced(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """Stub process_template, and record the names of the synced templates"""
+    names: list[str] = []
+
+    def process_template(template: Template, output_dir: Path, options: DownloadOptions) -> None:
+        names.append(template.name)
+
+    monkeypatch.setattr(serve, "process_template", process_template)
+    return names
+
+
+def write_template(input_dir: Path, name: str, extra: str = "") -> Path:
+    input_dir.mkdir(exist_ok=True)
+    path = input_dir / f"{name}.yaml"
+    path.write_text(TEMPLATE.format(name=name) + extra)
+    return path
+
+
+def make_scheduler(tmp_path: Path, jitter: float = 0) -> TemplateScheduler:
+    return TemplateScheduler(tmp_path / "input", tmp_path / "output", DEFAULT_INTERVAL, jitter)
+
+
+def test_templates_are_spread_on_startup(tmp_path: Path, clock: FakeClock, monkeypatch: pytest.MonkeyPatch) -> None:
+    spreads: list[tuple[float, float]] = []
+
+    def uniform(low: float, high: float) -> float:
+        spreads.append((low, high))
+        return high
+
+    monkeypatch.setattr(serve.random, "uniform", uniform)
+    write_template(tmp_path / "input", "default")
+    write_template(tmp_path / "input", "frequent", "refresh_interval: 1m\n")
+
+    template_scheduler = make_scheduler(tmp_path)
+    template_scheduler.reload_if_changed()
+
+    # Over the startup window, or the interval if shorter
+    assert spreads == [(0, SERVE_STARTUP_SPREAD), (0, 60)]
+    assert template_scheduler.scheduler.next_delay() == 60
+    clock.now += SERVE_STARTUP_SPREAD
+    assert template_scheduler.scheduler.pop_due() == [
+        ("frequent", "https://stub.invalid/playlist?list=frequent"),
+        ("default", "https://stub.invalid/playlist?list=default"),
+    ]
+
+
+def test_recent_syncs_resume_their_schedule(tmp_path: Path, clock: FakeClock) -> None:
+    write_template(tmp_path / "input", "recent")
+    url = "https://stub.invalid/playlist?list=recent"
+    PlaylistSnapshot(url=url, title="Recent", fetched_at=time.time() - 3600).save(tmp_path / "output")
+
+    template_scheduler = make_scheduler(tmp_path)
+    template_scheduler.reload_if_changed()
+
+    # Synced an hour ago: next sync one interval after it
+    delay = template_scheduler.scheduler.next_delay()
+    assert delay == pytest.approx(DEFAULT_INTERVAL - 3600, abs=60)
+
+
+def test_reload_on_change(tmp_path: Path, clock: FakeClock, monkeypatch: pytest.MonkeyPatch) -> None:
+    monkeypatch.setattr(serve.random, "uniform", lambda low, high: high)
+    input_dir = tmp_path / "input"
+    first = write_template(input_dir, "first")
+    write_template(input_dir, "second")
+    template_scheduler = make_scheduler(tmp_path)
+    template_scheduler.reload_if_changed()
+    first_key = ("first", "https://stub.invalid/playlist?list=first")
+    assert set(template_scheduler.templates) == {first_key, ("second", "https://stub.invalid/playlist?list=second")}
+
+    # Modified: the template is updated but keeps its schedule. Removed: unscheduled. Added: scheduled.
+    clock.now += 100
+    first.write_text(TEMPLATE.format(name="first") + "refresh_interval: 2h\n")
+    (input_dir / "second.yaml").unlink()
+    write_template(input_dir, "third")
+    template_scheduler.reload_if_changed()
+
+    assert set(template_scheduler.templates) == {first_key, ("third", "https://stub.invalid/playlist?list=third")}
+    assert template_scheduler.templates[first_key].refresh_seconds == 7200
+    assert len(template_scheduler.scheduler) == 2
+    assert template_scheduler.scheduler.next_delay() == SERVE_STARTUP_SPREAD - 100
+    clock.now += SERVE_STARTUP_SPREAD - 100
+    assert template_scheduler.scheduler.pop_due() == [first_key]
+
+    # Unchanged files are not read again
+    template_scheduler.templates = {}
+    template_scheduler.reload_if_changed()
+    assert template_scheduler.templates == {}
+
+
+def test_run_due_schedules_next_sync(tmp_path: Path, clock: FakeClock, synced: list[str]) -> None:
+    write_template(tmp_path / "input", "first", "refresh_interval: 1h\n")
+    write_template(tmp_path / "input", "second")
+    template_scheduler = make_scheduler(tmp_path)
+    template_scheduler.reload_if_changed()
+    stop = threading.Event()
+
+    assert template_scheduler.run_due(DownloadOptions(), stop) == 0
+    clock.now += SERVE_STARTUP_SPREAD
+    assert template_scheduler.run_due(DownloadOptions(), stop) == 2
+    assert sorted(synced) == ["first", "second"]
+
+    # Next syncs one interval later (no jitter)
+    clock.now += 3600
+    assert template_scheduler.run_due(DownloadOptions(), stop) == 1
+    assert synced[-1] == "first"
+
+    # Stopping: due templates are not synced
+    clock.now += DEFAULT_INTERVAL
+    stop.set()
+    assert template_scheduler.run_due(DownloadOptions(), stop) == 0
+    assert len(synced) == 3
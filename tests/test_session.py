@@ -0,0 +1,141 @@
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from http.cookiejar import Cookie
+from pathlib import Path
+from typing import Any
+
+import pytest
+from yt_dlp import YoutubeDL
+from yt_dlp.extractor.common import InfoExtractor
+
+from yt2navidrome.downloader import session
+from yt2navidrome.downloader.session import INFO_PROFILE, YoutubeDLSession
+from yt2navidrome.downloader.video import VideoUtils
+
+CALLS = 20
+COOKIE = "stub.invalid\tFALSE\t/\tFALSE\t0\tsession\tfrom-file\n"
+
+
+class GenericIE(InfoExtractor):
+    """Local stub extractor. Named after yt-dlp's generic extractor since our profiles force it"""
+
+    _VALID_URL = r"https?://stub\.invalid/watch\?v=(?P<id>[\w-]+)"
+
+    def _real_extract(self, url: str) -> dict[str, Any]:
+        video_id = self._match_id(url)
+        return {
+            "id": video_id,
+            "title": f"Title {video_id}",
+            "uploader": "Stub Uploader",
+            "formats": [
+                {"url": f"http://stub.invalid/{video_id}.m4a", "ext": "m4a", "acodec": "mp4a", "vcodec": "none"}
+            ],
+        }
+
+
+@pytest.fixture
+def stub_extractor(monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    monkeypatch.setattr(YoutubeDLSession, "_extractors", [GenericIE])
+    YoutubeDLSession.close_all()
+    yield
+    YoutubeDLSession.close_all()
+
+
+def stub_url(idx: int) -> str:
+    return f"https://stub.invalid/watch?v=video{idx}"
+
+
+@pytest.mark.usefixtures("stub_extractor")
+def test_session_is_reused() -> None:
+    with YoutubeDLSession.borrow(INFO_PROFILE) as first:
+        pass
+    with YoutubeDLSession.borrow(INFO_PROFILE) as second:
+        assert second is first
+
+
+@pytest.mark.usefixtures("stub_extractor")
+def test_process_video_url_with_stub_extractor(tmp_path: Path) -> None:
+    video = VideoUtils.process_video_url(stub_url(1), tmp_path, check_if_exists=False)
+
+    assert video is not None
+    assert video.title == "Title video1"
+    assert video.uploader == "Stub Uploader"
+
+
+@pytest.mark.usefixtures("stub_extractor")
+def test_sequential_requests_share_one_instance(monkeypatch: pytest.MonkeyPatch) -> None:
+    created = []
+    create = YoutubeDLSession.create
+
+    def counting_create(profile: str, format_selector: str | None = None) -> YoutubeDL:
+        ydl = create(profile, format_selector)
+        created.append(ydl)
+        return ydl
+
+    monkeypatch.setattr(YoutubeDLSession, "create", counting_create)
+
+    for idx in range(CALLS):
+        with YoutubeDLSession.borrow(INFO_PROFILE) as ydl:
+            assert ydl.extract_info(stub_url(idx), download=False)["title"] == f"Title video{idx}"
+
+    # Nested requests need a second instance, then both are reused
+    for _ in range(CALLS):
+        with YoutubeDLSession.borrow(INFO_PROFILE) as first, YoutubeDLSession.borrow(INFO_PROFILE) as second:
+            assert first is not second
+
+    assert len(created) == 2
+
+
+@pytest.mark.usefixtures("stub_extractor")
+def test_cookie_jar_is_shared(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    cookie_file = tmp_path / "cookies.txt"
+    cookie_file.write_text(f"# Netscape HTTP Cookie File\n{COOKIE}")
+    monkeypatch.setattr(session, "get_cookie_file", lambda: str(cookie_file))
+    url = stub_url(1)
+
+    with YoutubeDLSession.borrow(INFO_PROFILE) as first, YoutubeDLSession.borrow(INFO_PROFILE) as second:
+        assert first.cookiejar is second.cookiejar
+        assert second.cookiejar.get_cookie_header(url) == "session=from-file"
+
+        # Cookies received by a request are sent by the others
+        first.cookiejar.set_cookie(
+            Cookie(
+                0,
+                "token",
+                "set",
+                None,
+                False,
+                "stub.invalid",
+                False,
+                False,
+                "/",
+                True,
+                False,
+                None,
+                True,
+                None,
+                None,
+                {},
+            )
+        )
+        assert second.cookiejar.get_cookie_header(url) == "session=from-file; token=set"
+
+    # Saved to the cookie file on close, and loaded again by the next sessions
+    YoutubeDLSession.close_all()
+    assert "\ttoken\tset" in cookie_file.read_text()
+    with YoutubeDLSession.borrow(INFO_PROFILE) as ydl:
+        assert ydl.cookiejar.get_cookie_header(url) == "session=from-file; token=set"
+
+
+@pytest.mark.usefixtures("stub_extractor")
+def test_sessions_outlive_thread_pools() -> None:
+    # Each sync of serve runs in new pools: their threads reuse the same instances
+    def extract(idx: int) -> None:
+        with YoutubeDLSession.borrow(INFO_PROFILE) as ydl:
+            ydl.extract_info(stub_url(idx), download=False)
+
+    for _ in range(5):
+        with ThreadPoolExecutor(max_workers=4) as executor:
+            list(executor.map(extract, range(8)))
+
+    assert len(YoutubeDLSession._instances) <= 4
@@ -0,0 +1,130 @@
+import json
+import logging
+import time
+from collections.abc import Iterator
+from pathlib import Path
+from typing import Any, ClassVar
+
+import pytest
+from yt_dlp.extractor.common import InfoExtractor
+
+from yt2navidrome.downloader.index import LibraryIndex
+from yt2navidrome.downloader.models import Video
+from yt2navidrome.downloader.playlist import PlaylistUtils
+from yt2navidrome.downloader.session import YoutubeDLSession
+from yt2navidrome.downloader.snapshot import PlaylistSnapshot, SnapshotEntry
+
+PLAYLIST_URL = "https://stub.invalid/playlist?list=stub"
+
+
+def stub_url(video_id: str) -> str:
+    return f"https://stub.invalid/watch?v={video_id}"
+
+
+class GenericIE(InfoExtractor):
+    """Local stub extractor of a playlist whose flat entries only carry their URL"""
+
+    _VALID_URL = r"https?://stub\.invalid/playlist\?list=(?P<id>[\w-]+)"
+
+    video_ids: ClassVar[list[str]] = []
+    fetches = 0
+
+    def _real_extract(self, url: str) -> dict[str, Any]:
+        GenericIE.fetches += 1
+        entries = [{"_type": "url", "url": stub_url(video_id), "id": video_id} for video_id in GenericIE.video_ids]
+        return self.playlist_result(entries, playlist_id=self._match_id(url), playlist_title="Stub playlist")
+
+
+@pytest.fixture
+def stub_playlist(monkeypatch: pytest.MonkeyPatch) -> Iterator[list[str]]:
+    """Video IDs of the stub playlist, in playlist order"""
+    monkeypatch.setattr(YoutubeDLSession, "_extractors", [GenericIE])
+    monkeypatch.setattr(GenericIE, "video_ids", [])
+    monkeypatch.setattr(GenericIE, "fetches", 0)
+    YoutubeDLSession.close_all()
+    yield GenericIE.video_ids
+    YoutubeDLSession.close_all()
+
+
+def make_snapshot(*video_ids: str) -> PlaylistSnapshot:
+    entries = [SnapshotEntry(video_id=video_id, url=stub_url(video_id)) for video_id in video_ids]
+    return PlaylistSnapshot(url=PLAYLIST_URL, title="Stub playlist", entries=entries)
+
+
+def test_save_and_load(tmp_path: Path) -> None:
+    snapshot = make_snapshot("video0", "video1")
+    snapshot.entries[0].update(Video(url=stub_url("video0"), title="Title", uploader="Uploader", tags=("rock",)))
+    snapshot.save(tmp_path)
+
+    assert PlaylistSnapshot.load(tmp_path, PLAYLIST_URL) == snapshot
+    assert PlaylistSnapshot.load(tmp_path, "https://stub.invalid/playlist?list=other") is None
+
+    # Snapshots of another version, or which can not be read, are ignored
+    path = PlaylistSnapshot.get_path(tmp_path, PLAYLIST_URL)
+    data = json.loads(path.read_text())
+    path.write_text(json.dumps({**data, "version": 0}))
+    assert PlaylistSnapshot.load(tmp_path, PLAYLIST_URL) is None
+    path.write_text(json.dumps({**data, "entries": [{"video_id": "video0"}]}))
+    assert PlaylistSnapshot.load(tmp_path, PLAYLIST_URL) is None
+    path.write_text("{")
+    assert PlaylistSnapshot.load(tmp_path, PLAYLIST_URL) is None
+
+
+def test_etag_and_diff() -> None:
+    snapshot = make_snapshot("video0", "video1", "video2")
+
+    assert snapshot.etag == make_snapshot("video0", "video1", "video2").etag
+    assert snapshot.etag != make_snapshot("video1", "video0", "video2").etag  # Moved
+    assert snapshot.diff(make_snapshot("video0", "video1", "video2")) == ([], [])
+    assert snapshot.diff(make_snapshot("video3", "video1")) == (["video0", "video2"], ["video3"])
+
+
+def test_fetch_reuses_known_entries(tmp_path: Path, stub_playlist: list[str], caplog: pytest.LogCaptureFixture) -> None:
+    stub_playlist.extend(["video0", "video1"])
+    first = PlaylistUtils.fetch_snapshot(PLAYLIST_URL, None)
+    assert first
+    assert [entry.to_video() for entry in first.entries] == [None, None]
+
+    # Resolved by the first run
+    first.entries[0].update(Video(url=stub_url("video0"), title="Title", uploader="Uploader"))
+
+    with caplog.at_level(logging.INFO):
+        unchanged = PlaylistUtils.fetch_snapshot(PLAYLIST_URL, first)
+    assert unchanged
+    assert unchanged.etag == first.etag
+    assert unchanged.entries == first.entries  # Resolved info is not extracted again
+    assert "Playlist unchanged" in caplog.text
+
+    stub_playlist[:] = ["video2", "video0"]
+    with caplog.at_level(logging.INFO):
+        changed = PlaylistUtils.fetch_snapshot(PLAYLIST_URL, first)
+    assert changed
+    assert changed.etag != first.etag
+    assert changed.entries[1] == first.entries[0]
+    assert "1 added, 1 removed" in caplog.text
+
+
+def test_missing_entries_max_age(tmp_path: Path, stub_playlist: list[str]) -> None:
+    stub_playlist.extend(["video0", "video1", "video2"])
+    LibraryIndex.open(tmp_path).add("video1", tmp_path / "video1.m4a", "Uploader", "Title")
+
+    missing = PlaylistUtils.get_missing_entries(PLAYLIST_URL, tmp_path)
+    assert missing
+    snapshot, entries = missing
+    assert [entry.video_id for entry in entries] == ["video0", "video2"]
+    snapshot.save(tmp_path)
+
+    # A recent snapshot is used as is
+    stub_playlist.append("video3")
+    missing = PlaylistUtils.get_missing_entries(PLAYLIST_URL, tmp_path, max_age=3600)
+    assert missing
+    assert [entry.video_id for entry in missing[1]] == ["video0", "video2"]
+    assert GenericIE.fetches == 1
+
+    # An older one is fetched again
+    snapshot.fetched_at = time.time() - 7200
+    snapshot.save(tmp_path)
+    missing = PlaylistUtils.get_missing_entries(PLAYLIST_URL, tmp_path, max_age=3600)
+    assert missing
+    assert [entry.video_id for entry in missing[1]] == ["video0", "video2", "video3"]
+    assert GenericIE.fetches == 2
@@ -0,0 +1,40 @@
+import importlib
+import subprocess
+import sys
+
+import click
+import pytest
+from click.testing import CliRunner
+
+from yt2navidrome.commands import COMMANDS
+from yt2navidrome.main import cli
+
+HEAVY_MODULES = ["yt_dlp", "ffmpeg_downloader", "yaml"]
+
+
+def load_command(path: str) -> click.Command:
+    module_name, attr_name = path.split(":")
+    command: click.Command = getattr(importlib.import_module(module_name), attr_name)
+    return command
+
+
+def test_help_lists_commands_as_click() -> None:
+    # Same listing as a group whose commands are all imported
+    group = click.Group(commands={name: load_command(command.path) for name, command in COMMANDS.items()})
+    expected = group.get_help(click.Context(group)).split("Commands:")[1]
+
+    output = CliRunner().invoke(cli, ["--help"]).output
+    assert output.split("Commands:")[1].rstrip() == expected.rstrip()
+    assert "  index     Manage the library index of an output directory\n" in output
+
+
+@pytest.mark.parametrize("args", [["--help"], ["--quiet", "edit", "--help"], ["--quiet", "jobs", "--help"]])
+def test_heavy_modules_not_imported(args: list[str]) -> None:
+    code = (
+        "import sys\n"
+        "from yt2navidrome.main import cli\n"
+        f"cli.main({args!r}, standalone_mode=False)\n"
+        f"print('imported:', ','.join(module for module in {HEAVY_MODULES!r} if module in sys.modules))\n"
+    )
+    result = subprocess.run([sys.executable, "-c", code], capture_output=True, text=True, check=True)  # noqa: S603
+    assert result.stdout.splitlines()[-1] == "imported: "
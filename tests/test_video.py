@@ -0,0 +1,123 @@
+import subprocess as sp
+import threading
+from collections.abc import Iterator
+from pathlib import Path
+
+import pytest
+from yt_dlp.utils import DownloadError
+
+from bench.fixtures import make_m4a
+from yt2navidrome.commands.download import DownloadOptions, process_job
+from yt2navidrome.downloader.formats import FORMAT_PROFILES, FormatProfile, get_format_chain
+from yt2navidrome.downloader.journal import JobJournal, JobState
+from yt2navidrome.downloader.models import Video
+from yt2navidrome.downloader.video import VideoUtils
+from yt2navidrome.utils.ffmpeg import FFmpegInstaller, FFmpegTranscoder, transcoder
+
+VIDEO = Video(url="https://stub.invalid/watch?v=video0", title="Song", uploader="Uploader")
+METADATA = {"title": "Song", "artist": "Artist", "album": "Album"}
+WAIT_TIMEOUT = 10  # Only reached if the test fails, so that it does not hang
+
+# Messages of the errors raised by yt-dlp
+FORMAT_UNAVAILABLE = "ERROR: [stub] video0: Requested format is not available"
+VIDEO_UNAVAILABLE = "ERROR: [stub] video0: Video unavailable"
+
+
+@pytest.fixture
+def pool(monkeypatch: pytest.MonkeyPatch) -> Iterator[None]:
+    """Start a transcoding pool of 2 workers for the test (ffmpeg itself is stubbed by the tests)"""
+    monkeypatch.setattr(transcoder, "TRANSCODE_WORKERS", 2)
+    monkeypatch.setattr(FFmpegTranscoder, "_executor", None)
+    monkeypatch.setattr(FFmpegInstaller, "get_ffmpeg_path", classmethod(lambda cls: "ffmpeg"))
+    yield
+    FFmpegTranscoder.shutdown()
+
+
+@pytest.fixture
+def downloaded_profiles(monkeypatch: pytest.MonkeyPatch) -> list[str]:
+    """Stub VideoUtils.download_format: only the aac and mp3 profiles are available"""
+    profiles: list[str] = []
+
+    def download_format(video: Video, path_no_ext: Path, profile: FormatProfile, embed_thumbnail: bool) -> Path | None:
+        profiles.append(profile.name)
+        if profile.name not in ("aac", "mp3"):
+            raise DownloadError(FORMAT_UNAVAILABLE)
+        path = path_no_ext.with_suffix(".webm")
+        path.write_bytes(make_m4a())
+        return path
+
+    monkeypatch.setattr(VideoUtils, "download_format", download_format)
+    return profiles
+
+
+def test_download_falls_back_to_next_profile(tmp_path: Path, downloaded_profiles: list[str]) -> None:
+    downloaded = VideoUtils.download(VIDEO, tmp_path, formats=get_format_chain(["m4a", "opus", "aac", "mp3"]))
+
+    # Profiles are tried in order until one is available
+    assert downloaded
+    download_path, profile = downloaded
+    assert downloaded_profiles == ["m4a", "opus", "aac"]
+    assert profile == FORMAT_PROFILES["aac"]
+    assert download_path == tmp_path / "Uploader" / "video0" / "Song.webm"
+
+
+def test_download_stops_on_other_errors(tmp_path: Path, monkeypatch: pytest.MonkeyPatch) -> None:
+    profiles: list[str] = []
+
+    def download_format(video: Video, path_no_ext: Path, profile: FormatProfile, embed_thumbnail: bool) -> Path | None:
+        profiles.append(profile.name)
+        raise DownloadError(VIDEO_UNAVAILABLE)
+
+    monkeypatch.setattr(VideoUtils, "download_format", download_format)
+    assert VideoUtils.download(VIDEO, tmp_path, formats=get_format_chain(["m4a", "aac"])) is None
+    assert profiles == ["m4a"]
+
+
+def test_failed_conversion_leaves_job_queued(
+    tmp_path: Path, downloaded_profiles: list[str], pool: None, monkeypatch: pytest.MonkeyPatch
+) -> None:
+    def run_transcode(command: list[str]) -> float:
+        Path(command[-1]).write_bytes(b"partial")
+        raise sp.CalledProcessError(1, command, stderr=b"Invalid data found when processing input")
+
+    monkeypatch.setattr(transcoder, "run_transcode", run_transcode)
+    journal = JobJournal.open(tmp_path)
+    (job,) = journal.enqueue("https://stub.invalid/playlist?list=source", [VIDEO], [METADATA])
+
+    process_job(job, tmp_path, DownloadOptions(formats=("aac",)))
+
+    recorded = journal.get("video0")
+    assert recorded
+    assert recorded.state == JobState.QUEUED
+    assert recorded.error == "Conversion failed"
+    # The partial output is removed, the downloaded file is kept for the next attempt
+    assert [path.name for path in (tmp_path / "Uploader" / "video0").iterdir()] == ["Song.webm"]
+
+
+def test_transcodes_are_bounded_by_workers(tmp_path: Path, pool: None, monkeypatch: pytest.MonkeyPatch) -> None:
+    started = running = max_running = 0
+    lock = threading.Lock()
+    first_running = threading.Barrier(2)
+
+    def run_transcode(command: list[str]) -> float:
+        nonlocal started, running, max_running
+        with lock:
+            started += 1
+            first = started <= 2
+            running += 1
+            max_running = max(max_running, running)
+        # The first transcodes wait for each other: they run at the same time
+        if first:
+            first_running.wait(WAIT_TIMEOUT)
+        with lock:
+            running -= 1
+        return 0.0
+
+    monkeypatch.setattr(transcoder, "run_transcode", run_transcode)
+    futures = [
+        FFmpegTranscoder.submit(tmp_path / f"source{idx}.webm", tmp_path / f"output{idx}.m4a", "aac")
+        for idx in range(6)
+    ]
+
+    assert [future.result(WAIT_TIMEOUT) for future in futures] == [0.0] * 6
+    assert max_running == 2
@@ -1,4 +1,33 @@
-from .download import download
-from .edit import edit
+from dataclasses import dataclass
 
-__all__ = ["download", "edit"]
+
+@dataclass(frozen=True)
+class LazyCommand:
+    """A command imported only when invoked"""
+
+    path: str  # "module:attribute" path of the click command
+    help: str  # First line of the help of the command, listed by the CLI help without importing it
+
+
+# Commands are only imported when invoked, as some of them load heavy dependencies (yt-dlp, YAML...)
+COMMANDS = {
+    "download": LazyCommand(
+        "yt2navidrome.commands.download:download",
+        "Download YT videos and playlists with metadata required for Navidrome",
+    ),
+    "edit": LazyCommand(
+        "yt2navidrome.commands.edit:edit",
+        "Add or edit given tags to video files (files, directories or glob patterns)",
+    ),
+    "index": LazyCommand("yt2navidrome.commands.index:index", "Manage the library index of an output directory"),
+    "jobs": LazyCommand("yt2navidrome.commands.jobs:jobs", "Inspect the download jobs of an output directory"),
+    "scan": LazyCommand("yt2navidrome.commands.scan:scan", "Check the tags of all the files of the output directory"),
+    "serve": LazyCommand(
+        "yt2navidrome.commands.serve:serve", "Keep running and sync each template on its own schedule"
+    ),
+    "watch": LazyCommand(
+        "yt2navidrome.commands.serve:serve", "Keep running and sync each template on its own schedule"
+    ),
+}
+
+__all__ = ["COMMANDS", "LazyCommand"]
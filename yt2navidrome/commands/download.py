@@ -1,25 +1,183 @@
+import queue
 import sys
-import time
+from collections.abc import Callable, Iterable, Iterator
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from dataclasses import dataclass, field
 from pathlib import Path
+from typing import TypeVar
 
 import click
 from click_option_group import optgroup
 
+from yt2navidrome.commands.params import DURATION
 from yt2navidrome.config import (
-    CONSECUTIVE_DOWNLOADS_SLEEP_TIME,
+    ARTWORK_SIZE,
+    COVER_FILENAME,
     DEFAULT_ALBUM,
     DEFAULT_ARTIST,
+    DEFAULT_FORMAT_PROFILES,
     DEFAULT_TITLE,
+    DOWNLOAD_QUEUE_SIZE_PER_JOB,
+    METADATA_BATCH_MAX_SIZE,
+    PLAYLIST_EXTRACTION_WORKERS,
+    RATE_LIMITS_FILENAME,
+    STATE_DIR_NAME,
+    TRANSCODE_BITRATE,
+    TRANSCODE_WORKERS,
 )
-from yt2navidrome.downloader.playlist import PlaylistUtils
+from yt2navidrome.downloader.artwork import ArtworkCache, ArtworkOptions
+from yt2navidrome.downloader.formats import FORMAT_PROFILES, FormatProfile, get_format_chain
+from yt2navidrome.downloader.index import LibraryIndex
+from yt2navidrome.downloader.journal import Job, JobJournal, JobState
+from yt2navidrome.downloader.models import Video
+from yt2navidrome.downloader.planner import DownloadPlan, DownloadPlanner, PlannedVideo
+from yt2navidrome.downloader.resolver import AsyncResolver
+from yt2navidrome.downloader.session import YoutubeDLSession
 from yt2navidrome.downloader.video import VideoUtils
 from yt2navidrome.template import TemplateReader
 from yt2navidrome.template.models import Template
-from yt2navidrome.utils.ffmpeg import FFmpegHelper
+from yt2navidrome.utils.ffmpeg import FFmpegHelper, FFmpegInstaller, FFmpegTranscoder
 from yt2navidrome.utils.logging import get_logger
+from yt2navidrome.utils.metrics import Metrics
+from yt2navidrome.utils.ratelimit import HostRateLimiter
 
 logger = get_logger(__name__)
 
+T = TypeVar("T")
+
+
+@dataclass
+class DownloadOptions:
+    """Options of a download run"""
+
+    jobs: int = 1  # Number of videos downloaded and tagged in parallel
+    extract_jobs: int = PLAYLIST_EXTRACTION_WORKERS  # Number of playlist entries resolved in parallel
+    single_pass: bool = True  # Embed the thumbnail along with the metadata so that files are rewritten once
+    max_age: float | None = None  # Playlists refreshed more recently than this (in seconds) are not fetched again
+    formats: tuple[str, ...] = DEFAULT_FORMAT_PROFILES  # Format profiles tried in order (see FORMAT_PROFILES)
+    bitrate: str = TRANSCODE_BITRATE  # Target bitrate of transcoding format profiles
+    artwork: ArtworkOptions = field(default_factory=ArtworkOptions)  # How thumbnails are turned into cover art
+
+
+def performance_options(func: Callable[..., None]) -> Callable[..., None]:
+    """Add the options of the Performance group (also used by serve)"""
+    options = [
+        optgroup.group("Performance"),
+        optgroup.option(
+            "--jobs",
+            "-j",
+            type=click.IntRange(min=1),
+            default=1,
+            show_default=True,
+            help="Number of videos downloaded and tagged in parallel",
+        ),
+        optgroup.option(
+            "--extract-jobs",
+            type=click.IntRange(min=1),
+            default=PLAYLIST_EXTRACTION_WORKERS,
+            show_default=True,
+            help="Number of playlist entries resolved in parallel when the playlist info is incomplete",
+        ),
+        optgroup.option(
+            "--single-pass/--two-pass",
+            default=True,
+            show_default=True,
+            help="Embed the thumbnail along with the metadata in a single rewrite of each downloaded file",
+        ),
+    ]
+    for option in reversed(options):
+        func = option(func)
+    return func
+
+
+def format_options(func: Callable[..., None]) -> Callable[..., None]:
+    """Add the options of the Format group (also used by serve)"""
+    options = [
+        optgroup.group("Format"),
+        optgroup.option(
+            "--format",
+            "-f",
+            "formats",
+            type=click.Choice(list(FORMAT_PROFILES)),
+            multiple=True,
+            default=DEFAULT_FORMAT_PROFILES,
+            show_default=True,
+            help="Format profile, repeat to define the fallback order (m4a/opus are kept as is, aac/mp3 are transcoded)",
+        ),
+        optgroup.option(
+            "--bitrate",
+            default=TRANSCODE_BITRATE,
+            show_default=True,
+            help="Target bitrate of transcoded formats (e.g. 128k, 256k)",
+        ),
+    ]
+    for option in reversed(options):
+        func = option(func)
+    return func
+
+
+def artwork_options(func: Callable[..., None]) -> Callable[..., None]:
+    """Add the options of the Artwork group (also used by serve)"""
+    options = [
+        optgroup.group("Artwork"),
+        optgroup.option(
+            "--artwork-size",
+            type=click.IntRange(min=0),
+            default=ARTWORK_SIZE,
+            show_default=True,
+            help="Maximum width/height in pixels of the cover art (0 to keep the thumbnail size)",
+        ),
+        optgroup.option(
+            "--square-artwork/--keep-artwork-ratio",
+            default=True,
+            show_default=True,
+            help="Crop thumbnails to a square, as expected by music players",
+        ),
+        optgroup.option(
+            "--embed-artwork/--no-embed-artwork",
+            default=True,
+            show_default=True,
+            help=f"Embed the cover art in the files (a {COVER_FILENAME} file is written next to them anyway)",
+        ),
+    ]
+    for option in reversed(options):
+        func = option(func)
+    return func
+
+
+def metrics_options(func: Callable[..., None]) -> Callable[..., None]:
+    """Add the options of the Metrics group (also used by serve)"""
+    options = [
+        optgroup.group("Metrics"),
+        optgroup.option(
+            "--metrics-json",
+            type=click.Path(dir_okay=False, writable=True, path_type=Path),
+            default=None,
+            help="Write a JSON summary of stage timings and counters to this file",
+        ),
+        optgroup.option(
+            "--prometheus-textfile",
+            type=click.Path(dir_okay=False, writable=True, path_type=Path),
+            default=None,
+            help="Write metrics to this file for the textfile collector of the Prometheus node exporter (*.prom)",
+        ),
+    ]
+    for option in reversed(options):
+        func = option(func)
+    return func
+
+
+def export_metrics(metrics_json: Path | None, prometheus_textfile: Path | None) -> None:
+    """Log the metrics of the run and write them to the requested files"""
+    Metrics.log_summary()
+    try:
+        if metrics_json:
+            Metrics.write_json(metrics_json)
+        if prometheus_textfile:
+            Metrics.write_prometheus(prometheus_textfile)
+    except OSError:
+        logger.exception("Failed to export metrics")
+
 
 @click.command("download")
 @optgroup.group("IO")
@@ -39,84 +197,414 @@ logger = get_logger(__name__)
     required=True,
     help="Output directory where music will be saved",
 )
-def download(input_dir: Path, output_dir: Path) -> None:
+@performance_options
+@format_options
+@artwork_options
+@optgroup.group("Sync")
+@optgroup.option(
+    "--max-age",
+    "--since",
+    "max_age",
+    type=DURATION,
+    default=None,
+    help="Do not fetch playlists again if they were refreshed more recently than this (e.g. 30m, 6h, 1d)",
+)
+@metrics_options
+def download(
+    input_dir: Path,
+    output_dir: Path,
+    jobs: int,
+    extract_jobs: int,
+    single_pass: bool,
+    formats: tuple[str, ...],
+    bitrate: str,
+    artwork_size: int,
+    square_artwork: bool,
+    embed_artwork: bool,
+    max_age: float | None,
+    metrics_json: Path | None,
+    prometheus_textfile: Path | None,
+) -> None:
     """Download YT videos and playlists with metadata required for Navidrome"""
+    ensure_ffmpeg()
+
     try:
         # Read yt2navidrome templates from input dir
         logger.info(f"Reading yt2navidrome templates from {input_dir}...")
         templates = TemplateReader.read_directory(input_dir)
         logger.info(f"Found {len(templates)} yt2navidrome templates")
 
-        # We repeat following actions for each template
-        for template in templates:
-            process_template(template, output_dir)
+        options = DownloadOptions(
+            jobs=jobs,
+            extract_jobs=extract_jobs,
+            single_pass=single_pass,
+            max_age=max_age,
+            formats=formats,
+            bitrate=bitrate,
+            artwork=ArtworkOptions(size=artwork_size, square=square_artwork, embed=embed_artwork),
+        )
+
+        # Start from the download rates learned by previous runs
+        HostRateLimiter.load(get_rate_limits_path(output_dir))
+
+        # Videos of all templates are downloaded by the same workers
+        process_templates(templates, output_dir, options)
 
     except Exception:
         logger.exception("Unexpected error")
         sys.exit(1)
 
+    finally:
+        # Stop resolutions, then save cookies and release HTTP connections of yt-dlp sessions
+        AsyncResolver.close_all()
+        YoutubeDLSession.close_all()
+        FFmpegTranscoder.shutdown()
+        save_rate_limits(output_dir)
+        export_metrics(metrics_json, prometheus_textfile)
+
 
-def process_template(template: Template, output_dir: Path) -> None:
+def get_rate_limits_path(output_dir: Path) -> Path:
+    """Return the file where the download rates learned for an output directory are kept"""
+    return output_dir / STATE_DIR_NAME / RATE_LIMITS_FILENAME
+
+
+def save_rate_limits(output_dir: Path) -> None:
+    """Save the download rates learned during the run, for the next runs"""
+    try:
+        HostRateLimiter.save(get_rate_limits_path(output_dir))
+    except OSError:
+        logger.exception("Failed to save learned rate limits")
+
+
+def ensure_ffmpeg() -> None:
+    """Ensure FFmpeg is installed before downloading anything, exiting otherwise"""
+    if not FFmpegInstaller.ensure_ffmpeg_installed():
+        logger.error("Failure in downloading FFmpeg. Exiting...")
+        sys.exit(1)
+
+
+def process_template(template: Template, output_dir: Path, options: DownloadOptions | None = None) -> None:
     """
-    Download videos from a template
+    Download videos from a template (see process_templates)
 
     Args:
         template: Template to consider
         output_dir: Output directory where the video(s) will be downloaded
+        options: Options of the download run (defaults are used if not provided)
     """
-    # Gather the list of videos based on the URLs in the given templates
-    if template.playlist:
-        playlist = PlaylistUtils.process_playlist_url(template.url, output_dir)
-        if playlist:
-            missing_videos = playlist.videos
-    else:
-        video = VideoUtils.process_video_url(template.url, output_dir)
-        if video:
-            missing_videos = [video]
+    process_templates([template], output_dir, options)
 
-    if missing_videos:
-        logger.info(f"Missing videos to download: {len(missing_videos)}")
-    else:
+
+def process_templates(templates: list[Template], output_dir: Path, options: DownloadOptions | None = None) -> None:
+    """
+    Download videos from templates.
+    Missing videos of all templates are planned at once, so that videos shared by templates are downloaded once.
+    Videos are downloaded as soon as they are resolved, while the rest of the playlists is still being resolved.
+
+    Args:
+        templates: Templates to consider
+        output_dir: Output directory where the videos will be downloaded
+        options: Options of the download run (defaults are used if not provided)
+    """
+    options = options or DownloadOptions()
+    journal = JobJournal.open(output_dir)
+
+    # Videos left halfway by a previous run resume from their last completed stage
+    resumed_jobs = list({job.video_id: job for t in templates for job in journal.get_unfinished(t.url)}.values())
+    if resumed_jobs:
+        logger.info(f"Resuming interrupted videos: {len(resumed_jobs)}")
+        Metrics.increment("videos_resumed", len(resumed_jobs))
+
+    # Gather the missing videos of all templates
+    plan = DownloadPlanner.plan(templates, output_dir, max_age=options.max_age)
+
+    # Videos already being resumed are not queued again (their file is checked before resuming)
+    for job in resumed_jobs:
+        plan.videos.pop(job.video_id, None)
+
+    # Download videos then add metadata based on provided parsers from the templates
+    # Downloads of a host are paced by its rate limiter whatever the number of jobs (see HostRateLimiter):
+    # more jobs let downloads overlap with the conversion and tagging of other videos, not download faster
+    jobs_count = run_jobs(stream_jobs(plan, output_dir, options, resumed_jobs), output_dir, options)
+    if not jobs_count:
         logger.info("No missing videos")
 
-    # Download videos then add metadata based on provided parsers from the template
-    for idx, video in enumerate(missing_videos):
-        logger.info(f"Processing missing video {idx + 1}/{len(missing_videos)}")
-
-        download_path = VideoUtils.download(video, output_dir)
-
-        if download_path:
-            # Generate metadata entries from template parsers
-            metadata_entries = VideoUtils.parse_metadata_from_info(video, template.parsers)
-
-            # Ensure required metadata keys have default values
-            metadata_entries.setdefault("title", DEFAULT_TITLE)
-            metadata_entries.setdefault("artist", DEFAULT_ARTIST)
-            metadata_entries.setdefault("album", DEFAULT_ALBUM)
-
-            # Reshaping artist to preserve all-uppercase words and capitalize others
-            words = metadata_entries["artist"].split()
-            reshaped_words = [word if word.isupper() else word.capitalize() for word in words]
-            metadata_entries["artist"] = " ".join(reshaped_words)
-
-            # Album Artist should be the same than the Artist
-            metadata_entries["album_artist"] = metadata_entries["artist"]
-
-            # Then add metadata to the downloaded file
-            FFmpegHelper.add_metadata(download_path, metadata_entries)
-
-            # Finally We read tags from the downloaded file
-            if download_path:
-                tags = FFmpegHelper.get_tags(download_path)
-                artist: str = tags.get("artist", "ERROR")
-                title: str = tags.get("title", "ERROR")
-                album: str = tags.get("album", "ERROR")
-                album_artist: str = tags.get("album_artist", "ERROR")
-                logger.info(f"{download_path.name} => Artist: {artist}")
-                logger.info(f"{download_path.name} => Title: {title}")
-                logger.info(f"{download_path.name} => Album: {album}")
-                logger.info(f"{download_path.name} => Album Artist: {album_artist}")
-
-        # Then we sleep for a bit to avoid YT rate limits
-        if idx != len(missing_videos) - 1:
-            time.sleep(CONSECUTIVE_DOWNLOADS_SLEEP_TIME)
+
+def iter_batches(items: Iterable[T], max_size: int) -> Iterator[list[T]]:
+    """Group items in batches whose size doubles from 1 up to max_size, so that the first items are not delayed"""
+    batch: list[T] = []
+    size = 1
+    for item in items:
+        batch.append(item)
+        if len(batch) >= size:
+            yield batch
+            batch = []
+            size = min(size * 2, max_size)
+    if batch:
+        yield batch
+
+
+def stream_jobs(
+    plan: DownloadPlan, output_dir: Path, options: DownloadOptions, resumed_jobs: list[Job]
+) -> Iterator[Job]:
+    """
+    Yield the jobs of a run: resumed jobs first, then the jobs of the planned videos as they are resolved.
+    The jobs of the planned videos are recorded in the journal before being yielded,
+    so that an interrupted run can be resumed.
+
+    Args:
+        plan: The missing videos of the run
+        output_dir: Output directory where the videos will be downloaded
+        options: Options of the download run
+        resumed_jobs: Jobs interrupted by a previous run
+
+    Yields:
+        The jobs to process
+    """
+    yield from resumed_jobs
+    journal = JobJournal.open(output_dir)
+
+    # Generate metadata entries of the videos batch by batch, before downloading,
+    # so that they can be written along with the thumbnail
+    for items in iter_batches(
+        DownloadPlanner.stream_videos(plan, output_dir, options.extract_jobs), METADATA_BATCH_MAX_SIZE
+    ):
+        with Metrics.timer("metadata_parsing"):
+            all_metadata_entries = build_metadata_entries(items)
+
+        # Jobs are recorded under the template owning each video (the one with the highest precedence)
+        jobs: dict[str, Job] = {}
+        sources: dict[str, list[int]] = {}
+        for position, (_, planned) in enumerate(items):
+            sources.setdefault(planned.templates[0].url, []).append(position)
+        for source, positions in sources.items():
+            videos = [items[position][0] for position in positions]
+            metadata = [all_metadata_entries[position] for position in positions]
+            jobs.update((job.video_id, job) for job in journal.enqueue(source, videos, metadata))
+
+        yield from (jobs[planned.video_id] for _, planned in items if planned.video_id in jobs)
+
+
+def run_jobs(jobs: Iterable[Job], output_dir: Path, options: DownloadOptions) -> int:
+    """
+    Process jobs with a pool of download workers, fed through a bounded queue:
+    jobs are pulled from the iterable only when the workers are about to need them.
+
+    Args:
+        jobs: Jobs to process (pulled lazily)
+        output_dir: Output directory where the videos will be downloaded
+        options: Options of the download run
+
+    Returns:
+        The number of jobs processed
+
+    Raises:
+        Exception: The first error raised by a job, once all jobs are processed
+    """
+    job_queue: queue.Queue[tuple[int, Job] | None] = queue.Queue(maxsize=options.jobs * DOWNLOAD_QUEUE_SIZE_PER_JOB)
+    errors: list[BaseException] = []
+    conversions: list[Future[None]] = []
+
+    def worker(converter: Executor) -> None:
+        while (item := job_queue.get()) is not None:
+            idx, job = item
+            try:
+                conversion = process_job(job, output_dir, options, idx, converter)
+                if conversion:
+                    conversions.append(conversion)
+            except Exception as e:
+                errors.append(e)
+
+    count = 0
+    # Jobs waiting for a transcode are finished by the converter threads, while download workers go on
+    with (
+        ThreadPoolExecutor(max_workers=TRANSCODE_WORKERS, thread_name_prefix="convert") as converter,
+        ThreadPoolExecutor(max_workers=options.jobs, thread_name_prefix="download") as executor,
+    ):
+        for _ in range(options.jobs):
+            executor.submit(worker, converter)
+        try:
+            for count, job in enumerate(jobs, start=1):
+                # Blocks while the queue is full, which pauses the resolution of the next videos
+                job_queue.put((count - 1, job))
+        finally:
+            for _ in range(options.jobs):
+                job_queue.put(None)
+
+    errors.extend(error for conversion in conversions if (error := conversion.exception()))
+    if errors:
+        raise errors[0]
+    return count
+
+
+def process_job(
+    job: Job, output_dir: Path, options: DownloadOptions, idx: int = 0, converter: Executor | None = None
+) -> "Future[None] | None":
+    """
+    Run the remaining stages of a job: download the video (and convert it if needed), add the metadata
+    generated from the template parsers, then check the tags of the file.
+    Each completed stage is recorded in the journal.
+
+    Args:
+        job: Job of the video to process
+        output_dir: Output directory where the video will be downloaded
+        options: Options of the download run
+        idx: Index of the job among the jobs of the run (only used for logging)
+        converter: Executor finishing the jobs whose file is converted, so that the caller does not wait
+            for the transcode (if not provided, the job is finished before returning)
+
+    Returns:
+        The future of the rest of the job, if it was handed over to the converter
+    """
+    logger.info(f"Processing video {idx + 1}: {job.title} ({job.state.value})")
+
+    download_path = output_dir / job.path if job.path else None
+    if job.state != JobState.QUEUED and not (download_path and download_path.is_file()):
+        logger.warning(f"Downloaded file of {job.video_id} not found. Downloading again...")
+        job.state = JobState.QUEUED
+
+    if job.state == JobState.QUEUED:
+        downloaded = download_job(job, output_dir, options)
+        if downloaded is None:
+            return None
+
+        download_path, profile = downloaded
+        if profile.converted:
+            if converter:
+                return converter.submit(convert_job, job, download_path, profile, output_dir, options)
+            convert_job(job, download_path, profile, output_dir, options)
+            return None
+
+    if download_path is not None:
+        finish_job(job, download_path, output_dir, options)
+    return None
+
+
+def download_job(job: Job, output_dir: Path, options: DownloadOptions) -> tuple[Path, FormatProfile] | None:
+    """Download the video of a job (stage: queued -> downloaded, once converted if its format requires it)"""
+    journal = JobJournal.open(output_dir)
+
+    if job.attempts:
+        Metrics.increment("download_retries")
+
+    downloaded = VideoUtils.download(
+        job.to_video(),
+        output_dir,
+        embed_thumbnail=not options.single_pass,
+        formats=get_format_chain(options.formats, options.bitrate),
+    )
+    if not downloaded:
+        Metrics.increment("videos_failed")
+        journal.set_state(job, JobState.QUEUED, error="Download failed")
+        return None
+
+    download_path, profile = downloaded
+    if not profile.converted:
+        journal.set_state(job, JobState.DOWNLOADED, path=download_path)
+    return downloaded
+
+
+def convert_job(
+    job: Job, download_path: Path, profile: FormatProfile, output_dir: Path, options: DownloadOptions
+) -> None:
+    """Convert the downloaded file of a job (stage: queued -> downloaded), then finish the job"""
+    converted_path = VideoUtils.convert(job.to_video(), output_dir, download_path, profile)
+    if not converted_path:
+        Metrics.increment("videos_failed")
+        JobJournal.open(output_dir).set_state(job, JobState.QUEUED, error="Conversion failed")
+        return
+
+    JobJournal.open(output_dir).set_state(job, JobState.DOWNLOADED, path=converted_path)
+    finish_job(job, converted_path, output_dir, options)
+
+
+def finish_job(job: Job, download_path: Path, output_dir: Path, options: DownloadOptions) -> None:
+    """Run the stages of a job following its download: tagging, then verification"""
+    if job.state == JobState.DOWNLOADED:
+        tag_job(job, download_path, output_dir, options)
+
+    if job.state == JobState.TAGGED:
+        verify_job(job, download_path, output_dir)
+
+
+def tag_job(job: Job, download_path: Path, output_dir: Path, options: DownloadOptions) -> None:
+    """Add metadata (and cover art if not embedded by yt-dlp) to the downloaded file (stage: downloaded -> tagged)"""
+    thumbnail_path = VideoUtils.get_thumbnail_path(download_path)
+
+    # Identical thumbnails are processed once, and their cover files share the same data on disk
+    artwork_path = None
+    if thumbnail_path:
+        artwork_cache = ArtworkCache.open(output_dir)
+        with Metrics.timer("process_artwork"):
+            artwork_path = artwork_cache.add(thumbnail_path, options.artwork)
+        # Per-track cover file, in the directory of the video (see ArtworkCache.write_cover)
+        artwork_cache.write_cover(artwork_path, download_path.parent)
+
+    cover_path = artwork_path if options.artwork.embed else None
+    with Metrics.timer("add_metadata"):
+        FFmpegHelper.add_metadata(download_path, job.metadata, cover=cover_path)
+    if cover_path:
+        Metrics.increment("thumbnails_embedded")
+
+    # The thumbnail is only removed once the metadata is recorded, so that it is still there if we resume
+    JobJournal.open(output_dir).set_state(job, JobState.TAGGED)
+    if thumbnail_path:
+        thumbnail_path.unlink(missing_ok=True)
+
+
+def verify_job(job: Job, download_path: Path, output_dir: Path) -> None:
+    """Read tags from the downloaded file and check them against the metadata (stage: tagged -> verified)"""
+    with Metrics.timer("get_tags"):
+        tags = FFmpegHelper.get_tags(download_path)
+    artist: str = tags.get("artist", "ERROR")
+    title: str = tags.get("title", "ERROR")
+    album: str = tags.get("album", "ERROR")
+    album_artist: str = tags.get("album_artist", "ERROR")
+    logger.info(f"{download_path.name} => Artist: {artist}")
+    logger.info(f"{download_path.name} => Title: {title}")
+    logger.info(f"{download_path.name} => Album: {album}")
+    logger.info(f"{download_path.name} => Album Artist: {album_artist}")
+
+    # Keep track of the tag state in the library index (empty values are not written, so they match missing tags)
+    mismatched = [key for key, value in job.metadata.items() if tags.get(key, "") != value]
+    LibraryIndex.open(output_dir).set_tagged(job.video_id, not mismatched)
+
+    # Files whose tags do not match are tagged again on the next run
+    journal = JobJournal.open(output_dir)
+    if mismatched:
+        logger.error(f"{download_path.name} => Tags not written: {', '.join(mismatched)}")
+        journal.set_state(job, JobState.DOWNLOADED, error=f"Tags not written: {', '.join(mismatched)}")
+        Metrics.increment("videos_mismatched")
+    else:
+        journal.set_state(job, JobState.VERIFIED)
+        Metrics.increment("videos_verified")
+
+
+def build_metadata_entries(items: list[tuple[Video, PlannedVideo]]) -> list[dict[str, str]]:
+    """
+    Generate the metadata entries of videos based on provided parsers from their templates
+
+    Args:
+        items: Videos to consider, along with their planned videos (templates including them)
+
+    Returns:
+        A list with the metadata entries (key: value) of each video, in the same order
+    """
+    # Generate metadata entries from template parsers, for all videos at once
+    all_metadata_entries = DownloadPlanner.parse_metadata(items)
+
+    for metadata_entries in all_metadata_entries:
+        # Ensure required metadata keys have default values
+        metadata_entries.setdefault("title", DEFAULT_TITLE)
+        metadata_entries.setdefault("artist", DEFAULT_ARTIST)
+        metadata_entries.setdefault("album", DEFAULT_ALBUM)
+
+        # Reshaping artist to preserve all-uppercase words and capitalize others
+        words = metadata_entries["artist"].split()
+        reshaped_words = [word if word.isupper() else word.capitalize() for word in words]
+        metadata_entries["artist"] = " ".join(reshaped_words)
+
+        # Album Artist should be the same than the Artist
+        metadata_entries["album_artist"] = metadata_entries["artist"]
+
+    return all_metadata_entries
@@ -1,39 +1,230 @@
+import csv
+import glob
+import json
+import os
 import sys
+from concurrent.futures import ThreadPoolExecutor
 from pathlib import Path
 
 import click
 from click_option_group import optgroup
 
+from yt2navidrome.config import STATE_DIR_NAME
 from yt2navidrome.utils.ffmpeg import FFmpegHelper
+from yt2navidrome.utils.ffmpeg.helper import VIDEO_EXTS
 from yt2navidrome.utils.logging import get_logger
 
 logger = get_logger(__name__)
 
+GLOB_CHARS = ("*", "?", "[")
+
+
+class InvalidManifestError(ValueError):
+    """Raised when a manifest of tags can not be parsed"""
+
+    def __init__(self, manifest: Path, reason: str) -> None:
+        super().__init__(manifest, reason)
+        self.manifest = manifest
+        self.reason = reason
+
+    def __str__(self) -> str:
+        return f"Invalid manifest {self.manifest}: {self.reason}"
+
 
 @click.command("edit")
 @optgroup.group("Tag/Value")
-@optgroup.option("-t", "--tag", help="Tag to add/modify")
-@optgroup.option("-v", "--value", help="Value to insert into tag")
-@click.argument("input_file", type=click.Path(exists=True, file_okay=True, dir_okay=False, path_type=Path))
-def edit(input_file: Path, tag: str, value: str) -> None:
-    """Add or edit given tag to video file with FFmpeg"""
-    if not input_file.exists():
-        logger.error(f"{input_file} not found. Exiting...")
+@optgroup.option("-t", "--tag", "tags", multiple=True, help="Tag to add/modify (can be repeated)")
+@optgroup.option("-v", "--value", "values", multiple=True, help="Value to insert into tag (one per --tag)")
+@optgroup.group("Batch")
+@optgroup.option(
+    "--manifest",
+    "-m",
+    type=click.Path(exists=True, file_okay=True, dir_okay=False, path_type=Path),
+    help="JSON ({path: {tag: value}}) or CSV (path column then one column per tag) manifest of tags to edit",
+)
+@optgroup.option("--dry-run", is_flag=True, default=False, help="Only show the tags that would be modified")
+@optgroup.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=os.cpu_count() or 1,
+    show_default="number of CPUs",
+    help="Number of files edited in parallel",
+)
+@click.argument("inputs", nargs=-1)
+def edit(
+    inputs: tuple[str, ...],
+    tags: tuple[str, ...],
+    values: tuple[str, ...],
+    manifest: Path | None,
+    dry_run: bool,
+    jobs: int,
+) -> None:
+    """Add or edit given tags to video files (files, directories or glob patterns)"""
+    if len(tags) != len(values):
+        logger.error("Each --tag must have a matching --value. Exiting...")
+        sys.exit(-1)
+
+    # Gather all tag changes, grouped per file (resolved so that a file is never written twice concurrently)
+    changes: dict[Path, dict[str, str]] = {}
+
+    if tags:
+        for input_file in collect_files(inputs):
+            changes.setdefault(input_file.resolve(), {}).update(zip(tags, values, strict=True))
+
+    if manifest:
+        try:
+            manifest_changes = read_manifest(manifest)
+        except (OSError, ValueError):
+            logger.exception(f"Failed to read manifest {manifest}. Exiting...")
+            sys.exit(-1)
+        for input_file, entries in manifest_changes.items():
+            changes.setdefault(input_file.resolve(), {}).update(entries)
+
+    if not changes:
+        logger.error("No file to edit. Exiting...")
         sys.exit(-1)
 
-    # First we get the current value of the tag (if it exists)
-    tags = FFmpegHelper.get_tags(input_file)
-    current_tag_value = tags.get(tag)
+    logger.info(f"Editing {len(changes)} files{' (dry run)' if dry_run else ''}")
+
+    # Each file is read once, written once with all its changes, then checked
+    with ThreadPoolExecutor(max_workers=jobs, thread_name_prefix="edit") as executor:
+        results = list(executor.map(lambda item: edit_file_or_log(item[0], item[1], dry_run), changes.items()))
+
+    edited = sum(results)
+    logger.info(f"{'Would edit' if dry_run else 'Edited'} {edited} files, {len(results) - edited} up to date or failed")
+
+
+def collect_files(inputs: tuple[str, ...]) -> list[Path]:
+    """
+    Expand inputs (files, directories or glob patterns) into the list of video files to edit
+
+    Args:
+        inputs: Files, directories or glob patterns
+
+    Returns:
+        The video files found
+    """
+    files: list[Path] = []
+
+    for input_value in inputs:
+        if any(char in input_value for char in GLOB_CHARS):
+            paths = [Path(match) for match in sorted(glob.glob(input_value, recursive=True))]
+        else:
+            paths = [Path(input_value)]
+
+        for path in paths:
+            if path.is_dir():
+                files.extend(find_video_files(path))
+            elif path.is_file():
+                files.append(path)
+            else:
+                logger.error(f"{path} not found. Skipping...")
+
+    return files
+
 
-    if current_tag_value:
-        logger.info(f"Current value for {tag} = {current_tag_value}")
+def find_video_files(directory: Path) -> list[Path]:
+    """Find all video files in a directory, recursively"""
+    files: list[Path] = []
+    for dirpath, dirnames, filenames in os.walk(directory):
+        if STATE_DIR_NAME in dirnames:
+            dirnames.remove(STATE_DIR_NAME)
+        files.extend(Path(dirpath) / f for f in sorted(filenames) if Path(f).suffix.lower() in VIDEO_EXTS)
+    return files
+
+
+def read_manifest(manifest: Path) -> dict[Path, dict[str, str]]:
+    """
+    Read a manifest of tags to edit.
+
+    JSON manifests map each path to its tags: {"path/to/file.m4a": {"artist": "Artist"}}
+    CSV manifests have a path column then one column per tag. Empty cells are ignored.
+    Relative paths are relative to the manifest.
+
+    Args:
+        manifest: Path to the manifest
+
+    Returns:
+        The tags to edit, per file
+
+    Raises:
+        InvalidManifestError: If the manifest can not be parsed
+        OSError: If the manifest can not be read
+    """
+    changes: dict[Path, dict[str, str]] = {}
+
+    if manifest.suffix.lower() == ".csv":
+        with open(manifest, newline="", encoding="utf-8") as f:
+            reader = csv.DictReader(f)
+            if "path" not in (reader.fieldnames or []):
+                raise InvalidManifestError(manifest, "missing path column")
+            for row in reader:
+                path = row.pop("path", None)
+                if path:
+                    entries = {tag: value for tag, value in row.items() if tag and value}
+                    changes.setdefault(manifest.parent / path, {}).update(entries)
     else:
-        logger.info(f"Tag {tag} does not have any value yet")
+        with open(manifest, encoding="utf-8") as f:
+            try:
+                data = json.load(f)
+            except json.JSONDecodeError as e:
+                raise InvalidManifestError(manifest, str(e)) from e
+        if not isinstance(data, dict) or not all(isinstance(entries, dict) for entries in data.values()):
+            raise InvalidManifestError(manifest, "expected an object of tags per path")
+        for path, entries in data.items():
+            changes.setdefault(manifest.parent / path, {}).update({tag: str(value) for tag, value in entries.items()})
+
+    return changes
+
+
+def edit_file_or_log(input_file: Path, entries: dict[str, str], dry_run: bool = False) -> bool:
+    """Edit the tags of a single file, logging why it failed (if it did) so that other files are still edited"""
+    try:
+        return edit_file(input_file, entries, dry_run)
+    except Exception:
+        logger.exception(f"{input_file} => Unexpected error while editing tags")
+        return False
+
+
+def edit_file(input_file: Path, entries: dict[str, str], dry_run: bool = False) -> bool:
+    """
+    Edit the tags of a single file
+
+    Args:
+        input_file: The video file to edit
+        entries: Tags to add/modify
+        dry_run: Only show the tags that would be modified
+
+    Returns:
+        True if the file was modified (or would be in dry run mode)
+    """
+    if not input_file.is_file():
+        logger.error(f"{input_file} not found. Skipping...")
+        return False
+
+    # First we get the current value of the tags (if they exist) to only write actual changes
+    current_tags = FFmpegHelper.get_tags(input_file)
+    changed_entries = {tag: value for tag, value in entries.items() if current_tags.get(tag) != value}
+
+    if not changed_entries:
+        logger.debug(f"{input_file} is already up to date")
+        return False
+
+    for tag, value in changed_entries.items():
+        logger.info(f"{input_file} => {tag}: {current_tags.get(tag, '<none>')!r} -> {value!r}")
+
+    if dry_run:
+        return True
+
+    # Then we edit the video file with all requested tags at once
+    FFmpegHelper.add_metadata(input_file, changed_entries)
 
-    # Then we edit the video file with the requested tag and value
-    FFmpegHelper.add_metadata(input_file, {tag: value})
+    # Finally we check the value of the modified tags from the video
+    new_tags = FFmpegHelper.get_tags(input_file)
+    failed = [tag for tag, value in changed_entries.items() if new_tags.get(tag, "") != value]
+    if failed:
+        logger.error(f"{input_file} => Failed to edit tags: {', '.join(failed)}")
+        return False
 
-    # Finally we check the value of the modified tag from the video
-    tags = FFmpegHelper.get_tags(input_file)
-    new_tag_value = tags.get(tag, "ERROR")
-    logger.info(f"{input_file.name} => {tag}: {new_tag_value}")
+    return True
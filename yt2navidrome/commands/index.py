@@ -0,0 +1,40 @@
+import sys
+from pathlib import Path
+
+import click
+
+from yt2navidrome.downloader.index import LibraryIndex
+from yt2navidrome.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+@click.group("index")
+def index() -> None:
+    """Manage the library index of an output directory"""
+
+
+@index.command("rebuild")
+@click.option(
+    "--output",
+    "-o",
+    "output_dir",
+    type=click.Path(exists=True, file_okay=False, dir_okay=True, path_type=Path),
+    required=True,
+    help="Output directory where music is saved",
+)
+def rebuild(output_dir: Path) -> None:
+    """
+    Rebuild the library index from the files found in the output directory
+
+    Needed after files are deleted or moved by hand: downloaded videos are looked up in the index,
+    deleted ones are not downloaded again until then.
+    """
+    try:
+        logger.info(f"Rebuilding library index of {output_dir}...")
+        count = LibraryIndex.open(output_dir).rebuild()
+        logger.info(f"Library index rebuilt with {count} videos")
+
+    except Exception:
+        logger.exception("Unexpected error")
+        sys.exit(1)
@@ -0,0 +1,61 @@
+import sys
+import time
+from pathlib import Path
+
+import click
+
+from yt2navidrome.config import STATE_DIR_NAME
+from yt2navidrome.downloader.journal import JobJournal, JobState
+from yt2navidrome.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+@click.group("jobs")
+def jobs() -> None:
+    """Inspect the download jobs of an output directory"""
+
+
+@jobs.command("status")
+@click.option(
+    "--output",
+    "-o",
+    "output_dir",
+    type=click.Path(exists=True, file_okay=False, dir_okay=True, path_type=Path),
+    required=True,
+    help="Output directory where music is saved",
+)
+@click.option("--all", "show_all", is_flag=True, default=False, help="Also list verified jobs")
+def status(output_dir: Path, show_all: bool) -> None:
+    """Show the progress of the download jobs, per template"""
+    try:
+        if not (output_dir / STATE_DIR_NAME).is_dir():
+            click.echo(f"No jobs recorded in {output_dir}")
+            return
+
+        journal = JobJournal.open(output_dir)
+        counts = journal.count_states()
+        if not counts:
+            click.echo(f"No jobs recorded in {output_dir}")
+            return
+
+        # Progress of each template
+        for source, source_counts in sorted(counts.items()):
+            total = sum(source_counts.values())
+            verified = source_counts.get(JobState.VERIFIED, 0)
+            details = ", ".join(f"{state.value}: {source_counts.get(state, 0)}" for state in JobState)
+            click.echo(f"{source}\n  {verified}/{total} done ({details})")
+
+        # Then the details of the jobs that are not done
+        states: list[JobState] = [state for state in JobState if show_all or state != JobState.VERIFIED]
+        pending_jobs = journal.get_jobs(states=states)
+        if pending_jobs:
+            click.echo("")
+        for job in pending_jobs:
+            updated = time.strftime("%Y-%m-%d %H:%M", time.localtime(job.updated_at))
+            error = f" - {job.error} (attempts: {job.attempts})" if job.error else ""
+            click.echo(f"[{job.state.value:>10}] {updated} {job.video_id} {job.title}{error}")
+
+    except Exception:
+        logger.exception("Unexpected error")
+        sys.exit(1)
@@ -0,0 +1,20 @@
+from typing import Any
+
+import click
+
+from yt2navidrome.utils.duration import InvalidDurationError, parse_duration
+
+
+class DurationParamType(click.ParamType):
+    """Duration given in seconds or with units, e.g. 90, 30m, 6h, 1d12h"""
+
+    name = "duration"
+
+    def convert(self, value: Any, param: click.Parameter | None, ctx: click.Context | None) -> float:
+        try:
+            return parse_duration(value)
+        except InvalidDurationError as e:
+            self.fail(str(e), param, ctx)
+
+
+DURATION = DurationParamType()
@@ -0,0 +1,78 @@
+import sys
+from pathlib import Path
+
+import click
+
+from yt2navidrome.config import SCAN_WORKERS
+from yt2navidrome.downloader.scan import LibraryScanner, ScanReport
+from yt2navidrome.utils.logging import get_logger
+
+logger = get_logger(__name__)
+
+
+@click.command("scan")
+@click.option(
+    "--output",
+    "-o",
+    "output_dir",
+    type=click.Path(exists=True, file_okay=False, dir_okay=True, path_type=Path),
+    required=True,
+    help="Output directory where music is saved",
+)
+@click.option(
+    "--jobs",
+    "-j",
+    type=click.IntRange(min=1),
+    default=SCAN_WORKERS,
+    show_default=True,
+    help="Number of files whose tags are read in parallel",
+)
+@click.option(
+    "--no-cache",
+    is_flag=True,
+    default=False,
+    help="Read the tags of all files, even those unchanged since the previous scan",
+)
+def scan(output_dir: Path, jobs: int, no_cache: bool) -> None:
+    """
+    Check the tags of all the files of the output directory
+
+    Exits with status 1 if issues are found, so that scans can be scripted.
+    """
+    try:
+        report = LibraryScanner.scan(output_dir, workers=jobs, use_cache=not no_cache)
+        print_report(report)
+
+    except Exception:
+        logger.exception("Unexpected error")
+        sys.exit(1)
+
+    if report.issues:
+        sys.exit(1)
+
+
+def print_report(report: ScanReport) -> None:
+    """Print the issues found by a scan, grouped by kind"""
+    if report.unreadable:
+        click.echo(f"Unreadable files ({len(report.unreadable)}):")
+        for path in report.unreadable:
+            click.echo(f"  {path}")
+
+    if report.missing:
+        click.echo(f"Missing tags ({len(report.missing)} files):")
+        for path, keys in report.missing.items():
+            click.echo(f"  {path}: {', '.join(keys)}")
+
+    if report.placeholders:
+        click.echo(f"Placeholder tags ({len(report.placeholders)} files):")
+        for path, keys in report.placeholders.items():
+            click.echo(f"  {path}: {', '.join(keys)}")
+
+    if report.album_artists:
+        click.echo(f"Inconsistent album artists ({len(report.album_artists)} albums):")
+        for (directory, album), counts in report.album_artists.items():
+            details = ", ".join(f"{album_artist or '(none)'}: {count}" for album_artist, count in counts.most_common())
+            click.echo(f"  {album} ({directory or '.'}): {details}")
+
+    cached = report.files - report.read
+    click.echo(f"{report.files} files scanned ({cached} unchanged since the previous scan), {report.issues} issues")
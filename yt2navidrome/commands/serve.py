@@ -0,0 +1,236 @@
+import random
+import signal
+import sys
+import threading
+from pathlib import Path
+from types import FrameType
+
+import click
+from click_option_group import optgroup
+
+from yt2navidrome.commands.download import (
+    DownloadOptions,
+    artwork_options,
+    ensure_ffmpeg,
+    export_metrics,
+    format_options,
+    get_rate_limits_path,
+    metrics_options,
+    performance_options,
+    process_template,
+    save_rate_limits,
+)
+from yt2navidrome.commands.params import DURATION
+from yt2navidrome.config import SERVE_JITTER, SERVE_POLL_INTERVAL, SERVE_REFRESH_INTERVAL, SERVE_STARTUP_SPREAD
+from yt2navidrome.downloader.artwork import ArtworkOptions
+from yt2navidrome.downloader.resolver import AsyncResolver
+from yt2navidrome.downloader.session import YoutubeDLSession
+from yt2navidrome.downloader.snapshot import PlaylistSnapshot
+from yt2navidrome.template import TemplateReader
+from yt2navidrome.template.models import Template
+from yt2navidrome.utils.duration import format_duration
+from yt2navidrome.utils.ffmpeg import FFmpegTranscoder
+from yt2navidrome.utils.logging import get_logger
+from yt2navidrome.utils.ratelimit import HostRateLimiter
+from yt2navidrome.utils.scheduler import JitterScheduler
+
+logger = get_logger(__name__)
+
+# Templates are identified by their name and URL across reloads
+TemplateKey = tuple[str, str]
+
+
+class TemplateScheduler:
+    """Keeps the templates of an input directory loaded and schedules their syncs"""
+
+    def __init__(self, input_dir: Path, output_dir: Path, default_interval: float, jitter: float) -> None:
+        self.input_dir = input_dir
+        self.output_dir = output_dir
+        self.default_interval = default_interval
+        self.templates: dict[TemplateKey, Template] = {}
+        self.scheduler: JitterScheduler[TemplateKey] = JitterScheduler(jitter)
+        self._signature: list[tuple[str, int, int]] | None = None
+
+    def get_interval(self, template: Template) -> float:
+        """Return the refresh interval of a template (in seconds)"""
+        return template.refresh_seconds if template.refresh_seconds is not None else self.default_interval
+
+    def get_initial_delay(self, template: Template) -> float:
+        """
+        Return the delay before the first sync of a template.
+        Playlists synced recently resume their schedule, others are spread over the startup window.
+        """
+        interval = self.get_interval(template)
+        spread = random.uniform(0, min(interval, SERVE_STARTUP_SPREAD))  # noqa: S311
+
+        snapshot = PlaylistSnapshot.load(self.output_dir, template.url) if template.playlist else None
+        if snapshot:
+            return max(self.scheduler.jittered(interval) - snapshot.age, spread)
+
+        return spread
+
+    def get_signature(self) -> list[tuple[str, int, int]]:
+        """Return the name, mtime and size of the template files, to detect changes without reading them"""
+        signature: list[tuple[str, int, int]] = []
+        for file_path in self.input_dir.iterdir():
+            if file_path.name.lower().endswith((".yaml", ".yml")):
+                stat = file_path.stat()
+                signature.append((file_path.name, stat.st_mtime_ns, stat.st_size))
+        return sorted(signature)
+
+    def reload_if_changed(self) -> None:
+        """Reload templates if files of the input directory changed, keeping the schedule of unchanged templates"""
+        signature = self.get_signature()
+        if signature == self._signature:
+            return
+
+        if self._signature is not None:
+            logger.info(f"Templates changed in {self.input_dir}. Reloading...")
+        self._signature = signature
+
+        templates = {
+            (template.name, template.url): template for template in TemplateReader.read_directory(self.input_dir)
+        }
+
+        for key in self.templates.keys() - templates.keys():
+            logger.info(f"Template removed: {key[0]}")
+            self.scheduler.cancel(key)
+
+        for key, template in templates.items():
+            if key not in self.scheduler:
+                delay = self.get_initial_delay(template)
+                logger.info(f"Template scheduled: {template.summary()}, first sync in {format_duration(delay)}")
+                self.scheduler.schedule(key, delay)
+
+        self.templates = templates
+
+    def run_due(self, options: DownloadOptions, stop: threading.Event) -> int:
+        """Sync all templates that are due, then schedule their next sync. Returns the number of synced templates."""
+        synced = 0
+        for key in self.scheduler.pop_due():
+            template = self.templates.get(key)
+            if template is None or stop.is_set():
+                continue
+
+            logger.info(f"Syncing template {template.summary()}")
+            try:
+                process_template(template, self.output_dir, options)
+            except Exception:
+                logger.exception(f"Failed to sync template {template.name}")
+
+            synced += 1
+            interval = self.get_interval(template)
+            self.scheduler.schedule_next(key, interval)
+            logger.info(f"Next sync of {template.name} in about {format_duration(interval)}")
+
+        return synced
+
+
+@click.command("serve")
+@optgroup.group("IO")
+@optgroup.option(
+    "--input",
+    "-i",
+    "input_dir",
+    type=click.Path(exists=True, file_okay=False, dir_okay=True, path_type=Path),
+    required=True,
+    help="Input directory containing yt2navidrome templates (reloaded when they change)",
+)
+@optgroup.option(
+    "--output",
+    "-o",
+    "output_dir",
+    type=click.Path(exists=False, file_okay=False, dir_okay=True, path_type=Path),
+    required=True,
+    help="Output directory where music will be saved",
+)
+@optgroup.group("Schedule")
+@optgroup.option(
+    "--interval",
+    type=DURATION,
+    default=SERVE_REFRESH_INTERVAL,
+    show_default=f"{SERVE_REFRESH_INTERVAL // 3600}h",
+    help="Time between two syncs of a template without refresh_interval (e.g. 30m, 6h, 1d)",
+)
+@optgroup.option(
+    "--jitter",
+    type=click.FloatRange(min=0, max=1),
+    default=SERVE_JITTER,
+    show_default=True,
+    help="Random shift of sync times, as a fraction of the interval",
+)
+@optgroup.option(
+    "--poll-interval",
+    type=DURATION,
+    default=SERVE_POLL_INTERVAL,
+    show_default=True,
+    help="Time between two checks of the input directory for template changes",
+)
+@performance_options
+@format_options
+@artwork_options
+@metrics_options
+def serve(
+    input_dir: Path,
+    output_dir: Path,
+    interval: float,
+    jitter: float,
+    poll_interval: float,
+    jobs: int,
+    extract_jobs: int,
+    single_pass: bool,
+    formats: tuple[str, ...],
+    bitrate: str,
+    artwork_size: int,
+    square_artwork: bool,
+    embed_artwork: bool,
+    metrics_json: Path | None,
+    prometheus_textfile: Path | None,
+) -> None:
+    """Keep running and sync each template on its own schedule"""
+    ensure_ffmpeg()
+
+    stop = threading.Event()
+
+    def request_stop(signum: int, frame: FrameType | None) -> None:
+        logger.info("Stopping after the current sync...")
+        stop.set()
+
+    signal.signal(signal.SIGINT, request_stop)
+    signal.signal(signal.SIGTERM, request_stop)
+
+    options = DownloadOptions(
+        jobs=jobs,
+        extract_jobs=extract_jobs,
+        single_pass=single_pass,
+        formats=formats,
+        bitrate=bitrate,
+        artwork=ArtworkOptions(size=artwork_size, square=square_artwork, embed=embed_artwork),
+    )
+    template_scheduler = TemplateScheduler(input_dir, output_dir, default_interval=interval, jitter=jitter)
+
+    try:
+        logger.info(f"Serving templates from {input_dir}...")
+        HostRateLimiter.load(get_rate_limits_path(output_dir))
+
+        # Templates, library index and yt-dlp sessions are kept warm between syncs
+        while not stop.is_set():
+            template_scheduler.reload_if_changed()
+            if template_scheduler.run_due(options, stop):
+                # Learned rates are kept in case the process is killed, metrics accumulate over its lifetime
+                save_rate_limits(output_dir)
+                export_metrics(metrics_json, prometheus_textfile)
+
+            next_delay = template_scheduler.scheduler.next_delay()
+            stop.wait(poll_interval if next_delay is None else min(next_delay, poll_interval))
+
+    except Exception:
+        logger.exception("Unexpected error")
+        sys.exit(1)
+
+    finally:
+        # Stop resolutions, then save cookies and release HTTP connections of yt-dlp sessions
+        AsyncResolver.close_all()
+        YoutubeDLSession.close_all()
+        FFmpegTranscoder.shutdown()
+        save_rate_limits(output_dir)
@@ -9,12 +9,69 @@ load_dotenv()
 PROJECT_NAME = "yt2navidrome"
 PROJECT_ROOT = os.path.dirname(os.path.abspath(__file__))
 DATA_DIR = os.path.join(PROJECT_NAME, "data")
+CACHE_DIR = os.path.join(os.getenv("XDG_CACHE_HOME") or os.path.expanduser("~/.cache"), PROJECT_NAME)
+
+# Output directory state (library index, caches...)
+STATE_DIR_NAME = f".{PROJECT_NAME}"
+LIBRARY_INDEX_FILENAME = "library.db"  # SQLite database of the library index and the job journal
+LIBRARY_INDEX_TIMEOUT = 30  # Seconds to wait for the database while another process writes to it
+PLAYLIST_SNAPSHOTS_DIRNAME = "playlists"
 
 # YT-DLP Options
 COOKIE_FILE_PATH = os.path.join(DATA_DIR, "cookies.txt")
-CONSECUTIVE_DOWNLOADS_SLEEP_TIME = 10
+PLAYLIST_EXTRACTION_WORKERS = 4  # Playlist entries resolved in parallel when flat info is incomplete
+PLAYLIST_FETCH_WORKERS = 4  # Playlists of the templates of a run fetched in parallel
+PLAYLIST_RESOLUTION_AHEAD = 4  # Entries resolved ahead of the downloads, per extraction worker
+RESOLVE_TIMEOUT = 120  # Seconds an entry waits for its full extraction before being skipped
+
+# Download pipeline (videos streamed from the playlist to the download workers)
+DOWNLOAD_QUEUE_SIZE_PER_JOB = 2  # Videos waiting for a download worker, per worker, before resolution pauses
+METADATA_BATCH_MAX_SIZE = 64  # Videos whose metadata is parsed at once (batches grow up to it from a single video)
+
+# Audio formats (format profiles are tried in order until one is available, see downloader/formats.py)
+DEFAULT_FORMAT_PROFILES = ("m4a", "aac")
+TRANSCODE_BITRATE = "192k"  # Target bitrate of transcoding profiles
+# Transcodes run in parallel ffmpeg subprocesses (CPU bound), at most one per available core
+TRANSCODE_WORKERS = len(os.sched_getaffinity(0)) if hasattr(os, "sched_getaffinity") else os.cpu_count() or 1
+
+# Artwork (thumbnails processed once per distinct image, stored by content hash in the state directory)
+ARTWORK_DIRNAME = "artwork"
+ARTWORK_SIZE = 600  # Maximum width/height in pixels of the cover art (0 to keep the thumbnail size)
+ARTWORK_JPEG_QUALITY = 3  # FFmpeg JPEG quality scale, from 2 (best) to 31
+COVER_FILENAME = "cover.jpg"  # Written next to each track, found by Navidrome in the directories of an album
+
+# Library scans (tags read in parallel, cached by mtime and size in the state directory)
+SCAN_WORKERS = 8  # Files whose tags are read in parallel (MP4 tags are read in-process, others with ffprobe)
+SCAN_CACHE_FILENAME = "scan.json"
+
+# Rate limiting (one token bucket per host, whose rate adapts to throttling: AIMD)
+DOWNLOADS_PER_HOST_RATE = 0.1  # Initial downloads per second, i.e. one download every 10s on average
+DOWNLOADS_PER_HOST_BURST = 2  # Downloads allowed back to back before throttling
+DOWNLOADS_PER_HOST_MIN_RATE = 0.01  # Never slower than one download every 100s
+DOWNLOADS_PER_HOST_MAX_RATE = 0.5  # Never faster than one download every 2s, to keep the account under the radar
+RATE_INCREASE = 0.005  # Added to the rate after each successful request
+RATE_DECREASE_FACTOR = 0.5  # Applied to the rate when the host throttles us
+RATE_DECREASE_COOLDOWN = 30  # Seconds during which further throttling signals do not decrease the rate again
+THROTTLING_RETRIES = 4  # Retries of a throttled request, with jittered exponential backoff
+THROTTLING_BACKOFF_BASE = 15  # Seconds of the first backoff (then doubled at each retry)
+THROTTLING_BACKOFF_MAX = 600  # Maximum seconds of a backoff
+RATE_LIMITS_FILENAME = "ratelimits.json"  # Learned rates, kept in the state directory across runs
+
+# Serve mode (templates synced on a schedule)
+SERVE_REFRESH_INTERVAL = 6 * 3600  # Default seconds between two syncs of a template
+SERVE_JITTER = 0.1  # Sync times are randomly shifted by up to 10% of the interval
+SERVE_POLL_INTERVAL = 10  # Seconds between two checks of the input directory for template changes
+SERVE_STARTUP_SPREAD = 300  # Seconds over which templates without recent sync are spread on startup
+
+# Templates (parsed and compiled templates are cached per input directory in the cache directory)
+TEMPLATES_CACHE_DIRNAME = "templates"
+TEMPLATES_PARALLEL_THRESHOLD = 16  # Templates to parse above which they are parsed in parallel processes
+
+# Metrics (names of exported Prometheus metrics start with this prefix)
+METRICS_PREFIX = PROJECT_NAME
 
 # FFMpeg Options
+FFMPEG_CACHE_FILENAME = "ffmpeg.json"  # Location of the FFmpeg binaries, cached to skip the install check
 FFMPEG_URL_WINDOWS = "https://www.gyan.dev/ffmpeg/builds/ffmpeg-release-essentials.zip"
 ALLOWED_METADATA_INPUTS = ["title", "uploader"]
 
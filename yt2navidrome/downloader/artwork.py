@@ -0,0 +1,121 @@
+import hashlib
+import os
+import shutil
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import ClassVar
+
+from yt2navidrome.config import ARTWORK_DIRNAME, ARTWORK_JPEG_QUALITY, ARTWORK_SIZE, COVER_FILENAME, STATE_DIR_NAME
+from yt2navidrome.utils.ffmpeg import FFmpegHelper
+from yt2navidrome.utils.logging import get_logger
+from yt2navidrome.utils.metrics import Metrics
+
+
+@dataclass(frozen=True)
+class ArtworkOptions:
+    """How thumbnails are turned into cover art"""
+
+    size: int = ARTWORK_SIZE  # Maximum width/height in pixels (0 to keep the thumbnail size)
+    square: bool = True  # Crop thumbnails to a square (centered)
+    embed: bool = True  # Embed the cover art in the files (a cover file is written next to each track anyway)
+
+    @property
+    def variant(self) -> str:
+        """Suffix of the artwork files processed with these options"""
+        return f"{self.size or 'full'}{'-square' if self.square else ''}"
+
+
+class ArtworkCache:
+    """
+    Content-addressed store of the cover art of an output directory.
+
+    Thumbnails are identified by the hash of their content: identical thumbnails (e.g. shared by the tracks
+    of an album or a channel) are processed and stored only once, then hard linked as cover files.
+    """
+
+    logger = get_logger(__name__)
+
+    _instances: ClassVar[dict[Path, "ArtworkCache"]] = {}
+    _instances_lock: ClassVar[threading.Lock] = threading.Lock()
+
+    def __init__(self, output_dir: Path) -> None:
+        self.output_dir = output_dir
+        self.directory = output_dir / STATE_DIR_NAME / ARTWORK_DIRNAME
+
+    @classmethod
+    def open(cls, output_dir: Path) -> "ArtworkCache":
+        """
+        Return the artwork cache of an output directory, opening it only once per run.
+
+        Args:
+            output_dir: The output directory
+
+        Returns:
+            The ArtworkCache instance of this output directory
+        """
+        key = output_dir.resolve()
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(output_dir)
+            return cls._instances[key]
+
+    def get_path(self, digest: str, options: ArtworkOptions) -> Path:
+        """Return the path of the artwork of an image (identified by the hash of its content)"""
+        return self.directory / digest[:2] / f"{digest}-{options.variant}.jpg"
+
+    def add(self, image_path: Path, options: ArtworkOptions) -> Path:
+        """
+        Return the cover art of an image, processing it only if no identical image was processed before.
+
+        Args:
+            image_path: Path of the image (e.g. a downloaded thumbnail)
+            options: How the image is processed
+
+        Returns:
+            The path of the cover art in the cache (or the image itself if it could not be processed)
+        """
+        digest = hashlib.sha256(image_path.read_bytes()).hexdigest()
+        artwork_path = self.get_path(digest, options)
+        if artwork_path.is_file():
+            Metrics.increment("artwork_cache_hits")
+            return artwork_path
+
+        # Written to a temporary file first, so that concurrent workers never see a partial image
+        artwork_path.parent.mkdir(parents=True, exist_ok=True)
+        temp_path = artwork_path.with_name(f"{artwork_path.stem}.{threading.get_ident()}.tmp.jpg")
+        if not FFmpegHelper.resize_image(
+            image_path, temp_path, options.size or None, options.square, ARTWORK_JPEG_QUALITY
+        ):
+            temp_path.unlink(missing_ok=True)
+            return image_path
+
+        os.replace(temp_path, artwork_path)
+        Metrics.increment("artwork_processed")
+        return artwork_path
+
+    def write_cover(self, artwork_path: Path, directory: Path) -> None:
+        """
+        Write the cover file of a track directory, hard linked to the cover art when possible.
+
+        Each track is downloaded to a directory of its own (<uploader>/<video id>), so this is a per-track
+        cover file. Navidrome groups albums by tags, not by directory, and looks for cover files in all
+        the directories holding tracks of an album: the tracks of an album share its cover this way,
+        without any file being moved into an album directory.
+
+        Args:
+            artwork_path: The cover art
+            directory: The directory of the track
+        """
+        cover_path = directory / COVER_FILENAME
+        if cover_path.is_file() and os.path.samefile(cover_path, artwork_path):
+            return
+
+        temp_path = cover_path.with_name(f".{COVER_FILENAME}.tmp")
+        temp_path.unlink(missing_ok=True)
+        try:
+            os.link(artwork_path, temp_path)
+        except OSError:
+            # Other filesystem, or links not supported
+            shutil.copyfile(artwork_path, temp_path)
+        os.replace(temp_path, cover_path)
@@ -1,23 +1,23 @@
-import glob
 from pathlib import Path
 from urllib.parse import parse_qs, urlparse
 
+from yt2navidrome.downloader.index import LibraryIndex
+
 
 def check_if_already_downloaded(base_directory: Path, video_id: str) -> bool:
     """
-    Checks if any directory whose name is the video_id exists recursively
-    under the base_directory.
+    Checks if the video_id was already downloaded under the base_directory
+    using the library index of this directory.
 
     Args:
-        base_directory: The root directory to start the search from.
+        base_directory: The output directory to check.
         video_id: The ID string to search for (e.g., '12345').
 
     Returns:
-        True if at least one matching directory is found, False otherwise.
+        True if the video is found in the library index, False otherwise
+        (even if its file was deleted since, until the index is rebuilt).
     """
-    pattern = str(base_directory / "**" / video_id)
-    first_match = next((m for m in glob.iglob(pattern, recursive=True) if Path(m).is_dir()), None)
-    return first_match is not None
+    return LibraryIndex.open(base_directory).contains(video_id)
 
 
 def extract_video_id_from_url(video_url: str) -> str | None:
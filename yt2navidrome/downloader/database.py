@@ -0,0 +1,46 @@
+import sqlite3
+import threading
+from pathlib import Path
+from typing import ClassVar
+
+from yt2navidrome.config import LIBRARY_INDEX_FILENAME, LIBRARY_INDEX_TIMEOUT, STATE_DIR_NAME
+
+
+class StateDatabase:
+    """
+    SQLite database of the state directory of an output directory, holding the library index and the job journal.
+
+    A single connection is shared by all threads and all tables, serialized with a lock: download workers
+    update the index and the journal at the same time, which would make a second connection wait for
+    (and possibly time out on) the locks of the first one.
+    We keep the default rollback journal since WAL is not safe on network filesystems.
+    """
+
+    _instances: ClassVar[dict[Path, "StateDatabase"]] = {}
+    _instances_lock: ClassVar[threading.Lock] = threading.Lock()
+
+    def __init__(self, output_dir: Path) -> None:
+        self.path = output_dir / STATE_DIR_NAME / LIBRARY_INDEX_FILENAME
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+
+        # Reentrant, so that a method holding the lock can call others
+        self.lock = threading.RLock()
+        # The timeout only applies to other processes (e.g. a jobs command while serve runs)
+        self.connection = sqlite3.connect(self.path, check_same_thread=False, timeout=LIBRARY_INDEX_TIMEOUT)
+
+    @classmethod
+    def open(cls, output_dir: Path) -> "StateDatabase":
+        """
+        Return the database of an output directory, opening it only once per run.
+
+        Args:
+            output_dir: The output directory
+
+        Returns:
+            The StateDatabase instance of this output directory
+        """
+        key = output_dir.resolve()
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(output_dir)
+            return cls._instances[key]
@@ -0,0 +1,50 @@
+from dataclasses import dataclass, replace
+
+from yt2navidrome.config import TRANSCODE_BITRATE
+
+
+@dataclass(frozen=True)
+class FormatProfile:
+    """Represents how the audio of a video is downloaded, and converted if needed"""
+
+    name: str
+    format: str  # yt-dlp format selector of the downloaded stream
+    extension: str  # Extension of the final file
+    codec: str | None = None  # FFmpeg audio encoder the stream is converted with ("copy" to remux), None to keep it
+    bitrate: str | None = None  # Target bitrate of the encoder (e.g. 192k)
+
+    @property
+    def converted(self) -> bool:
+        """Whether the downloaded file is converted (in the transcoding pool) before being tagged"""
+        return self.codec is not None
+
+
+FORMAT_PROFILES = {
+    profile.name: profile
+    for profile in [
+        # AAC stream in an MP4 container, kept as is
+        FormatProfile("m4a", format="bestaudio[ext=m4a]", extension="m4a"),
+        # Opus stream (served in WebM), remuxed to Ogg without re-encoding
+        FormatProfile("opus", format="bestaudio[acodec=opus]", extension="opus", codec="copy"),
+        # Best audio stream, whatever its codec, transcoded
+        FormatProfile("aac", format="bestaudio/best", extension="m4a", codec="aac", bitrate=TRANSCODE_BITRATE),
+        FormatProfile("mp3", format="bestaudio/best", extension="mp3", codec="libmp3lame", bitrate=TRANSCODE_BITRATE),
+    ]
+}
+
+
+def get_format_chain(names: tuple[str, ...] | list[str], bitrate: str | None = None) -> list[FormatProfile]:
+    """
+    Return the format profiles to try in order, until one of them is available.
+
+    Args:
+        names: Names of the profiles (see FORMAT_PROFILES)
+        bitrate: Target bitrate of transcoding profiles (profile defaults are used if not provided)
+
+    Returns:
+        The format profiles
+    """
+    profiles = [FORMAT_PROFILES[name] for name in names]
+    if bitrate:
+        profiles = [replace(profile, bitrate=bitrate) if profile.bitrate else profile for profile in profiles]
+    return profiles
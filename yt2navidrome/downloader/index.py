@@ -0,0 +1,202 @@
+import os
+import threading
+from dataclasses import dataclass
+from pathlib import Path
+from typing import ClassVar
+
+from yt2navidrome.config import STATE_DIR_NAME
+from yt2navidrome.downloader.database import StateDatabase
+from yt2navidrome.utils.ffmpeg.helper import VIDEO_EXTS
+from yt2navidrome.utils.logging import get_logger
+
+SCHEMA_VERSION = 1
+
+
+@dataclass
+class IndexEntry:
+    """Represents a video already downloaded into the output directory"""
+
+    video_id: str
+    path: str  # Relative to the output directory
+    uploader: str
+    title: str
+    tagged: bool | None = None  # None when unknown (e.g. after a rebuild from disk)
+
+
+class LibraryIndex:
+    """
+    Persistent index of the videos downloaded into an output directory.
+
+    The index is stored in the SQLite database of the state directory of the output directory (see StateDatabase).
+    It is built from disk the first time it is opened, then updated incrementally.
+
+    Lookups do not check the disk: files deleted by hand are still considered downloaded
+    until the index is rebuilt (yt2navidrome index rebuild).
+    """
+
+    logger = get_logger(__name__)
+
+    _instances: ClassVar[dict[Path, "LibraryIndex"]] = {}
+    _instances_lock: ClassVar[threading.Lock] = threading.Lock()
+
+    def __init__(self, output_dir: Path) -> None:
+        self.output_dir = output_dir
+
+        # The connection (and its lock) is shared with the job journal
+        database = StateDatabase.open(output_dir)
+        self._lock = database.lock
+        self._connection = database.connection
+        with self._lock:
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS videos (
+                    video_id TEXT PRIMARY KEY,
+                    path TEXT NOT NULL,
+                    uploader TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    tagged INTEGER
+                )
+                """
+            )
+            self._connection.commit()
+
+        if self._schema_version() != SCHEMA_VERSION:
+            self.logger.info(f"Building library index for {output_dir}...")
+            count = self.rebuild()
+            self.logger.info(f"Library index built with {count} videos")
+
+    @classmethod
+    def open(cls, output_dir: Path) -> "LibraryIndex":
+        """
+        Return the index of an output directory, opening it only once per run.
+
+        Args:
+            output_dir: The output directory to index
+
+        Returns:
+            The LibraryIndex instance of this output directory
+        """
+        key = output_dir.resolve()
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(output_dir)
+            return cls._instances[key]
+
+    def _schema_version(self) -> int:
+        with self._lock:
+            row = self._connection.execute("PRAGMA user_version").fetchone()
+        return int(row[0])
+
+    def __len__(self) -> int:
+        with self._lock:
+            row = self._connection.execute("SELECT COUNT(*) FROM videos").fetchone()
+        return int(row[0])
+
+    def contains(self, video_id: str) -> bool:
+        """Check if a video was already downloaded (according to the index, see rebuild)"""
+        with self._lock:
+            row = self._connection.execute("SELECT 1 FROM videos WHERE video_id = ?", (video_id,)).fetchone()
+        return row is not None
+
+    def video_ids(self) -> set[str]:
+        """Return the IDs of all downloaded videos, to check many videos with a single query"""
+        with self._lock:
+            rows = self._connection.execute("SELECT video_id FROM videos").fetchall()
+        return {row[0] for row in rows}
+
+    def get(self, video_id: str) -> IndexEntry | None:
+        """Return the index entry of a video (or None if it was never downloaded)"""
+        with self._lock:
+            row = self._connection.execute(
+                "SELECT video_id, path, uploader, title, tagged FROM videos WHERE video_id = ?", (video_id,)
+            ).fetchone()
+
+        if row is None:
+            return None
+
+        return IndexEntry(
+            video_id=row[0], path=row[1], uploader=row[2], title=row[3], tagged=None if row[4] is None else bool(row[4])
+        )
+
+    def add(self, video_id: str, path: Path, uploader: str, title: str, tagged: bool | None = None) -> None:
+        """
+        Add (or replace) a downloaded video in the index.
+
+        Args:
+            video_id: The YT ID of the video
+            path: Path of the downloaded file
+            uploader: Uploader of the video
+            title: Title of the video
+            tagged: Whether metadata was added to the downloaded file
+        """
+        relative_path = os.path.relpath(path, self.output_dir)
+        with self._lock:
+            self._connection.execute(
+                "INSERT OR REPLACE INTO videos (video_id, path, uploader, title, tagged) VALUES (?, ?, ?, ?, ?)",
+                (video_id, relative_path, uploader, title, tagged),
+            )
+            self._connection.commit()
+
+    def set_tagged(self, video_id: str, tagged: bool) -> None:
+        """Update the tag state of an indexed video"""
+        with self._lock:
+            self._connection.execute("UPDATE videos SET tagged = ? WHERE video_id = ?", (tagged, video_id))
+            self._connection.commit()
+
+    def remove(self, video_id: str) -> None:
+        """Remove a video from the index"""
+        with self._lock:
+            self._connection.execute("DELETE FROM videos WHERE video_id = ?", (video_id,))
+            self._connection.commit()
+
+    def rebuild(self) -> int:
+        """
+        Rebuild the whole index from the files found in the output directory.
+
+        Each directory containing a media file is considered as a downloaded video
+        whose ID is the directory name (i.e. <uploader>/<video_id>/<title>.m4a).
+
+        Returns:
+            The number of indexed videos
+        """
+        rows = [
+            (entry.video_id, entry.path, entry.uploader, entry.title, entry.tagged) for entry in self._scan_directory()
+        ]
+
+        with self._lock:
+            self._connection.execute("DELETE FROM videos")
+            self._connection.executemany(
+                "INSERT OR REPLACE INTO videos (video_id, path, uploader, title, tagged) VALUES (?, ?, ?, ?, ?)", rows
+            )
+            self._connection.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+            self._connection.commit()
+
+        return len(rows)
+
+    def _scan_directory(self) -> list[IndexEntry]:
+        """Walk the output directory once to find all downloaded videos"""
+        entries: list[IndexEntry] = []
+
+        for dirpath, dirnames, filenames in os.walk(self.output_dir):
+            # Do not descend into the state directory
+            if STATE_DIR_NAME in dirnames:
+                dirnames.remove(STATE_DIR_NAME)
+
+            media_files = sorted(f for f in filenames if Path(f).suffix.lower() in VIDEO_EXTS)
+            if not media_files:
+                continue
+
+            directory = Path(dirpath)
+            if directory == self.output_dir:
+                continue
+
+            entries.append(
+                IndexEntry(
+                    video_id=directory.name,
+                    path=os.path.relpath(directory / media_files[0], self.output_dir),
+                    uploader=directory.parent.name,
+                    title=Path(media_files[0]).stem,
+                )
+            )
+
+        return entries
@@ -0,0 +1,248 @@
+import json
+import os
+import threading
+import time
+from dataclasses import dataclass, field
+from enum import Enum
+from pathlib import Path
+from typing import ClassVar
+
+from yt2navidrome.downloader.common import extract_video_id_from_url
+from yt2navidrome.downloader.database import StateDatabase
+from yt2navidrome.downloader.models import Video
+from yt2navidrome.utils.logging import get_logger
+
+
+class JobState(str, Enum):
+    """Stages of a download job, in order"""
+
+    QUEUED = "queued"  # Missing video, not downloaded yet (or download failed)
+    DOWNLOADED = "downloaded"  # Media file downloaded, metadata not written yet
+    TAGGED = "tagged"  # Metadata written, not checked yet
+    VERIFIED = "verified"  # Metadata read back from the file and matching
+
+
+@dataclass
+class Job:
+    """Represents the download of a video, as recorded in the journal"""
+
+    video_id: str
+    url: str
+    title: str
+    uploader: str
+    source: str  # URL of the template the video comes from
+    state: JobState = JobState.QUEUED
+    metadata: dict[str, str] = field(default_factory=dict)
+    path: str | None = None  # Relative to the output directory, once downloaded
+    attempts: int = 0
+    error: str | None = None
+    updated_at: float = field(default_factory=time.time)
+
+    def to_video(self) -> Video:
+        return Video(url=self.url, title=self.title, uploader=self.uploader)
+
+
+class JobJournal:
+    """
+    Write-ahead journal of the download jobs of an output directory.
+
+    Jobs are recorded before anything is downloaded and each completed stage is committed,
+    so that an interrupted run can resume every video from its last completed stage.
+    The journal is stored in the same SQLite database as the library index, through the same connection.
+    """
+
+    logger = get_logger(__name__)
+
+    _instances: ClassVar[dict[Path, "JobJournal"]] = {}
+    _instances_lock: ClassVar[threading.Lock] = threading.Lock()
+
+    COLUMNS = "video_id, url, title, uploader, source, state, metadata, path, attempts, error, updated_at"
+
+    def __init__(self, output_dir: Path) -> None:
+        self.output_dir = output_dir
+
+        # The connection (and its lock) is shared with the library index
+        database = StateDatabase.open(output_dir)
+        self._lock = database.lock
+        self._connection = database.connection
+        with self._lock:
+            self._connection.execute(
+                """
+                CREATE TABLE IF NOT EXISTS jobs (
+                    video_id TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    title TEXT NOT NULL,
+                    uploader TEXT NOT NULL,
+                    source TEXT NOT NULL,
+                    state TEXT NOT NULL,
+                    metadata TEXT NOT NULL,
+                    path TEXT,
+                    attempts INTEGER NOT NULL DEFAULT 0,
+                    error TEXT,
+                    updated_at REAL NOT NULL
+                )
+                """
+            )
+            self._connection.execute("CREATE INDEX IF NOT EXISTS jobs_source_state ON jobs (source, state)")
+            self._connection.commit()
+
+    @classmethod
+    def open(cls, output_dir: Path) -> "JobJournal":
+        """
+        Return the journal of an output directory, opening it only once per run.
+
+        Args:
+            output_dir: The output directory
+
+        Returns:
+            The JobJournal instance of this output directory
+        """
+        key = output_dir.resolve()
+        with cls._instances_lock:
+            if key not in cls._instances:
+                cls._instances[key] = cls(output_dir)
+            return cls._instances[key]
+
+    def _to_job(self, row: tuple) -> Job:
+        return Job(
+            video_id=row[0],
+            url=row[1],
+            title=row[2],
+            uploader=row[3],
+            source=row[4],
+            state=JobState(row[5]),
+            metadata=json.loads(row[6]),
+            path=row[7],
+            attempts=row[8],
+            error=row[9],
+            updated_at=row[10],
+        )
+
+    def enqueue(self, source: str, videos: list[Video], all_metadata_entries: list[dict[str, str]]) -> list[Job]:
+        """
+        Record missing videos as queued jobs, in a single transaction.
+        Jobs already recorded for these videos are reset (their files are not in the library anymore).
+
+        Args:
+            source: URL of the template the videos come from
+            videos: The missing videos
+            all_metadata_entries: The metadata entries of each video
+
+        Returns:
+            The queued jobs, in the same order (videos without a valid ID are left out)
+        """
+        jobs = [
+            Job(
+                video_id=video_id,
+                url=video.url,
+                title=video.title,
+                uploader=video.uploader,
+                source=source,
+                metadata=metadata_entries,
+            )
+            for video, metadata_entries in zip(videos, all_metadata_entries, strict=True)
+            if (video_id := extract_video_id_from_url(video.url))
+        ]
+
+        with self._lock:
+            self._connection.executemany(
+                f"""
+                INSERT INTO jobs ({self.COLUMNS}) VALUES (?, ?, ?, ?, ?, ?, ?, NULL, 0, NULL, ?)
+                ON CONFLICT (video_id) DO UPDATE SET
+                    url = excluded.url, title = excluded.title, uploader = excluded.uploader,
+                    source = excluded.source, state = excluded.state, metadata = excluded.metadata,
+                    path = NULL, error = NULL, updated_at = excluded.updated_at
+                """,  # noqa: S608
+                [
+                    (
+                        job.video_id,
+                        job.url,
+                        job.title,
+                        job.uploader,
+                        job.source,
+                        job.state.value,
+                        json.dumps(job.metadata),
+                        job.updated_at,
+                    )
+                    for job in jobs
+                ],
+            )
+            self._connection.commit()
+
+        return jobs
+
+    def get(self, video_id: str) -> Job | None:
+        """Return the job of a video (or None if it was never queued)"""
+        with self._lock:
+            row = self._connection.execute(
+                f"SELECT {self.COLUMNS} FROM jobs WHERE video_id = ?",  # noqa: S608
+                (video_id,),
+            ).fetchone()
+        return self._to_job(row) if row else None
+
+    def get_jobs(self, source: str | None = None, states: list[JobState] | None = None) -> list[Job]:
+        """
+        Return recorded jobs, optionally filtered.
+
+        Args:
+            source: Only return the jobs of this template URL
+            states: Only return the jobs in these states
+
+        Returns:
+            The jobs, oldest update first
+        """
+        query = f"SELECT {self.COLUMNS} FROM jobs WHERE 1 = 1"  # noqa: S608
+        params: list[str] = []
+
+        if source is not None:
+            query += " AND source = ?"
+            params.append(source)
+
+        if states is not None:
+            query += f" AND state IN ({', '.join('?' for _ in states)})"
+            params.extend(state.value for state in states)
+
+        with self._lock:
+            rows = self._connection.execute(query + " ORDER BY updated_at", params).fetchall()
+        return [self._to_job(row) for row in rows]
+
+    def get_unfinished(self, source: str | None = None) -> list[Job]:
+        """Return the jobs interrupted after their download (downloaded or tagged, but not verified)"""
+        return self.get_jobs(source, states=[JobState.DOWNLOADED, JobState.TAGGED])
+
+    def set_state(self, job: Job, state: JobState, path: Path | None = None, error: str | None = None) -> None:
+        """
+        Record the stage reached by a job (committed before the next stage starts).
+
+        Args:
+            job: The job to update (updated in place too)
+            state: The stage reached
+            path: Path of the downloaded file (once downloaded)
+            error: Why the job did not reach the next stage (if it failed)
+        """
+        job.state = state
+        job.error = error
+        job.updated_at = time.time()
+        if path is not None:
+            job.path = os.path.relpath(path, self.output_dir)
+        if state == JobState.QUEUED and error:
+            job.attempts += 1
+
+        with self._lock:
+            self._connection.execute(
+                "UPDATE jobs SET state = ?, path = ?, attempts = ?, error = ?, updated_at = ? WHERE video_id = ?",
+                (job.state.value, job.path, job.attempts, job.error, job.updated_at, job.video_id),
+            )
+            self._connection.commit()
+
+    def count_states(self) -> dict[str, dict[JobState, int]]:
+        """Return the number of jobs in each state, per template URL"""
+        with self._lock:
+            rows = self._connection.execute(
+                "SELECT source, state, COUNT(*) FROM jobs GROUP BY source, state"
+            ).fetchall()
+
+        counts: dict[str, dict[JobState, int]] = {}
+        for source, state, count in rows:
+            counts.setdefault(source, {})[JobState(state)] = count
+        return counts
@@ -1,7 +1,7 @@
-import re
-from typing import Any
+from collections.abc import Sequence
+from typing import Any, cast
 
-from yt2navidrome.template.models import Argument, MetadataParser, PostProcessor
+from yt2navidrome.template.compiled import CompiledParser, CompiledPostProcessor
 from yt2navidrome.utils.logging import get_logger
 
 
@@ -9,99 +9,136 @@ class MetadataUtils:
     logger = get_logger(__name__)
 
     @classmethod
-    def run_parser(cls, input_object: Any, parser: MetadataParser) -> dict[str, str]:
+    def run_parser(cls, input_object: Any, parser: CompiledParser) -> dict[str, str]:
         """
-        Run a MetadataParser against an object to extract required metadata.
+        Run a compiled MetadataParser against an object to extract required metadata.
 
         Args:
             input_object: The object to extract metadata from.
-            parser: The parser to use
+            parser: The compiled parser to use
 
         Returns:
             A dict containing the extracted metadata
         """
-        cls.logger.debug(parser.summary())
+        cls.logger.debug(parser.summary)
 
         try:
-            source = getattr(input_object, parser.source)
+            source = cls.to_source(getattr(input_object, parser.source))
         except Exception:
             cls.logger.exception(f"Failed to get attribute {parser.source} from {type(input_object)} instance")
             return {}
 
-        compiled_pattern = re.compile(parser.pattern)
-        match = compiled_pattern.search(source)
+        match = parser.pattern.search(source) if source is not None else None
 
         if match:
             cls.logger.debug(f"Found matching values: {match.groupdict()}")
             extracted_metadata = match.groupdict()
 
-            if parser.post_processors:
-                for post_processor in parser.post_processors:
-                    cls.run_post_processor(extracted_metadata, post_processor)
+            for post_processor in parser.post_processors:
+                cls.run_post_processor(extracted_metadata, post_processor)
 
             return extracted_metadata
         else:
             cls.logger.debug("Found no matching values")
             return {}
 
+    @staticmethod
+    def to_source(value: Any) -> str | None:
+        """
+        Convert the value of a parser source to the string its pattern is searched in
+        (e.g. duration 215 -> "215", tags ("a", "b") -> "a, b").
+
+        Args:
+            value: The value of the source attribute
+
+        Returns:
+            The string to search (or None if the value is missing)
+        """
+        if value is None or isinstance(value, str):
+            return value
+        if isinstance(value, list | tuple):
+            return ", ".join(str(item) for item in value)
+        return str(value)
+
     @classmethod
-    def run_post_processor(cls, metadata: dict[str, str], post_processor: PostProcessor) -> None:
+    def run_parser_batch(cls, input_objects: Sequence[Any], parser: CompiledParser) -> list[dict[str, str]]:
         """
-        Run a PostProcessor to refine extracted metadata.
+        Run a compiled MetadataParser against many objects at once.
+        Each post processor is then applied to all extracted metadata in a single pass.
 
         Args:
-            metadata: The metadata dict to update.
-            post_processor: The PostProcessor defining the action to perform and its args
+            input_objects: The objects to extract metadata from.
+            parser: The compiled parser to use
+
+        Returns:
+            A list containing the extracted metadata of each object, in the same order
         """
-        cls.logger.debug(post_processor.summary())
+        cls.logger.debug(f"{parser.summary} (batch of {len(input_objects)})")
 
-        if any(input_key not in metadata for input_key in post_processor.input):
-            cls.logger.error(f"Post processing failed. Metadata missing a key in {post_processor.input}")
-            return
+        search = parser.pattern.search
+        source_name = parser.source
+        results: list[dict[str, str]] = []
 
-        if post_processor.action == "split":
-            metadata[post_processor.output] = cls.run_split(
-                input_value=metadata.get(post_processor.input[0], ""), args=post_processor.args
-            )
-        else:
-            cls.logger.error(f"Unsupported post processing action: {post_processor.action}")
+        for input_object in input_objects:
+            try:
+                source = cls.to_source(getattr(input_object, source_name))
+            except Exception:
+                cls.logger.exception(f"Failed to get attribute {source_name} from {type(input_object)} instance")
+                results.append({})
+                continue
 
-    #### POST PROCESSING METHODS ####
+            match = search(source) if source is not None else None
+            results.append(match.groupdict() if match else {})
+
+        matched = [metadata for metadata in results if metadata]
+        cls.logger.debug(f"Found matching values for {len(matched)}/{len(results)} objects")
+
+        for post_processor in parser.post_processors:
+            cls.run_post_processor_batch(matched, post_processor)
+
+        return results
 
     @classmethod
-    def run_split(cls, input_value: str, args: list[Argument] | None) -> str:
+    def run_post_processor(cls, metadata: dict[str, str], post_processor: CompiledPostProcessor) -> None:
         """
-        Perform a split on the input value.
+        Run a compiled PostProcessor to refine extracted metadata.
 
         Args:
-            input_value: The value to process.
-            args: The arguments required for the split action
+            metadata: The metadata dict to update.
+            post_processor: The compiled PostProcessor defining the action to perform and its args
+        """
+        cls.logger.debug(post_processor.summary)
+        cls.run_post_processor_batch([metadata], post_processor)
 
-        Returns:
-            A string obtained by splitting the input and rejoining it
+    @classmethod
+    def run_post_processor_batch(
+        cls, metadata_list: list[dict[str, str]], post_processor: CompiledPostProcessor
+    ) -> None:
+        """
+        Run a compiled PostProcessor on many metadata dicts.
+
+        Args:
+            metadata_list: The metadata dicts to update.
+            post_processor: The compiled PostProcessor defining the action to perform and its args
         """
-        # First we check that we got all required args
-        if not args:
-            cls.logger.error("Missing required arguments: separators and glue")
-            return input_value
-
-        for arg in args:
-            if arg.key == "separators":
-                separators: str = arg.value
-            elif arg.key == "glue":
-                glue: str = arg.value
-
-        if separators is None or glue is None:
-            cls.logger.error("Missing required arguments: separators and/or glue")
-            return input_value
-
-        # Then split input_value on any of the separators
-        pattern = "|".join(map(re.escape, separators))
-        parts: list[str] = re.split(pattern, input_value)
-        parts = [p for p in parts if p.strip()]  # Remove empty parts
-
-        # Finally rejoin with glue
-        result = glue.join(parts)
-
-        cls.logger.debug(f"Value after splitting: {result}")
-        return result
+        func = post_processor.action.func
+        args = post_processor.args
+        inputs = post_processor.inputs
+        output = post_processor.output
+        accepts_missing = post_processor.action.accepts_missing
+        failed = 0
+
+        for metadata in metadata_list:
+            values = [metadata.get(input_key) for input_key in inputs]
+
+            # Optional pattern groups may not have matched
+            if None in values:
+                if not accepts_missing:
+                    failed += 1
+                    continue
+                values = [value or "" for value in values]
+
+            metadata[output] = func(cast(list[str], values), args)
+
+        if failed:
+            cls.logger.error(f"Post processing failed for {failed} items. Metadata missing a key in {list(inputs)}")
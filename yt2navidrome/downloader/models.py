@@ -1,14 +1,72 @@
-from dataclasses import dataclass
+import sys
+import zlib
+from collections.abc import Mapping
+from dataclasses import dataclass, field
+from typing import Any
 
+# Video fields missing from flat playlist entries: videos whose templates parse them are fully extracted
+FULL_INFO_FIELDS = frozenset({"description"})
 
-@dataclass
+
+@dataclass(slots=True)
 class Video:
+    """
+    Represents a video, with the info its metadata can be parsed from (see MetadataParser.source).
+
+    Runs can hold tens of thousands of videos, so they are kept compact: no instance dict,
+    interned uploader and channel strings (shared by all videos of a channel),
+    and the description (often the largest field) is compressed.
+    """
+
     url: str
     title: str
     uploader: str
+    duration: int | None = None  # In seconds
+    upload_date: str | None = None  # YYYYMMDD
+    channel_id: str | None = None
+    tags: tuple[str, ...] = ()
+    _description: bytes | None = field(default=None, repr=False, compare=False)  # Compressed, None if not extracted
 
+    def __post_init__(self) -> None:
+        self.uploader = sys.intern(self.uploader)
+        if self.channel_id:
+            self.channel_id = sys.intern(self.channel_id)
+        self.tags = tuple(sys.intern(tag) for tag in self.tags)
 
-@dataclass
-class Playlist:
-    title: str
-    videos: list[Video]
+    @classmethod
+    def from_info(cls, url: str, title: str, uploader: str, info: Mapping[str, Any]) -> "Video":
+        """
+        Build a Video from a yt-dlp info dict (full video info or flat playlist entry).
+
+        Args:
+            url: The URL of the video
+            title: The title of the video
+            uploader: The uploader of the video
+            info: The info dict, optional fields are taken from it when available
+
+        Returns:
+            A Video instance
+        """
+        duration = info.get("duration")
+        video = cls(
+            url=url,
+            title=title,
+            uploader=uploader,
+            duration=int(duration) if isinstance(duration, int | float) else None,
+            upload_date=info.get("upload_date"),
+            channel_id=info.get("channel_id"),
+            tags=tuple(info.get("tags") or ()),
+        )
+        if info.get("description") is not None:
+            video.set_description(info["description"])
+        return video
+
+    def set_description(self, description: str) -> None:
+        self._description = zlib.compress(description.encode())
+
+    @property
+    def description(self) -> str | None:
+        """The description of the video (None if its info did not include it, see FULL_INFO_FIELDS)"""
+        if self._description is None:
+            return None
+        return zlib.decompress(self._description).decode()
@@ -0,0 +1,215 @@
+from collections.abc import Iterable, Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from itertools import zip_longest
+from pathlib import Path
+
+from yt2navidrome.config import PLAYLIST_EXTRACTION_WORKERS, PLAYLIST_FETCH_WORKERS
+from yt2navidrome.downloader.common import check_if_already_downloaded, extract_video_id_from_url
+from yt2navidrome.downloader.models import FULL_INFO_FIELDS, Video
+from yt2navidrome.downloader.playlist import PlaylistUtils
+from yt2navidrome.downloader.snapshot import PlaylistSnapshot, SnapshotEntry
+from yt2navidrome.downloader.video import VideoUtils
+from yt2navidrome.template.compiled import TemplateCompiler
+from yt2navidrome.template.models import Template
+from yt2navidrome.utils.logging import get_logger
+from yt2navidrome.utils.metrics import Metrics
+
+
+@dataclass(slots=True)
+class PlannedVideo:
+    """A missing video, downloaded once for all the templates that include it"""
+
+    video_id: str
+    entries: list[SnapshotEntry]  # One per template including the video (resolved info is stored in all of them)
+    templates: list[Template]  # By precedence: the first one owns the download, and wins metadata conflicts
+
+    @property
+    def needs_full_info(self) -> bool:
+        """Whether the templates parse fields only found in the full video info (see FULL_INFO_FIELDS)"""
+        return any(TemplateCompiler.get(template).sources & FULL_INFO_FIELDS for template in self.templates)
+
+
+@dataclass
+class DownloadPlan:
+    """The missing videos of a run, across all templates"""
+
+    videos: dict[str, PlannedVideo] = field(default_factory=dict)  # By video ID, in download order
+    snapshots: list[PlaylistSnapshot] = field(default_factory=list)  # Saved once their entries are resolved
+
+
+class DownloadPlanner:
+    """
+    Plans the downloads of all templates of a run at once.
+
+    Missing entries of all templates are gathered and deduplicated by video ID, so that a video
+    included by several templates is resolved, downloaded and tagged only once, with the metadata
+    parsed by each of its templates merged by precedence (see get_precedence).
+    Videos are ordered round-robin across templates, so that no template waits for all others.
+    """
+
+    logger = get_logger(__name__)
+
+    @staticmethod
+    def get_precedence(templates: list[Template]) -> list[Template]:
+        """Order templates by precedence: highest priority first, then in the given (file) order"""
+        return sorted(templates, key=lambda template: -template.priority)
+
+    @classmethod
+    def get_missing_entries(
+        cls, template: Template, output_dir: Path, max_age: float | None = None
+    ) -> tuple[PlaylistSnapshot | None, list[SnapshotEntry]]:
+        """
+        Return the missing entries of a template (along with its playlist snapshot, if any).
+
+        Args:
+            template: The template to consider
+            output_dir: Output directory where the videos will be downloaded
+            max_age: Reuse playlist snapshots younger than this (in seconds)
+
+        Returns:
+            The snapshot of the playlist (None for a video template) and the entries not downloaded yet
+        """
+        if template.playlist:
+            return PlaylistUtils.get_missing_entries(template.url, output_dir, max_age) or (None, [])
+
+        # A single video: its info is extracted along with the entries of playlists with incomplete info
+        video_id = extract_video_id_from_url(template.url)
+        if not video_id:
+            cls.logger.error("Failed to process video. No YT ID found")
+            return None, []
+
+        if check_if_already_downloaded(output_dir, video_id):
+            cls.logger.debug(f"Video with ID {video_id} already exists. Skipping...")
+            return None, []
+
+        return None, [SnapshotEntry(video_id=video_id, url=template.url)]
+
+    @classmethod
+    def plan(
+        cls,
+        templates: list[Template],
+        output_dir: Path,
+        max_age: float | None = None,
+        workers: int = PLAYLIST_FETCH_WORKERS,
+    ) -> DownloadPlan:
+        """
+        Gather the missing entries of all templates, deduplicated by video ID.
+
+        Args:
+            templates: The templates of the run
+            output_dir: Output directory where the videos will be downloaded
+            max_age: Reuse playlist snapshots younger than this (in seconds)
+            workers: Number of playlists fetched in parallel
+
+        Returns:
+            The plan of the run
+        """
+        plan = DownloadPlan()
+        entries_per_template: list[list[tuple[Template, SnapshotEntry]]] = []
+
+        # Playlists are fetched in parallel, their entries are gathered in template order
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="plan") as executor:
+            missing = list(
+                executor.map(lambda template: cls.get_missing_entries(template, output_dir, max_age), templates)
+            )
+
+        for template, (snapshot, entries) in zip(templates, missing, strict=True):
+            if snapshot:
+                plan.snapshots.append(snapshot)
+            entries_per_template.append([(template, entry) for entry in entries])
+
+        # Take the first missing video of each template, then the second one of each template, etc.
+        duplicates = 0
+        for template_entries in zip_longest(*entries_per_template):
+            for item in template_entries:
+                if item is None:
+                    continue
+
+                template, entry = item
+                planned = plan.videos.get(entry.video_id)
+                if planned is None:
+                    plan.videos[entry.video_id] = PlannedVideo(entry.video_id, [entry], [template])
+                    continue
+
+                duplicates += 1
+                planned.entries.append(entry)
+                if template not in planned.templates:
+                    planned.templates.append(template)
+
+        for planned in plan.videos.values():
+            planned.templates = cls.get_precedence(planned.templates)
+
+            # The most complete entry is resolved, so that videos known by any template are not extracted again
+            planned.entries.sort(key=lambda entry: entry.to_video() is None)
+
+        if duplicates:
+            cls.logger.info(f"Videos included by several templates: {duplicates} duplicates skipped")
+            Metrics.increment("videos_deduplicated", duplicates)
+
+        return plan
+
+    @classmethod
+    def stream_videos(
+        cls, plan: DownloadPlan, output_dir: Path, workers: int = PLAYLIST_EXTRACTION_WORKERS
+    ) -> Iterator[tuple[Video, PlannedVideo]]:
+        """
+        Yield the videos of a plan as soon as they are resolved, in download order.
+        Videos whose templates parse fields missing from playlist entries are fully extracted along with
+        incomplete entries, so that parsers never wait for the network.
+
+        Args:
+            plan: The plan of the run
+            output_dir: Output directory where the videos will be downloaded
+            workers: Number of entries resolved in parallel when their info is incomplete
+
+        Yields:
+            Each video along with its planned video
+        """
+        entries = [planned.entries[0] for planned in plan.videos.values()]
+        full_info = {planned.video_id for planned in plan.videos.values() if planned.needs_full_info}
+
+        for video in PlaylistUtils.stream_videos(plan.snapshots, entries, output_dir, workers, full_info):
+            planned = plan.videos[extract_video_id_from_url(video.url) or ""]
+
+            # The video is resolved once for all the snapshots including it
+            for entry in planned.entries[1:]:
+                entry.update(video)
+
+            yield video, planned
+
+    @classmethod
+    def parse_metadata(cls, items: Iterable[tuple[Video, PlannedVideo]]) -> list[dict[str, str]]:
+        """
+        Parse the metadata of videos with the parsers of all their templates, merged by precedence:
+        each metadata entry comes from the first template (by precedence) that defines it.
+
+        Args:
+            items: The videos along with their planned videos
+
+        Returns:
+            A list with the metadata entries (key: value) of each video, in the same order
+        """
+        items = list(items)
+        all_metadata_entries: list[dict[str, str]] = [{} for _ in items]
+
+        # Videos are parsed in batch per template, then merged
+        positions_per_template: dict[int, tuple[Template, list[int]]] = {}
+        for position, (_, planned) in enumerate(items):
+            for template in planned.templates:
+                positions_per_template.setdefault(id(template), (template, []))[1].append(position)
+
+        parsed: dict[tuple[int, int], dict[str, str]] = {}
+        for template, positions in positions_per_template.values():
+            videos = [items[position][0] for position in positions]
+            results = VideoUtils.parse_metadata_from_videos(videos, TemplateCompiler.get(template))
+            for position, metadata_entries in zip(positions, results, strict=True):
+                parsed[(id(template), position)] = metadata_entries
+
+        for position, (_, planned) in enumerate(items):
+            metadata_entries = all_metadata_entries[position]
+            for template in planned.templates:
+                for key, value in parsed[(id(template), position)].items():
+                    metadata_entries.setdefault(key, value)
+
+        return all_metadata_entries
@@ -1,22 +1,28 @@
+import time
+from collections import deque
+from collections.abc import Container, Iterable, Iterator
+from concurrent.futures import Future
 from pathlib import Path
 from typing import Any, cast
 
-from yt_dlp import YoutubeDL
-
-from yt2navidrome.config import COOKIE_FILE_PATH
-from yt2navidrome.downloader.common import check_if_already_downloaded, extract_video_id_from_url
-from yt2navidrome.downloader.models import Playlist
-from yt2navidrome.downloader.video import Video, VideoUtils
+from yt2navidrome.config import PLAYLIST_EXTRACTION_WORKERS, PLAYLIST_RESOLUTION_AHEAD, RESOLVE_TIMEOUT
+from yt2navidrome.downloader.common import extract_video_id_from_url
+from yt2navidrome.downloader.index import LibraryIndex
+from yt2navidrome.downloader.resolver import AsyncResolver
+from yt2navidrome.downloader.session import PLAYLIST_PROFILE, YoutubeDLSession, request_with_backoff
+from yt2navidrome.downloader.snapshot import PlaylistSnapshot, SnapshotEntry
+from yt2navidrome.downloader.video import Video
 from yt2navidrome.utils.logging import get_logger
+from yt2navidrome.utils.metrics import Metrics
 
 
 class PlaylistUtils:
     logger = get_logger(__name__)
 
     @classmethod
-    def extract_video_if_needed(cls, entry: dict[str, Any], output_dir: Path) -> Video | None:
-        """Extract video info if not already downloaded."""
-        video_url = cast(str, entry.get("url"))
+    def snapshot_entry_from_entry(cls, entry: dict[str, Any]) -> SnapshotEntry | None:
+        """Build a snapshot entry from a flat playlist entry (or None if it has no valid URL)."""
+        video_url = entry.get("url")
         if not video_url:
             cls.logger.error(f"Failed to process video. Invalid URL: {video_url}")
             return None
@@ -26,60 +32,193 @@ class PlaylistUtils:
             cls.logger.error("Failed to process video. No YT ID found")
             return None
 
-        if check_if_already_downloaded(output_dir, video_id):
-            cls.logger.debug(f"Video with ID {video_id} already exists. Skipping...")
+        duration = entry.get("duration")
+        return SnapshotEntry(
+            video_id=video_id,
+            url=video_url,
+            title=entry.get("title"),
+            uploader=entry.get("uploader") or entry.get("channel"),
+            duration=int(duration) if isinstance(duration, int | float) else None,
+            upload_date=entry.get("upload_date"),
+            channel_id=entry.get("channel_id"),
+            tags=entry.get("tags") or None,
+        )
+
+    @classmethod
+    def fetch_snapshot(cls, playlist_url: str, previous: PlaylistSnapshot | None) -> PlaylistSnapshot | None:
+        """
+        Extract the flat playlist info into a new snapshot, reusing the info of entries known from the previous one.
+
+        Args:
+            playlist_url: The URL of the YouTube playlist.
+            previous: The previous snapshot of the playlist (if any).
+
+        Returns:
+            A PlaylistSnapshot instance (or None).
+        """
+        with YoutubeDLSession.borrow(PLAYLIST_PROFILE) as ydl, Metrics.timer("playlist_extraction"):
+            playlist_info = request_with_backoff(
+                playlist_url, lambda: ydl.extract_info(playlist_url, download=False), rate_limited=False
+            )
+
+        if not playlist_info or playlist_info.get("_type") != "playlist":
+            cls.logger.error(f"URL {playlist_url} did not return a valid playlist.")
             return None
 
-        # Can skip check since already done above
-        video = VideoUtils.process_video_url(video_url, output_dir, check_if_exists=False)
-        return video
+        snapshot = PlaylistSnapshot(url=playlist_url, title=cast(str, playlist_info.get("title", "Unknown Playlist")))
+        known_entries = {entry.video_id: entry for entry in previous.entries} if previous else {}
+
+        for entry in cast(list[dict[str, Any]], playlist_info.get("entries", [])):
+            snapshot_entry = cls.snapshot_entry_from_entry(entry) if entry else None
+            if not snapshot_entry:
+                continue
+
+            # Info resolved during a previous run does not have to be extracted again
+            known_entry = known_entries.get(snapshot_entry.video_id)
+            known_video = known_entry.to_video() if known_entry else None
+            if known_video and not snapshot_entry.to_video():
+                snapshot_entry.update(known_video)
+
+            snapshot.entries.append(snapshot_entry)
+
+        Metrics.increment("playlist_entries", len(snapshot.entries))
+
+        if previous and snapshot.etag == previous.etag:
+            cls.logger.info(f"Playlist unchanged since {time.ctime(previous.fetched_at)}")
+        elif previous:
+            added, removed = snapshot.diff(previous)
+            cls.logger.info(f"Playlist changes since last run: {len(added)} added, {len(removed)} removed")
+
+        return snapshot
 
     @classmethod
-    def process_playlist_url(cls, playlist_url: str, output_dir: Path) -> Playlist | None:
+    def iter_missing_videos(
+        cls,
+        entries: list[SnapshotEntry],
+        output_dir: Path,
+        workers: int = PLAYLIST_EXTRACTION_WORKERS,
+        timeout: float | None = RESOLVE_TIMEOUT,
+        full_info: Container[str] = frozenset(),
+    ) -> Iterator[Video]:
         """
-        Extracts info for videos in a YouTube playlist. Skips videos already downloaded.
+        Yield the videos of the given entries as soon as they are resolved, extracting the full info
+        of incomplete entries in parallel. Resolved info is stored back into the entries.
+
+        Only a few entries are resolved ahead of the consumer of the videos, so that resolution
+        pauses while the videos already yielded are downloaded.
 
         Args:
-            playlist_url: The URL of the YouTube playlist.
+            entries: The entries of the videos to build (in playlist order).
             output_dir: Path where the missing videos would be downloaded.
+            workers: Number of entries resolved in parallel.
+            timeout: Seconds an entry waits for its resolution before being skipped.
+            full_info: IDs of the videos resolved even if their entry is complete (their full info is needed).
 
-        Returns:
-            A Playlist instance (or None).
+        Yields:
+            The videos, in playlist order, without the entries that failed to resolve.
         """
+        unresolved_count = sum(1 for entry in entries if entry.video_id in full_info or not entry.to_video())
+        if unresolved_count:
+            cls.logger.info(f"Resolving {unresolved_count} videos with incomplete playlist info...")
+
+        # Entries waiting to be yielded, along with their video (if complete) or its resolution
+        pending: deque[tuple[SnapshotEntry, Video | None, Future[Video | None] | None]] = deque()
+
+        def pop_video() -> Video | None:
+            entry, video, future = pending.popleft()
+            if future:
+                video = future.result()
+                if video:
+                    entry.update(video)
+            return video
+
+        resolver = AsyncResolver.shared(workers, timeout)
         try:
-            cls.logger.info(f"Processing playlist {playlist_url}")
+            for entry in entries:
+                # Build videos straight from the entries when possible, resolve others with a full extraction
+                video = entry.to_video() if entry.video_id not in full_info else None
+                future = None if video else resolver.submit(entry.url, output_dir)
+                pending.append((entry, video, future))
+
+                # Yield videos as soon as they are ready (in playlist order), or wait when too far ahead
+                while pending and (
+                    len(pending) > workers * PLAYLIST_RESOLUTION_AHEAD or not pending[0][2] or pending[0][2].done()
+                ):
+                    if popped := pop_video():
+                        yield popped
+
+            while pending:
+                if popped := pop_video():
+                    yield popped
+        finally:
+            # Nothing more is resolved once the consumer stops (the resolver itself is kept for the next playlists)
+            cls.cancel_resolutions(future for _, _, future in pending)
+
+    @classmethod
+    def cancel_resolutions(cls, futures: Iterable[Future[Video | None] | None]) -> None:
+        """Cancel the resolutions of entries which will not be yielded (resolutions already running keep going)"""
+        for future in futures:
+            if future:
+                future.cancel()
+
+    @classmethod
+    def stream_videos(
+        cls,
+        snapshots: list[PlaylistSnapshot],
+        entries: list[SnapshotEntry],
+        output_dir: Path,
+        workers: int,
+        full_info: Container[str] = frozenset(),
+    ) -> Iterator[Video]:
+        """Yield the videos of missing entries, then save the snapshots they come from with their resolved info"""
+        try:
+            yield from cls.iter_missing_videos(entries, output_dir, workers, full_info=full_info)
+        except Exception as e:
+            cls.logger.error(f"An error occurred during playlist processing: {e}", exc_info=True)
+        finally:
+            for snapshot in snapshots:
+                snapshot.save(output_dir)
 
-            ydl_opts: dict[str, Any] = {
-                "quiet": True,  # Suppress status messages
-                "extract_flat": "in_playlist",  # Only extract titles and URLs from the playlist, not all video info yet
-                "force_generic_extractor": True,  # Ensure it processes the playlist URL as a playlist
-                "skip_download": True,  # Do not download anything
-            }
+    @classmethod
+    def get_missing_entries(
+        cls, playlist_url: str, output_dir: Path, max_age: float | None = None
+    ) -> tuple[PlaylistSnapshot, list[SnapshotEntry]] | None:
+        """
+        Fetch the flat info of a YouTube playlist and return its entries which were not downloaded yet.
 
-            if Path(COOKIE_FILE_PATH).exists():
-                ydl_opts.update({"cookiefile": COOKIE_FILE_PATH})
+        A snapshot of the playlist is kept in the output directory: only new entries have to be
+        resolved, and the playlist is not fetched again if its snapshot is more recent than max_age.
 
-            # Extract the playlist information
-            with YoutubeDL(ydl_opts) as ydl:  # type: ignore[arg-type]
-                playlist_info = ydl.extract_info(playlist_url, download=False)
+        Args:
+            playlist_url: The URL of the YouTube playlist.
+            output_dir: Path where the missing videos would be downloaded.
+            max_age: Reuse the last snapshot of the playlist if it is younger than this (in seconds).
 
-            if not playlist_info or playlist_info.get("_type") != "playlist":
-                cls.logger.error(f"URL {playlist_url} did not return a valid playlist.")
-                return None
+        Returns:
+            The snapshot of the playlist (to save once its missing entries are resolved)
+            and its missing entries (or None).
+        """
+        try:
+            cls.logger.info(f"Processing playlist {playlist_url}")
 
-            playlist_title = cast(str, playlist_info.get("title", "Unknown Playlist"))
-            entries = cast(list[dict[str, Any]], playlist_info.get("entries", []))
+            previous = PlaylistSnapshot.load(output_dir, playlist_url)
 
-            cls.logger.info(f"Playlist found: **{playlist_title}**")
-            cls.logger.info(f"Total videos to process: {len(entries)}")
+            if previous and max_age is not None and previous.age < max_age:
+                cls.logger.info(f"Playlist refreshed {previous.age:.0f}s ago. Using snapshot...")
+                snapshot = previous
+            else:
+                # Extract the playlist information
+                fetched = cls.fetch_snapshot(playlist_url, previous)
+                if not fetched:
+                    return None
+                snapshot = fetched
 
-            # Extract videos, filtering out None and skipped ones
-            playlist_videos = [
-                v for entry in entries if entry for v in [cls.extract_video_if_needed(entry, output_dir)] if v
-            ]
+            cls.logger.info(f"Playlist found: **{snapshot.title}**")
+            cls.logger.info(f"Total videos to process: {len(snapshot.entries)}")
 
-            # Create and return Playlist instance
-            return Playlist(title=playlist_title, videos=playlist_videos)
+            # Check all entries against the library index at once
+            downloaded_ids = LibraryIndex.open(output_dir).video_ids()
+            return snapshot, [entry for entry in snapshot.entries if entry.video_id not in downloaded_ids]
 
         except Exception as e:
             cls.logger.error(f"An error occurred during initial playlist processing: {e}", exc_info=True)
@@ -0,0 +1,173 @@
+import asyncio
+import threading
+from collections.abc import Coroutine
+from concurrent.futures import Future, ThreadPoolExecutor
+from functools import partial
+from pathlib import Path
+from types import TracebackType
+from typing import Any, ClassVar, TypeVar
+
+from yt2navidrome.config import PLAYLIST_EXTRACTION_WORKERS, RESOLVE_TIMEOUT
+from yt2navidrome.downloader.models import Video
+from yt2navidrome.downloader.video import VideoUtils
+from yt2navidrome.utils.logging import get_logger
+from yt2navidrome.utils.metrics import Metrics
+
+T = TypeVar("T")
+
+
+class AsyncResolver:
+    """
+    Resolves the full info of videos on an asyncio event loop, running in a thread of its own.
+
+    Extractions are blocking yt-dlp calls: they run in a pool of `workers` threads, whose use is bounded
+    by a semaphore, so that thousands of entries can be submitted at once while only a handful of
+    extractions run. Each entry waits at most `timeout` seconds for its extraction, and pending entries
+    are cancelled when the resolver is closed.
+
+    Resolutions run on the loop of the resolver, synchronous callers (e.g. the playlist pipeline) use submit.
+    Resolvers are meant to be long-lived: `shared` returns the same resolver (loop, thread and pool) to all callers.
+    """
+
+    logger = get_logger(__name__)
+
+    _shared: ClassVar[dict[tuple[int, float | None], "AsyncResolver"]] = {}  # Per number of workers and timeout
+    _shared_lock: ClassVar[threading.Lock] = threading.Lock()
+
+    def __init__(self, workers: int = PLAYLIST_EXTRACTION_WORKERS, timeout: float | None = RESOLVE_TIMEOUT) -> None:
+        self.workers = workers
+        self.timeout = timeout
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="extract")
+        self._semaphore = asyncio.Semaphore(workers)
+        self._loop = asyncio.new_event_loop()
+        # Held while the loop is closed, so that extractions finishing late never post to a closed loop
+        self._loop_lock = threading.Lock()
+        self._thread = threading.Thread(target=self._loop.run_forever, name="resolver", daemon=True)
+        self._thread.start()
+
+    @classmethod
+    def shared(
+        cls, workers: int = PLAYLIST_EXTRACTION_WORKERS, timeout: float | None = RESOLVE_TIMEOUT
+    ) -> "AsyncResolver":
+        """
+        Return the resolver shared by all callers using the same settings, creating it on first use.
+
+        Args:
+            workers: Number of extractions running in parallel
+            timeout: Seconds an entry waits for its extraction
+
+        Returns:
+            The shared resolver (closed by close_all)
+        """
+        with cls._shared_lock:
+            resolver = cls._shared.get((workers, timeout))
+            if resolver is None or resolver.closed:
+                resolver = cls._shared[(workers, timeout)] = cls(workers, timeout)
+            return resolver
+
+    @classmethod
+    def close_all(cls) -> None:
+        """Close the shared resolvers"""
+        with cls._shared_lock:
+            resolvers = list(cls._shared.values())
+            cls._shared.clear()
+
+        for resolver in resolvers:
+            resolver.close()
+
+    @property
+    def closed(self) -> bool:
+        return self._loop.is_closed()
+
+    def __enter__(self) -> "AsyncResolver":
+        return self
+
+    def __exit__(
+        self, exc_type: type[BaseException] | None, exc_value: BaseException | None, traceback: TracebackType | None
+    ) -> None:
+        self.close()
+
+    async def resolve(self, url: str, output_dir: Path) -> Video | None:
+        """
+        Build the video of an entry with a full extraction.
+
+        A slot of the pool is only released once its extraction returns: an entry that timed out
+        gives up waiting right away, but its extraction keeps its thread until yt-dlp returns
+        (or its socket times out), so that no more than `workers` threads are ever busy.
+
+        Args:
+            url: The URL of the video
+            output_dir: Path where the video would be downloaded
+
+        Returns:
+            A Video instance (or None if the extraction failed or timed out)
+        """
+        await self._semaphore.acquire()
+        try:
+            # Can skip check since the entry is known to be missing
+            job = self._executor.submit(VideoUtils.process_video_url, url, output_dir, check_if_exists=False)
+        except BaseException:
+            self._semaphore.release()
+            raise
+        extraction: asyncio.Future[Video | None] = self._loop.create_future()
+        extraction.add_done_callback(lambda _: self._semaphore.release())
+        job.add_done_callback(partial(self._forward, extraction))
+
+        try:
+            return await asyncio.wait_for(asyncio.shield(extraction), self.timeout)
+        except asyncio.TimeoutError:
+            self.logger.warning(f"Extraction of {url} timed out after {self.timeout}s. Skipping...")
+            Metrics.increment("extraction_timeouts")
+            return None
+
+    def _forward(self, extraction: "asyncio.Future[Video | None]", job: "Future[Video | None]") -> None:
+        """Pass the outcome of an extraction job (done in a worker thread) to the loop, unless it was closed"""
+        with self._loop_lock:
+            if not self._loop.is_closed():
+                self._loop.call_soon_threadsafe(self._set_outcome, extraction, job)
+
+    @staticmethod
+    def _set_outcome(extraction: "asyncio.Future[Video | None]", job: "Future[Video | None]") -> None:
+        if extraction.done():
+            return
+        if job.cancelled():
+            extraction.cancel()
+        elif (error := job.exception()) is not None:
+            extraction.set_exception(error)
+        else:
+            extraction.set_result(job.result())
+
+    def submit(self, url: str, output_dir: Path) -> "Future[Video | None]":
+        """
+        Resolve a video from a synchronous caller (thread-safe).
+
+        Args:
+            url: The URL of the video
+            output_dir: Path where the video would be downloaded
+
+        Returns:
+            A future resolved with the video (cancelling it cancels the resolution if it did not start yet)
+        """
+        return asyncio.run_coroutine_threadsafe(self.resolve(url, output_dir), self._loop)
+
+    def run(self, coroutine: Coroutine[Any, Any, T]) -> T:
+        """Run a coroutine on the loop of the resolver, waiting for its result"""
+        return asyncio.run_coroutine_threadsafe(coroutine, self._loop).result()
+
+    def close(self) -> None:
+        """Cancel pending resolutions and stop the event loop (extractions already running are not waited for)"""
+        if self.closed:
+            return
+
+        async def cancel_tasks() -> None:
+            tasks = [task for task in asyncio.all_tasks() if task is not asyncio.current_task()]
+            for task in tasks:
+                task.cancel()
+            await asyncio.gather(*tasks, return_exceptions=True)
+
+        self.run(cancel_tasks())
+        self._executor.shutdown(wait=False, cancel_futures=True)
+        self._loop.call_soon_threadsafe(self._loop.stop)
+        self._thread.join()
+        with self._loop_lock:
+            self._loop.close()
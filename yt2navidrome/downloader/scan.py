@@ -0,0 +1,237 @@
+import json
+import os
+import time
+from collections import Counter, defaultdict
+from collections.abc import Iterator
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
+from pathlib import Path
+
+from yt2navidrome.config import (
+    DEFAULT_ALBUM,
+    DEFAULT_ARTIST,
+    DEFAULT_TITLE,
+    SCAN_CACHE_FILENAME,
+    SCAN_WORKERS,
+    STATE_DIR_NAME,
+)
+from yt2navidrome.utils.ffmpeg import FFmpegHelper, FFmpegInstaller
+from yt2navidrome.utils.ffmpeg.helper import VIDEO_EXTS
+from yt2navidrome.utils.files import StatCache, StatCacheEntry
+from yt2navidrome.utils.logging import get_logger
+from yt2navidrome.utils.mp4 import MP4_EXTS, MP4Error, MP4TagReader
+
+# Bumped whenever the cached tags (or the way they are read) change
+SCAN_CACHE_VERSION = 1
+
+# Tags checked by scans, the only ones kept in the cache
+SCANNED_TAGS = ("artist", "title", "album", "album_artist")
+REQUIRED_TAGS = ("artist", "title", "album")
+PLACEHOLDER_TAGS = {"artist": DEFAULT_ARTIST, "title": DEFAULT_TITLE, "album": DEFAULT_ALBUM}
+
+
+@dataclass(slots=True)
+class ScannedFile:
+    """A media file of the library, with the tags read from it"""
+
+    path: str  # Relative to the output directory
+    tags: dict[str, str]
+
+
+@dataclass
+class ScanReport:
+    """The tag issues found in a library"""
+
+    files: int = 0  # Media files found
+    read: int = 0  # Files whose tags were read (the others were cached)
+    unreadable: list[str] = field(default_factory=list)
+    missing: dict[str, list[str]] = field(default_factory=dict)  # Path: missing tags
+    placeholders: dict[str, list[str]] = field(default_factory=dict)  # Path: tags left to their default value
+    # (Directory, album): files per album artist
+    album_artists: dict[tuple[str, str], Counter[str]] = field(default_factory=dict)
+
+    @property
+    def issues(self) -> int:
+        return len(self.unreadable) + len(self.missing) + len(self.placeholders) + len(self.album_artists)
+
+
+class ScanCache(StatCache[dict[str, str]]):
+    """
+    Tags of the media files of an output directory, keyed by relative path, mtime and size.
+
+    The cache is stored in the state directory, so that repeated scans only read the files
+    added or modified since the previous one.
+    """
+
+    logger = get_logger(__name__)
+    description = "scan cache"
+
+    @classmethod
+    def get_path(cls, directory: Path) -> Path:
+        return directory / STATE_DIR_NAME / SCAN_CACHE_FILENAME
+
+    @classmethod
+    def decode(cls, content: bytes) -> dict[str, StatCacheEntry[dict[str, str]]]:
+        data = json.loads(content)
+        if data.get("version") != SCAN_CACHE_VERSION:
+            return {}
+        return {
+            relative_path: (int(mtime_ns), int(size), dict(tags))
+            for relative_path, (mtime_ns, size, tags) in data["files"].items()
+        }
+
+    def encode(self) -> bytes:
+        return json.dumps({"version": SCAN_CACHE_VERSION, "files": self.entries}, ensure_ascii=False).encode()
+
+
+class LibraryScanner:
+    """
+    Checks the tags of all the media files of an output directory.
+
+    Tags are read in a pool of threads: MP4 files are read in-process (only their headers are loaded),
+    other containers with ffprobe subprocesses. Tags are cached by mtime and size, so that scans of
+    a large library only read the files added or modified since the previous scan.
+    """
+
+    logger = get_logger(__name__)
+
+    @classmethod
+    def iter_media_files(cls, directory: Path) -> Iterator[os.DirEntry[str]]:
+        """
+        Walk a directory with os.scandir, yielding its media files (the state directory is skipped).
+
+        Args:
+            directory: The directory to walk
+
+        Yields:
+            The directory entry of each media file (along with its cached stat)
+        """
+        directories = [directory]
+        while directories:
+            current = directories.pop()
+            try:
+                with os.scandir(current) as entries:
+                    for entry in entries:
+                        # Skip the state directory and temporary files (e.g. conversions in progress)
+                        if entry.name.startswith(".") or ".converting." in entry.name:
+                            continue
+                        if entry.is_dir(follow_symlinks=False):
+                            directories.append(Path(entry.path))
+                        elif os.path.splitext(entry.name)[1].lower() in VIDEO_EXTS and entry.is_file():
+                            yield entry
+            except OSError:
+                cls.logger.warning(f"Failed to list {current}", exc_info=True)
+
+    @classmethod
+    def read_tags(cls, filepath: Path) -> dict[str, str] | None:
+        """
+        Read the scanned tags of a file.
+
+        Args:
+            filepath: Path of the media file
+
+        Returns:
+            The scanned tags found in the file (keys are lowercase), or None if the file could not be read
+        """
+        tags: dict[str, str] | None = None
+        if filepath.suffix.lower() in MP4_EXTS:
+            try:
+                tags = MP4TagReader.read_tags(filepath)
+            except (MP4Error, OSError):
+                cls.logger.debug(f"Failed to read MP4 tags from {filepath}, falling back to ffprobe", exc_info=True)
+
+        if tags is None:
+            metadata = FFmpegHelper.get_metadata(filepath)
+            if "format" not in metadata:
+                return None
+            tags = metadata["format"].get("tags", {})
+
+        # Vorbis comments (Ogg, Opus) are usually reported in uppercase
+        tags = {key.lower(): value for key, value in tags.items()}
+        return {key: tags[key] for key in SCANNED_TAGS if key in tags}
+
+    @classmethod
+    def scan(cls, output_dir: Path, workers: int = SCAN_WORKERS, use_cache: bool = True) -> ScanReport:
+        """
+        Read the tags of all media files of an output directory and report their issues.
+
+        Args:
+            output_dir: The output directory
+            workers: Number of files whose tags are read in parallel
+            use_cache: Reuse the tags read by previous scans for unchanged files
+
+        Returns:
+            The report of the scan
+        """
+        start = time.perf_counter()
+        cache = ScanCache.load(output_dir) if use_cache else ScanCache(output_dir)
+        report = ScanReport()
+
+        files: list[ScannedFile] = []
+        to_read: list[tuple[str, Path, os.stat_result]] = []
+        for entry in cls.iter_media_files(output_dir):
+            relative_path = os.path.relpath(entry.path, output_dir)
+            stat = entry.stat()
+            tags = cache.get(relative_path, stat)
+            if tags is None:
+                to_read.append((relative_path, Path(entry.path), stat))
+            else:
+                files.append(ScannedFile(relative_path, tags))
+
+        report.files = len(files) + len(to_read)
+        report.read = len(to_read)
+        cls.logger.info(f"Found {report.files} media files, reading tags of {report.read} new or modified files...")
+
+        # MP4 files are read in-process, FFmpeg is only needed for other containers
+        needs_ffmpeg = any(filepath.suffix.lower() not in MP4_EXTS for _, filepath, _ in to_read)
+        if needs_ffmpeg and not FFmpegInstaller.ensure_ffmpeg_installed():
+            cls.logger.warning("FFmpeg is not installed, only the tags of MP4 files can be read")
+
+        with ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scan") as executor:
+            results = executor.map(cls.read_tags, [filepath for _, filepath, _ in to_read])
+            for (relative_path, _, stat), read_tags in zip(to_read, results, strict=True):
+                if read_tags is None:
+                    report.unreadable.append(relative_path)
+                    continue
+                cache.put(relative_path, stat, read_tags)
+                files.append(ScannedFile(relative_path, read_tags))
+
+        cache.discard({file.path for file in files})
+        cache.save()
+
+        cls.check_files(sorted(files, key=lambda file: file.path), report)
+        report.unreadable.sort()
+        cls.logger.info(f"Scanned {report.files} media files in {time.perf_counter() - start:.1f}s")
+        return report
+
+    @classmethod
+    def check_files(cls, files: list[ScannedFile], report: ScanReport) -> None:
+        """
+        Check the tags of files, adding their issues to a report.
+
+        Args:
+            files: The scanned files
+            report: The report to complete
+        """
+        album_artists: defaultdict[tuple[str, str], Counter[str]] = defaultdict(Counter)
+
+        for file in files:
+            missing = [key for key in REQUIRED_TAGS if not file.tags.get(key, "").strip()]
+            if missing:
+                report.missing[file.path] = missing
+
+            placeholders = [key for key, default in PLACEHOLDER_TAGS.items() if file.tags.get(key) == default]
+            if placeholders:
+                report.placeholders[file.path] = placeholders
+
+            # Each video has a directory of its own under the directory of its uploader: albums are told apart
+            # by the top-level directory, so that albums of different uploaders sharing a title are not mixed up
+            album = file.tags.get("album", "").strip()
+            if album and album != DEFAULT_ALBUM:
+                directory = file.path.partition(os.sep)[0] if os.sep in file.path else ""
+                album_artists[(directory, album)][file.tags.get("album_artist", "")] += 1
+
+        # Files of an album must share the same album artist, otherwise Navidrome splits the album
+        for key, counts in sorted(album_artists.items()):
+            if len(counts) > 1:
+                report.album_artists[key] = counts
@@ -0,0 +1,272 @@
+import copy
+import re
+import threading
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+from functools import cache
+from pathlib import Path
+from typing import Any, ClassVar, TypeVar
+
+from yt_dlp import YoutubeDL
+from yt_dlp.cookies import YoutubeDLCookieJar
+from yt_dlp.extractor.common import InfoExtractor
+from yt_dlp.utils import DownloadError
+
+from yt2navidrome.config import COOKIE_FILE_PATH
+from yt2navidrome.utils.ffmpeg import FFmpegInstaller
+from yt2navidrome.utils.logging import get_logger
+from yt2navidrome.utils.metrics import Metrics
+from yt2navidrome.utils.ratelimit import HostRateLimiter, ThrottledError
+
+# Option profiles, long-lived YoutubeDL instances are kept per profile (as many as requests run at once)
+PLAYLIST_PROFILE = "playlist"
+INFO_PROFILE = "info"
+DOWNLOAD_PROFILE = "download"
+# Thumbnail embedded later along with the metadata
+DOWNLOAD_SINGLE_PASS_PROFILE = "download_single_pass"  # noqa: S105 - Profile name ("single pass"), not a password
+
+# yt-dlp errors meaning that YouTube throttles us (rate limited, or flagged as a bot)
+THROTTLING_PATTERN = re.compile(
+    r"HTTP Error (?:429|403)|Too Many Requests|confirm you.?re not a bot|rate.?limit", re.IGNORECASE
+)
+
+T = TypeVar("T")
+
+
+@cache
+def get_cookie_file() -> str | None:
+    """Return the cookie file to use (if any). Only checked once per run."""
+    return COOKIE_FILE_PATH if Path(COOKIE_FILE_PATH).exists() else None
+
+
+PROFILE_OPTIONS: dict[str, dict[str, Any]] = {
+    PLAYLIST_PROFILE: {
+        "quiet": True,  # Suppress status messages
+        "extract_flat": "in_playlist",  # Only extract titles and URLs from the playlist, not all video info yet
+        "force_generic_extractor": True,  # Ensure it processes the playlist URL as a playlist
+        "skip_download": True,  # Do not download anything
+    },
+    INFO_PROFILE: {
+        "quiet": True,
+        "format": "bestaudio/best",
+        "no_playlist": True,
+        "force_generic_extractor": True,
+        "skip_download": True,
+        "embed_metatadata": True,
+    },
+    DOWNLOAD_PROFILE: {
+        # General Options
+        "format": "bestaudio[ext=m4a]",
+        "outtmpl": "%(title)s.%(ext)s",  # Replaced for each download
+        "noplaylist": True,
+        "writethumbnail": True,
+        # Postprocessors
+        "postprocessors": [{"key": "EmbedThumbnail"}],
+        # Verbosity
+        "quiet": True,
+        "noprogress": True,
+        "simulate": False,
+    },
+    DOWNLOAD_SINGLE_PASS_PROFILE: {
+        # General Options
+        "format": "bestaudio[ext=m4a]",
+        "outtmpl": "%(title)s.%(ext)s",  # Replaced for each download
+        "noplaylist": True,
+        "writethumbnail": True,
+        # Postprocessors (only the thumbnail is converted, the media file is left untouched)
+        "postprocessors": [{"key": "FFmpegThumbnailsConvertor", "format": "jpg", "when": "before_dl"}],
+        # Verbosity
+        "quiet": True,
+        "noprogress": True,
+        "simulate": False,
+    },
+}
+
+
+def build_options(profile: str, format_selector: str | None = None) -> dict[str, Any]:
+    """
+    Build the yt-dlp options of a profile.
+
+    Args:
+        profile: One of the PROFILE_OPTIONS keys
+        format_selector: yt-dlp format selector replacing the one of the profile (optional)
+
+    Returns:
+        The yt-dlp options
+    """
+    ydl_opts = copy.deepcopy(PROFILE_OPTIONS[profile])
+    if format_selector:
+        ydl_opts["format"] = format_selector
+
+    if profile in (DOWNLOAD_PROFILE, DOWNLOAD_SINGLE_PASS_PROFILE):
+        ydl_opts.update({"ffmpeg_location": FFmpegInstaller.get_ffmpeg_path()})
+        ydl_opts.update({"postprocessor_hooks": [Metrics.postprocessor_hook]})
+
+    cookie_file = get_cookie_file()
+    if cookie_file:
+        ydl_opts.update({"cookiefile": cookie_file})
+
+    return ydl_opts
+
+
+def request_with_backoff(url: str, request: Callable[[], T], rate_limited: bool = True) -> T:
+    """
+    Run a yt-dlp request through the rate limiter of its host, retrying with backoff while YouTube throttles us.
+
+    Args:
+        url: The URL requested
+        request: Function running the yt-dlp request
+        rate_limited: Whether the request waits for its turn (downloads) or not (info extractions)
+
+    Returns:
+        The result of the request
+
+    Raises:
+        DownloadError: If the request failed for another reason than throttling
+        ThrottledError: If the request is still throttled after all retries
+    """
+
+    def checked_request() -> T:
+        try:
+            return request()
+        except DownloadError as e:
+            if THROTTLING_PATTERN.search(str(e)):
+                raise ThrottledError(str(e)) from e
+            raise
+
+    return HostRateLimiter.call(url, checked_request, rate_limited=rate_limited)
+
+
+class SessionYoutubeDL(YoutubeDL):
+    """YoutubeDL instance using a cookie jar shared with other instances, instead of loading its own"""
+
+    def __init__(self, params: dict[str, Any], cookiejar: YoutubeDLCookieJar) -> None:
+        # Set first, since YoutubeDL may use its cookie jar while initializing
+        self._shared_cookiejar = cookiejar
+        super().__init__(params)  # type: ignore[arg-type]
+
+    @property
+    def cookiejar(self) -> YoutubeDLCookieJar:
+        return self._shared_cookiejar
+
+
+class YoutubeDLSession:
+    """
+    Keeps configured YoutubeDL instances alive for the whole run.
+
+    YoutubeDL instances are not thread-safe: each request borrows an idle instance of its profile
+    (creating one if they are all in use) and returns it once done. Instances are not tied to threads,
+    so a long-running process (serve) keeps reusing the same ones whatever the pools its requests run in,
+    and there are never more instances of a profile than requests using it at once.
+    Each instance keeps its own HTTP connection pool while the cookie jar is shared by all of them.
+    """
+
+    logger = get_logger(__name__)
+
+    _idle: ClassVar[dict[str, list[YoutubeDL]]] = {}  # Instances not in use, per profile (and format)
+    _instances: ClassVar[list[YoutubeDL]] = []
+    _extractors: ClassVar[list[type[InfoExtractor]]] = []
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+    _cookiejar: ClassVar[YoutubeDLCookieJar | None] = None
+    _generation: ClassVar[int] = 0  # Incremented when sessions are closed, so that borrowed instances are dropped
+
+    @classmethod
+    def create(cls, profile: str, format_selector: str | None = None) -> YoutubeDL:
+        """
+        Create a new YoutubeDL instance configured for a profile.
+
+        Args:
+            profile: The option profile to use
+            format_selector: yt-dlp format selector replacing the one of the profile (optional)
+
+        Returns:
+            The YoutubeDL instance
+        """
+        ydl = SessionYoutubeDL(build_options(profile, format_selector), cls.get_cookiejar())
+
+        for extractor in cls._extractors:
+            ydl.add_info_extractor(extractor())
+
+        return ydl
+
+    @classmethod
+    def get_cookiejar(cls) -> YoutubeDLCookieJar:
+        """
+        Return the cookie jar shared by all instances, loaded from the cookie file (if any) on first use.
+        Cookies set by a request are sent by the next ones whatever the instance, and saved on close.
+
+        Returns:
+            The cookie jar
+        """
+        with cls._lock:
+            if cls._cookiejar is None:
+                cookie_file = get_cookie_file()
+                cls._cookiejar = YoutubeDLCookieJar(cookie_file)
+                if cookie_file:
+                    cls._cookiejar.load()
+            return cls._cookiejar
+
+    @classmethod
+    @contextmanager
+    def borrow(cls, profile: str, format_selector: str | None = None) -> Iterator[YoutubeDL]:
+        """
+        Borrow an idle YoutubeDL instance of a profile for a request, creating one if none is idle.
+
+        Args:
+            profile: The option profile to use
+            format_selector: yt-dlp format selector replacing the one of the profile (instances are kept per format)
+
+        Yields:
+            The YoutubeDL instance, used by the calling thread only until the context exits
+        """
+        key = f"{profile}:{format_selector}" if format_selector else profile
+        with cls._lock:
+            idle = cls._idle.get(key)
+            ydl = idle.pop() if idle else None
+            generation = cls._generation
+
+        if ydl is None:
+            cls.logger.debug(f"Creating yt-dlp session for profile {key}")
+            ydl = cls.create(profile, format_selector)
+            with cls._lock:
+                cls._instances.append(ydl)
+
+        try:
+            yield ydl
+        finally:
+            with cls._lock:
+                # Instances borrowed before close_all were closed along with the others
+                if generation == cls._generation:
+                    cls._idle.setdefault(key, []).append(ydl)
+
+    @classmethod
+    def add_info_extractor(cls, extractor: type[InfoExtractor]) -> None:
+        """
+        Register an additional extractor in all sessions (e.g. a stub extractor for tests).
+        An extractor whose key is already known replaces the existing one.
+
+        Args:
+            extractor: The extractor class to register
+        """
+        with cls._lock:
+            cls._extractors.append(extractor)
+            instances = list(cls._instances)
+
+        for ydl in instances:
+            ydl.add_info_extractor(extractor())
+
+    @classmethod
+    def close_all(cls) -> None:
+        """Close all sessions, saving cookies and releasing HTTP connections"""
+        with cls._lock:
+            instances = list(cls._instances)
+            cls._instances.clear()
+            cls._idle.clear()
+            cls._cookiejar = None
+            cls._generation += 1
+
+        for ydl in instances:
+            try:
+                ydl.close()
+            except Exception:
+                cls.logger.exception("Failed to close yt-dlp session")
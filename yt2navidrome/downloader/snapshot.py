@@ -0,0 +1,154 @@
+import hashlib
+import json
+import time
+from dataclasses import asdict, dataclass, field
+from pathlib import Path
+from typing import Any
+
+from yt2navidrome.config import PLAYLIST_SNAPSHOTS_DIRNAME, STATE_DIR_NAME
+from yt2navidrome.downloader.models import Video
+from yt2navidrome.utils.files import write_atomic
+from yt2navidrome.utils.logging import get_logger
+
+SNAPSHOT_VERSION = 1
+
+
+@dataclass
+class SnapshotEntry:
+    """Represents a video of a playlist snapshot"""
+
+    video_id: str
+    url: str
+    title: str | None = None
+    uploader: str | None = None
+    duration: int | None = None
+    upload_date: str | None = None
+    channel_id: str | None = None
+    tags: list[str] | None = None
+    # Descriptions are not kept in snapshots (too large), videos parsing them are fully extracted (see FULL_INFO_FIELDS)
+
+    def to_video(self) -> Video | None:
+        """Build a Video from the entry (or None if its info is incomplete)"""
+        if not (self.title and self.uploader):
+            return None
+        return Video(
+            url=self.url,
+            title=self.title,
+            uploader=self.uploader,
+            duration=self.duration,
+            upload_date=self.upload_date,
+            channel_id=self.channel_id,
+            tags=tuple(self.tags or ()),
+        )
+
+    def update(self, video: Video) -> None:
+        """Store the info of a resolved video, so that it does not have to be resolved again"""
+        self.title, self.uploader = video.title, video.uploader
+        self.duration = video.duration if video.duration is not None else self.duration
+        self.upload_date = video.upload_date or self.upload_date
+        self.channel_id = video.channel_id or self.channel_id
+        self.tags = list(video.tags) or self.tags
+
+
+@dataclass
+class PlaylistSnapshot:
+    """
+    Represents the content of a playlist at a given time.
+
+    Snapshots are stored as JSON files in the state directory of the output directory,
+    so that the next runs only have to handle the entries added since then.
+    """
+
+    url: str
+    title: str
+    fetched_at: float = field(default_factory=time.time)
+    entries: list[SnapshotEntry] = field(default_factory=list)  # In playlist order
+
+    logger = get_logger(__name__)
+
+    @property
+    def age(self) -> float:
+        """Seconds elapsed since the playlist was fetched"""
+        return time.time() - self.fetched_at
+
+    @property
+    def etag(self) -> str:
+        """Fingerprint of the playlist content (IDs and order), changing whenever an entry is added/removed/moved"""
+        return hashlib.sha1(
+            "\n".join(entry.video_id for entry in self.entries).encode(), usedforsecurity=False
+        ).hexdigest()
+
+    def diff(self, previous: "PlaylistSnapshot") -> tuple[list[str], list[str]]:
+        """
+        Compare the snapshot with a previous one of the same playlist.
+
+        Args:
+            previous: The previous snapshot
+
+        Returns:
+            The IDs of the added entries and the IDs of the removed entries
+        """
+        current_ids = {entry.video_id for entry in self.entries}
+        previous_ids = {entry.video_id for entry in previous.entries}
+        added = [entry.video_id for entry in self.entries if entry.video_id not in previous_ids]
+        removed = [entry.video_id for entry in previous.entries if entry.video_id not in current_ids]
+        return added, removed
+
+    @classmethod
+    def get_path(cls, output_dir: Path, url: str) -> Path:
+        """Return the path of the snapshot of a playlist"""
+        key = hashlib.sha1(url.encode(), usedforsecurity=False).hexdigest()[:16]
+        return output_dir / STATE_DIR_NAME / PLAYLIST_SNAPSHOTS_DIRNAME / f"{key}.json"
+
+    @classmethod
+    def load(cls, output_dir: Path, url: str) -> "PlaylistSnapshot | None":
+        """
+        Load the last snapshot of a playlist.
+
+        Args:
+            output_dir: The output directory of the playlist
+            url: The URL of the playlist
+
+        Returns:
+            The snapshot (or None if there is none or it can not be read)
+        """
+        path = cls.get_path(output_dir, url)
+        if not path.is_file():
+            return None
+
+        try:
+            with open(path, encoding="utf-8") as f:
+                data: dict[str, Any] = json.load(f)
+
+            if data.get("version") != SNAPSHOT_VERSION or data.get("url") != url:
+                return None
+
+            return cls(
+                url=data["url"],
+                title=data["title"],
+                fetched_at=float(data["fetched_at"]),
+                entries=[SnapshotEntry(**entry) for entry in data["entries"]],
+            )
+
+        except (OSError, ValueError, KeyError, TypeError):
+            cls.logger.warning(f"Ignoring invalid playlist snapshot {path}", exc_info=True)
+            return None
+
+    def save(self, output_dir: Path) -> None:
+        """
+        Save the snapshot, replacing the previous one atomically.
+
+        Args:
+            output_dir: The output directory of the playlist
+        """
+        path = self.get_path(output_dir, self.url)
+        data = {
+            "version": SNAPSHOT_VERSION,
+            "url": self.url,
+            "title": self.title,
+            "fetched_at": self.fetched_at,
+            "etag": self.etag,
+            "entries": [asdict(entry) for entry in self.entries],
+        }
+
+        write_atomic(path, json.dumps(data, ensure_ascii=False, indent=1))
@@ -1,16 +1,32 @@
 import re
+import subprocess as sp
 from pathlib import Path
-from typing import cast
+from typing import Any, cast
 
-import ffmpeg_downloader as ffdl
-from yt_dlp import YoutubeDL
+from yt_dlp.utils import DownloadError
 
-from yt2navidrome.config import COOKIE_FILE_PATH
+from yt2navidrome.config import DEFAULT_FORMAT_PROFILES
 from yt2navidrome.downloader.common import check_if_already_downloaded, extract_video_id_from_url
+from yt2navidrome.downloader.formats import FormatProfile, get_format_chain
+from yt2navidrome.downloader.index import LibraryIndex
 from yt2navidrome.downloader.metadata import MetadataUtils
 from yt2navidrome.downloader.models import Video
-from yt2navidrome.template.models import MetadataParser
+from yt2navidrome.downloader.session import (
+    DOWNLOAD_PROFILE,
+    DOWNLOAD_SINGLE_PASS_PROFILE,
+    INFO_PROFILE,
+    YoutubeDLSession,
+    request_with_backoff,
+)
+from yt2navidrome.template.compiled import CompiledTemplate
+from yt2navidrome.utils.ffmpeg import FFmpegTranscoder
 from yt2navidrome.utils.logging import get_logger
+from yt2navidrome.utils.metrics import Metrics
+
+THUMBNAIL_EXTS = (".jpg", ".png")  # Image formats that can be embedded as cover art
+
+# yt-dlp error raised when no stream matches the format selector
+FORMAT_UNAVAILABLE_PATTERN = re.compile(r"Requested format is not available", re.IGNORECASE)
 
 
 def clean_path_ascii(s: str) -> str:
@@ -55,20 +71,10 @@ class VideoUtils:
                     return None
 
             # 1. Extract the video information
-            ydl_opts = {
-                "quiet": True,
-                "format": "bestaudio/best",
-                "no_playlist": True,
-                "force_generic_extractor": True,
-                "skip_download": True,
-                "embed_metatadata": True,
-            }
-
-            if Path(COOKIE_FILE_PATH).exists():
-                ydl_opts.update({"cookiefile": COOKIE_FILE_PATH})
-
-            with YoutubeDL(ydl_opts) as ydl:  # type: ignore[arg-type]
-                video_info = ydl.extract_info(video_url, download=False)
+            with YoutubeDLSession.borrow(INFO_PROFILE) as ydl, Metrics.timer("video_extraction"):
+                video_info = request_with_backoff(
+                    video_url, lambda: ydl.extract_info(video_url, download=False), rate_limited=False
+                )
 
             if not video_info:
                 cls.logger.error(f"URL {video_url} did not return a valid video.")
@@ -78,24 +84,34 @@ class VideoUtils:
             video_title = cast(str, video_info.get("title", "Untitled Video"))
             video_uploader = cast(str, video_info.get("uploader", "Unknown Uploader"))
 
-            # 3. Create and return the Video instance
-            return Video(url=video_url, title=video_title, uploader=video_uploader)
+            # 3. Create and return the Video instance (with the optional fields parsers can use)
+            return Video.from_info(video_url, video_title, video_uploader, video_info)
 
         except Exception:
             cls.logger.exception("An error occurred during initial video processing")
             return None
 
     @classmethod
-    def download(cls, video: Video, output_dir: Path) -> Path | None:
+    def download(
+        cls,
+        video: Video,
+        output_dir: Path,
+        embed_thumbnail: bool = True,
+        formats: list[FormatProfile] | None = None,
+    ) -> tuple[Path, FormatProfile] | None:
         """
         Download a Youtube video URL.
 
         Args:
             video: The YouTube video to download.
             output_dir: Directory where the video will be saved
+            embed_thumbnail: Whether yt-dlp embeds the thumbnail. Otherwise it is only written
+                next to the downloaded file (see get_thumbnail_path) to be embedded along with the metadata.
+            formats: Format profiles tried in order until one is available (defaults to DEFAULT_FORMAT_PROFILES)
 
         Returns:
-            The path of the downloaded video (or None if download failed)
+            The path of the downloaded video and its format profile (or None if download failed).
+            Files of converted profiles still have to be converted (see convert) before being added to the library.
         """
         cls.logger.info(f"Starting download for {video.url}")
 
@@ -108,50 +124,156 @@ class VideoUtils:
         download_dir = output_dir / clean_path_ascii(video.uploader) / video_id
         download_dir.mkdir(parents=True, exist_ok=True)
 
-        ydl_opts = {
-            # General Options
-            "format": "bestaudio[ext=m4a]",
-            "outtmpl": str(download_dir / download_filename_no_ext) + ".%(ext)s",
-            "noplaylist": True,
-            "writethumbnail": True,
-            # FFmpeg
-            "ffmpeg_location": ffdl.ffmpeg_path,
-            # Postprocessors
-            "postprocessors": [{"key": "EmbedThumbnail"}],
-            # Verbosity
-            "quiet": True,
-            "noprogress": True,
-            "simulate": False,
-        }
-
-        if Path(COOKIE_FILE_PATH).exists():
-            ydl_opts.update({"cookiefile": COOKIE_FILE_PATH})
+        profiles = formats or get_format_chain(DEFAULT_FORMAT_PROFILES)
+        for profile in profiles:
+            try:
+                # Thumbnails of converted files are embedded along with the metadata, once converted
+                download_path = cls.download_format(
+                    video, download_dir / download_filename_no_ext, profile, embed_thumbnail and not profile.converted
+                )
+            except DownloadError as e:
+                if not FORMAT_UNAVAILABLE_PATTERN.search(str(e)):
+                    cls.logger.exception(f"Failed to download {video.url}")
+                    return None
 
-        try:
-            with YoutubeDL(ydl_opts) as ydl:  # type: ignore[arg-type]
-                ydl.download(video.url)
-
-            # Verifies the file was indeed downloaded and return its path
-            expected_path = download_dir / (download_filename_no_ext + ".m4a")
-            if expected_path.exists():
-                cls.logger.info(f"Successfully downloaded {video.url} to {expected_path}")
-                return expected_path
-            else:
-                cls.logger.warning(f"Download finished but no file found at {expected_path}")
+                cls.logger.info(f"No {profile.name} format available for {video.url}. Trying next format...")
+                Metrics.increment("format_fallbacks")
+                continue
+            except Exception:
+                cls.logger.exception(f"Failed to download {video.url}")
+                return None
+
+            if not download_path:
+                cls.logger.warning(f"Download finished but no file found in {download_dir}")
                 return None
 
+            if not profile.converted:
+                cls.add_to_library(video, output_dir, download_path)
+            return download_path, profile
+
+        cls.logger.error(f"No format available for {video.url} among: {', '.join(p.name for p in profiles)}")
+        return None
+
+    @classmethod
+    def download_format(
+        cls, video: Video, path_no_ext: Path, profile: FormatProfile, embed_thumbnail: bool
+    ) -> Path | None:
+        """
+        Download the stream of a video selected by a format profile.
+
+        Args:
+            video: The YouTube video to download.
+            path_no_ext: Path of the downloaded file, without extension
+            profile: The format profile
+            embed_thumbnail: Whether yt-dlp embeds the thumbnail (see download)
+
+        Returns:
+            The path of the downloaded file (or None if not found)
+
+        Raises:
+            DownloadError: If the download failed (e.g. no stream matches the format of the profile)
+        """
+        session_profile = DOWNLOAD_PROFILE if embed_thumbnail else DOWNLOAD_SINGLE_PASS_PROFILE
+        with YoutubeDLSession.borrow(session_profile, profile.format) as ydl:
+            outtmpl = cast(dict[str, str], ydl.params["outtmpl"])  # Normalized to a dict by YoutubeDL
+            outtmpl["default"] = str(path_no_ext) + ".%(ext)s"
+
+            def request() -> dict[str, Any] | None:
+                with Metrics.timer("download"):
+                    return cast(dict[str, Any] | None, ydl.extract_info(video.url, download=True))
+
+            # Waits for our turn to avoid YT rate limits
+            info = request_with_backoff(video.url, request)
+
+        # The extension depends on the downloaded stream (and on the post processors)
+        requested_downloads = (info or {}).get("requested_downloads") or [{}]
+        filepath = requested_downloads[0].get("filepath")
+        download_path = Path(filepath) if filepath else path_no_ext.with_suffix(f".{profile.extension}")
+        if not download_path.is_file():
+            return None
+
+        Metrics.increment("bytes_downloaded", download_path.stat().st_size)
+        return download_path
+
+    @classmethod
+    def convert(cls, video: Video, output_dir: Path, download_path: Path, profile: FormatProfile) -> Path | None:
+        """
+        Convert a downloaded file to its format profile in the transcoding pool, then add it to the library.
+        Only the calling thread waits for the conversion.
+
+        Args:
+            video: The downloaded video
+            output_dir: Directory where the video was saved
+            download_path: The path of the downloaded file
+            profile: The format profile the file was downloaded with
+
+        Returns:
+            The path of the converted file (or None if the conversion failed)
+        """
+        if profile.codec is None:
+            return download_path
+
+        converted_path = download_path.with_suffix(f".{profile.extension}")
+        temp_path = download_path.with_suffix(f".converting.{profile.extension}")
+
+        try:
+            FFmpegTranscoder.submit(download_path, temp_path, profile.codec, profile.bitrate).result()
+            temp_path.replace(converted_path)
+        except sp.CalledProcessError as e:
+            cls.logger.exception(
+                f"Failed to convert {download_path.name} to {profile.name}: {e.stderr.decode().strip()}"
+            )
+            temp_path.unlink(missing_ok=True)
+            return None
         except Exception:
-            cls.logger.exception(f"Failed to download {video.url}")
+            cls.logger.exception(f"Failed to convert {download_path.name} to {profile.name}")
+            temp_path.unlink(missing_ok=True)
             return None
 
+        # The downloaded file is kept until then, so that an interrupted conversion does not download it again
+        if download_path != converted_path:
+            download_path.unlink(missing_ok=True)
+
+        Metrics.increment("videos_transcoded")
+        cls.add_to_library(video, output_dir, converted_path)
+        return converted_path
+
+    @classmethod
+    def add_to_library(cls, video: Video, output_dir: Path, path: Path) -> None:
+        """Record a downloaded (and converted if needed) file in the library index"""
+        cls.logger.info(f"Successfully downloaded {video.url} to {path}")
+        Metrics.increment("videos_downloaded")
+
+        video_id = extract_video_id_from_url(video.url)
+        if video_id:
+            LibraryIndex.open(output_dir).add(video_id, path, uploader=video.uploader, title=video.title, tagged=False)
+
+    @classmethod
+    def get_thumbnail_path(cls, download_path: Path) -> Path | None:
+        """
+        Return the thumbnail written next to a downloaded file (if any).
+
+        Args:
+            download_path: The path of the downloaded video
+
+        Returns:
+            The path of the thumbnail (or None if not found)
+        """
+        for ext in THUMBNAIL_EXTS:
+            thumbnail_path = download_path.with_suffix(ext)
+            if thumbnail_path.is_file():
+                return thumbnail_path
+
+        return None
+
     @classmethod
-    def parse_metadata_from_info(cls, video: Video, parsers: list[MetadataParser]) -> dict[str, str]:
+    def parse_metadata_from_info(cls, video: Video, template: CompiledTemplate) -> dict[str, str]:
         """
         Parse video info to generate metadata entries.
 
         Args:
             video: The video to extract info from
-            parsers: A list of parsers to use to define the metadata entries values
+            template: The compiled template whose parsers define the metadata entries values
 
         Returns:
             A dict with metadata entries (key: value)
@@ -160,8 +282,32 @@ class VideoUtils:
 
         metadata_entries = {}
 
-        for parser in parsers:
+        for parser in template.parsers:
             parser_result = MetadataUtils.run_parser(video, parser)
             metadata_entries.update(parser_result)
 
         return metadata_entries
+
+    @classmethod
+    def parse_metadata_from_videos(cls, videos: list[Video], template: CompiledTemplate) -> list[dict[str, str]]:
+        """
+        Parse the info of many videos at once to generate their metadata entries.
+        Each parser (and each of its post processors) is applied to all videos in a single pass.
+
+        Args:
+            videos: The videos to extract info from
+            template: The compiled template whose parsers define the metadata entries values
+
+        Returns:
+            A list with the metadata entries (key: value) of each video, in the same order
+        """
+        cls.logger.info(f"Parsing metadata from {len(videos)} videos")
+
+        metadata_entries: list[dict[str, str]] = [{} for _ in videos]
+
+        for parser in template.parsers:
+            parser_results = MetadataUtils.run_parser_batch(videos, parser)
+            for entries, parser_result in zip(metadata_entries, parser_results, strict=True):
+                entries.update(parser_result)
+
+        return metadata_entries
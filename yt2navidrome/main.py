@@ -1,17 +1,53 @@
+import importlib
 import logging
-import sys
+from typing import cast
 
 import click
 
-from yt2navidrome.commands import download, edit
+from yt2navidrome.commands import COMMANDS, LazyCommand
 from yt2navidrome.utils.banner import display_banner
-from yt2navidrome.utils.ffmpeg import FFmpegInstaller
 from yt2navidrome.utils.logging import disable_all_logging, get_logger, set_global_logging_level
 
 logger = get_logger(__name__)
 
 
-@click.group()
+class LazyGroup(click.Group):
+    """Click group importing its subcommands only when they are invoked (keeps startup and --help fast)"""
+
+    def __init__(self, *args: object, lazy_subcommands: dict[str, LazyCommand] | None = None, **kwargs: object) -> None:
+        super().__init__(*args, **kwargs)  # type: ignore[arg-type]
+        self.lazy_subcommands = lazy_subcommands or {}
+
+    def list_commands(self, ctx: click.Context) -> list[str]:
+        return sorted({*super().list_commands(ctx), *self.lazy_subcommands})
+
+    def get_command(self, ctx: click.Context, cmd_name: str) -> click.Command | None:
+        if cmd_name in self.lazy_subcommands:
+            return self._load_command(cmd_name)
+        return super().get_command(ctx, cmd_name)
+
+    def format_commands(self, ctx: click.Context, formatter: click.HelpFormatter) -> None:
+        # Same listing as click.Group, without importing lazy commands: their help text is kept along with them
+        commands: list[tuple[str, click.Command]] = []
+        for name in self.list_commands(ctx):
+            if name in self.lazy_subcommands:
+                command: click.Command | None = click.Command(name, help=self.lazy_subcommands[name].help)
+            else:
+                command = super().get_command(ctx, name)
+            if command is not None and not command.hidden:
+                commands.append((name, command))
+
+        if commands:
+            limit = formatter.width - 6 - max(len(name) for name, _ in commands)
+            with formatter.section("Commands"):
+                formatter.write_dl([(name, command.get_short_help_str(limit)) for name, command in commands])
+
+    def _load_command(self, cmd_name: str) -> click.Command:
+        module_name, attr_name = self.lazy_subcommands[cmd_name].path.split(":")
+        return cast(click.Command, getattr(importlib.import_module(module_name), attr_name))
+
+
+@click.group(cls=LazyGroup, lazy_subcommands=COMMANDS)
 @click.option(
     "--verbose",
     "-v",
@@ -44,13 +80,3 @@ def cli(ctx: click.Context, verbose: bool, quiet: bool) -> None:
     # Display banner
     if not quiet:
         display_banner()
-
-    # Ensure FFmpeg is installed
-    if not FFmpegInstaller.ensure_ffmpeg_installed():
-        logger.error("Failure in downloading FFmpeg. Exiting...")
-        sys.exit(1)
-
-
-# Register subcommands
-cli.add_command(download)
-cli.add_command(edit)
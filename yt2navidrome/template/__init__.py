@@ -1,7 +1,10 @@
+from .actions import PostProcessorRegistry
+from .compiled import CompiledTemplate, TemplateCompiler
+from .errors import TemplateCompileError
 from .models import setup_yaml_constructors, setup_yaml_representers
 from .reader import TemplateReader
 
-__all__ = ["TemplateReader"]
+__all__ = ["CompiledTemplate", "PostProcessorRegistry", "TemplateCompileError", "TemplateCompiler", "TemplateReader"]
 
 # Setup all YAML constructors and representers
 setup_yaml_constructors()
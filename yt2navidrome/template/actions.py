@@ -0,0 +1,195 @@
+import re
+from collections.abc import Callable
+from dataclasses import dataclass
+from typing import Any, ClassVar
+
+from yt2navidrome.template.errors import InvalidArgumentError, InvalidPatternError, UnsupportedActionError
+
+# An action computes the output value from the input values and the prepared args
+ActionFunc = Callable[[list[str], dict[str, Any]], str]
+
+# A preparation hook converts the resolved args once, when the template is compiled
+PrepareFunc = Callable[[dict[str, Any]], dict[str, Any]]
+
+# Featured artists mentions: "feat. X", "(ft. X)", "[featuring X]"...
+FEAT_PATTERN = re.compile(r"\s*[(\[]?\s*\b(?:feat|ft|featuring)\b\.?\s+[^)\]]*[)\]]?", re.IGNORECASE)
+
+
+@dataclass(frozen=True)
+class PostProcessorAction:
+    """Represents a post processing action that can be used in templates"""
+
+    name: str
+    func: ActionFunc
+    required_args: tuple[str, ...] = ()
+    prepare: PrepareFunc | None = None
+    accepts_missing: bool = False  # Missing inputs (unmatched optional groups) are given as empty strings
+
+
+class PostProcessorRegistry:
+    _actions: ClassVar[dict[str, PostProcessorAction]] = {}
+
+    @classmethod
+    def register(
+        cls,
+        name: str,
+        required_args: tuple[str, ...] = (),
+        prepare: PrepareFunc | None = None,
+        accepts_missing: bool = False,
+    ) -> Callable[[ActionFunc], ActionFunc]:
+        """
+        Decorator registering a function as a post processing action.
+
+        Args:
+            name: Name of the action, as used in templates
+            required_args: Arguments that must be provided by templates
+            prepare: Hook preparing the args once at compile time (e.g. compiling regexes)
+            accepts_missing: Whether the action runs when its inputs did not match
+
+        Returns:
+            The decorator
+        """
+
+        def decorator(func: ActionFunc) -> ActionFunc:
+            cls._actions[name] = PostProcessorAction(name, func, required_args, prepare, accepts_missing)
+            return func
+
+        return decorator
+
+    @classmethod
+    def get(cls, name: str) -> PostProcessorAction:
+        """
+        Get a registered action.
+
+        Args:
+            name: Name of the action
+
+        Returns:
+            The action
+
+        Raises:
+            UnsupportedActionError: If no action is registered with this name
+        """
+        if name not in cls._actions:
+            raise UnsupportedActionError(name)
+        return cls._actions[name]
+
+    @classmethod
+    def names(cls) -> list[str]:
+        """Return the names of all registered actions"""
+        return sorted(cls._actions)
+
+
+def compile_arg(action: str, args: dict[str, Any], key: str) -> re.Pattern[str]:
+    """Compile a regex argument, honoring the optional ignore_case argument"""
+    if not isinstance(args[key], str):
+        raise InvalidArgumentError(action, key, "a string")
+
+    try:
+        return re.compile(args[key], re.IGNORECASE if args.get("ignore_case") else 0)
+    except re.error as e:
+        raise InvalidPatternError(args[key], e) from e
+
+
+#### SPLIT ####
+
+
+def prepare_split(args: dict[str, Any]) -> dict[str, Any]:
+    # Split on any of the separators (a string is a list of single character separators)
+    separators = args["separators"]
+    if not separators or not all(isinstance(separator, str) for separator in separators):
+        raise InvalidArgumentError("split", "separators", "a string or a list of strings")
+
+    args["pattern"] = re.compile("|".join(map(re.escape, separators)))
+    return args
+
+
+@PostProcessorRegistry.register("split", required_args=("separators", "glue"), prepare=prepare_split)
+def run_split(values: list[str], args: dict[str, Any]) -> str:
+    """Split the input on any of the separators and rejoin the parts with glue"""
+    parts = [part for part in args["pattern"].split(values[0]) if part.strip()]  # Remove empty parts
+    return str(args["glue"]).join(parts)
+
+
+#### REPLACE ####
+
+
+def prepare_replace(args: dict[str, Any]) -> dict[str, Any]:
+    args["old"] = str(args["old"])
+    args["new"] = str(args["new"])
+    return args
+
+
+@PostProcessorRegistry.register("replace", required_args=("old", "new"), prepare=prepare_replace)
+def run_replace(values: list[str], args: dict[str, Any]) -> str:
+    """Replace all occurrences of old with new"""
+    return values[0].replace(args["old"], args["new"])
+
+
+#### REGEX SUB ####
+
+
+def prepare_regex_sub(args: dict[str, Any]) -> dict[str, Any]:
+    args["compiled_pattern"] = compile_arg("regex_sub", args, "pattern")
+    args["repl"] = str(args["repl"])
+    return args
+
+
+@PostProcessorRegistry.register("regex_sub", required_args=("pattern", "repl"), prepare=prepare_regex_sub)
+def run_regex_sub(values: list[str], args: dict[str, Any]) -> str:
+    """Replace all matches of pattern with repl (which can reference groups, e.g. \\1)"""
+    return str(args["compiled_pattern"].sub(args["repl"], values[0]))
+
+
+#### TITLE CASE ####
+
+
+@PostProcessorRegistry.register("title_case")
+def run_title_case(values: list[str], args: dict[str, Any]) -> str:
+    """Capitalize each word, preserving all-uppercase words (e.g. acronyms)"""
+    return " ".join(word if word.isupper() else word.capitalize() for word in values[0].split())
+
+
+#### STRIP FEAT ####
+
+
+@PostProcessorRegistry.register("strip_feat")
+def run_strip_feat(values: list[str], args: dict[str, Any]) -> str:
+    """Remove featured artists mentions (feat. X, ft. X, featuring X)"""
+    return FEAT_PATTERN.sub("", values[0]).strip()
+
+
+#### MAP ####
+
+
+def prepare_map(args: dict[str, Any]) -> dict[str, Any]:
+    if not isinstance(args["table"], dict):
+        raise InvalidArgumentError("map", "table", "a mapping")
+
+    ignore_case = bool(args.get("ignore_case"))
+    args["lookup"] = {
+        (str(key).lower() if ignore_case else str(key)): str(value) for key, value in args["table"].items()
+    }
+    args["ignore_case"] = ignore_case
+    return args
+
+
+@PostProcessorRegistry.register("map", required_args=("table",), prepare=prepare_map)
+def run_map(values: list[str], args: dict[str, Any]) -> str:
+    """Replace the input with its value in the lookup table (unchanged if not found)"""
+    key = values[0].lower() if args["ignore_case"] else values[0]
+    return str(args["lookup"].get(key, values[0]))
+
+
+#### DEFAULT ####
+
+
+def prepare_default(args: dict[str, Any]) -> dict[str, Any]:
+    args["value"] = str(args["value"])
+    return args
+
+
+@PostProcessorRegistry.register("default", required_args=("value",), prepare=prepare_default, accepts_missing=True)
+def run_default(values: list[str], args: dict[str, Any]) -> str:
+    """Use value when the input is missing or empty"""
+    return values[0] if values[0].strip() else str(args["value"])
@@ -0,0 +1,52 @@
+import hashlib
+import pickle
+from functools import cache
+from pathlib import Path
+
+from yt2navidrome.config import CACHE_DIR, TEMPLATES_CACHE_DIRNAME
+from yt2navidrome.template.models import Template
+from yt2navidrome.utils.files import StatCache, StatCacheEntry
+from yt2navidrome.utils.logging import get_logger
+
+# Bumped whenever cached objects (templates, compiled parsers) change shape in a way the models hash does not catch
+TEMPLATE_CACHE_VERSION = 3
+
+# Modules defining the cached objects: caches written by other versions of them are ignored
+MODEL_SOURCES = ("models/*.py", "compiled.py")
+
+
+@cache
+def get_cache_key() -> tuple[int, str]:
+    """Return the key of the caches written by this version of the models (their version and source hash)"""
+    digest = hashlib.sha1(usedforsecurity=False)
+    package_path = Path(__file__).parent
+    for path in sorted(path for pattern in MODEL_SOURCES for path in package_path.glob(pattern)):
+        digest.update(path.name.encode())
+        digest.update(path.read_bytes())
+    return TEMPLATE_CACHE_VERSION, digest.hexdigest()
+
+
+class TemplateCache(StatCache[Template]):
+    """
+    Parsed and compiled templates of an input directory, keyed by file name, mtime and size.
+
+    The cache is pickled in the cache directory (not next to the templates, that may be read-only),
+    so that only new and modified templates have to be parsed and validated again.
+    """
+
+    logger = get_logger(__name__)
+    description = "template cache"
+
+    @classmethod
+    def get_path(cls, directory: Path) -> Path:
+        key = hashlib.sha1(str(directory.resolve()).encode(), usedforsecurity=False).hexdigest()[:16]
+        return Path(CACHE_DIR) / TEMPLATES_CACHE_DIRNAME / f"{key}.pickle"
+
+    @classmethod
+    def decode(cls, content: bytes) -> dict[str, StatCacheEntry[Template]]:
+        # The cache is only written by us, in the cache directory of the user
+        key, entries = pickle.loads(content)  # noqa: S301
+        return entries if key == get_cache_key() else {}
+
+    def encode(self) -> bytes:
+        return pickle.dumps((get_cache_key(), self.entries), protocol=pickle.HIGHEST_PROTOCOL)
@@ -0,0 +1,152 @@
+import re
+from dataclasses import dataclass, field
+from typing import Any
+
+from yt2navidrome.template.actions import PostProcessorAction, PostProcessorRegistry
+from yt2navidrome.template.errors import InvalidPatternError, MissingArgumentError, UnknownInputKeyError
+from yt2navidrome.template.models import Argument, MetadataParser, PostProcessor, Template
+
+
+@dataclass(frozen=True)
+class CompiledPostProcessor:
+    """A PostProcessor with its arguments resolved and prepared for execution"""
+
+    action: PostProcessorAction
+    inputs: tuple[str, ...]
+    output: str
+    args: dict[str, Any]
+    summary: str
+
+
+@dataclass(frozen=True)
+class CompiledParser:
+    """A MetadataParser with its pattern compiled and its post processors prepared"""
+
+    source: str
+    pattern: re.Pattern[str]
+    post_processors: tuple[CompiledPostProcessor, ...]
+    summary: str
+
+
+@dataclass(frozen=True)
+class CompiledTemplate:
+    """The parsers of a Template, ready to be run against every video"""
+
+    parsers: tuple[CompiledParser, ...] = field(default_factory=tuple)
+
+    @property
+    def sources(self) -> set[str]:
+        """The video fields read by the parsers"""
+        return {parser.source for parser in self.parsers}
+
+
+class TemplateCompiler:
+    @classmethod
+    def get(cls, template: Template) -> CompiledTemplate:
+        """
+        Return the compiled form of a template, compiling it on first use
+        (templates loaded by TemplateReader are compiled at load time).
+
+        Args:
+            template: The template to compile
+
+        Returns:
+            The compiled template
+
+        Raises:
+            TemplateCompileError: If the template is invalid
+        """
+        if template.compiled is None:
+            template.compiled = cls.compile(template)
+        return template.compiled
+
+    @classmethod
+    def compile(cls, template: Template) -> CompiledTemplate:
+        """
+        Compile all parsers and post processors of a template.
+
+        Args:
+            template: The template to compile
+
+        Returns:
+            The compiled template
+
+        Raises:
+            TemplateCompileError: If the template is invalid
+        """
+        return CompiledTemplate(parsers=tuple(cls.compile_parser(parser) for parser in template.parsers))
+
+    @classmethod
+    def compile_parser(cls, parser: MetadataParser) -> CompiledParser:
+        """
+        Compile the pattern of a parser and prepare its post processors.
+
+        Args:
+            parser: The parser to compile
+
+        Returns:
+            The compiled parser
+
+        Raises:
+            TemplateCompileError: If the pattern is invalid or a post processor is misconfigured
+        """
+        try:
+            pattern = re.compile(parser.pattern)
+        except re.error as e:
+            raise InvalidPatternError(parser.pattern, e) from e
+
+        # Post processors can use the pattern groups and the outputs of previous post processors
+        available_keys = set(pattern.groupindex)
+        post_processors: list[CompiledPostProcessor] = []
+
+        for post_processor in parser.post_processors or []:
+            for key in post_processor.input:
+                if key not in available_keys:
+                    raise UnknownInputKeyError(key, parser.pattern)
+
+            post_processors.append(cls.compile_post_processor(post_processor))
+            available_keys.add(post_processor.output)
+
+        return CompiledParser(
+            source=parser.source,
+            pattern=pattern,
+            post_processors=tuple(post_processors),
+            summary=parser.summary(),
+        )
+
+    @classmethod
+    def compile_post_processor(cls, post_processor: PostProcessor) -> CompiledPostProcessor:
+        """
+        Resolve the arguments of a post processor.
+
+        Args:
+            post_processor: The post processor to compile
+
+        Returns:
+            The compiled post processor
+
+        Raises:
+            TemplateCompileError: If the action is unknown or arguments are missing
+        """
+        action = PostProcessorRegistry.get(post_processor.action)
+
+        args = cls.resolve_args(post_processor.args)
+        missing = [key for key in action.required_args if args.get(key) is None]
+        if missing:
+            raise MissingArgumentError(action.name, missing)
+
+        if action.prepare:
+            args = action.prepare(args)
+
+        return CompiledPostProcessor(
+            action=action,
+            inputs=tuple(post_processor.input),
+            output=post_processor.output,
+            args=args,
+            summary=post_processor.summary(),
+        )
+
+    @classmethod
+    def resolve_args(cls, args: list[Argument] | None) -> dict[str, Any]:
+        """Convert a list of arguments into a dict (the last value wins for duplicated keys)"""
+        return {arg.key: arg.value for arg in args or []}
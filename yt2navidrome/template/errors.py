@@ -0,0 +1,81 @@
+import re
+
+
+class TemplateCompileError(ValueError):
+    """
+    Raised when a template can not be compiled (invalid pattern, missing args, ...)
+
+    Subclasses keep their constructor arguments as the exception args and build their message in __str__,
+    so that they can be pickled back from the worker processes reading templates.
+    """
+
+
+class InvalidPatternError(TemplateCompileError):
+    """Raised when a pattern is not a valid regex"""
+
+    def __init__(self, pattern: str, error: re.error) -> None:
+        super().__init__(pattern, error)
+        self.pattern = pattern
+        self.error = error
+
+    def __str__(self) -> str:
+        return f"Invalid pattern {self.pattern!r}: {self.error}"
+
+
+class UnsupportedActionError(TemplateCompileError):
+    """Raised when a post processor uses an unknown action"""
+
+    def __init__(self, action: str) -> None:
+        super().__init__(action)
+        self.action = action
+
+    def __str__(self) -> str:
+        return f"Unsupported post processing action: {self.action}"
+
+
+class MissingArgumentError(TemplateCompileError):
+    """Raised when a post processor misses required arguments"""
+
+    def __init__(self, action: str, missing: list[str]) -> None:
+        super().__init__(action, missing)
+        self.action = action
+        self.missing = missing
+
+    def __str__(self) -> str:
+        return f"Missing required arguments for {self.action}: {', '.join(self.missing)}"
+
+
+class InvalidArgumentError(TemplateCompileError):
+    """Raised when a post processor argument has an unexpected type"""
+
+    def __init__(self, action: str, key: str, expected: str) -> None:
+        super().__init__(action, key, expected)
+        self.action = action
+        self.key = key
+        self.expected = expected
+
+    def __str__(self) -> str:
+        return f"Invalid argument {self.key} for {self.action}: expected {self.expected}"
+
+
+class UnknownInputKeyError(TemplateCompileError):
+    """Raised when a post processor input is neither a pattern group nor a previous output"""
+
+    def __init__(self, key: str, pattern: str) -> None:
+        super().__init__(key, pattern)
+        self.key = key
+        self.pattern = pattern
+
+    def __str__(self) -> str:
+        return f"Post processor input {self.key!r} is not produced by pattern {self.pattern!r}"
+
+
+class InvalidPriorityError(TypeError):
+    """Raised when the priority of a template is not an integer"""
+
+    def __init__(self, priority: object) -> None:
+        super().__init__(priority)
+        self.priority = priority
+
+    def __str__(self) -> str:
+        return f"Invalid priority {self.priority!r}: expected an integer"
@@ -8,12 +8,18 @@ from .template import Template, template_constructor, template_representer
 __all__ = ["Argument", "PostProcessor", "MetadataParser", "Template"]
 
 
+def get_yaml_loader() -> type[yaml.FullLoader]:
+    """Return the loader used to read templates (the much faster LibYAML one if available)"""
+    return getattr(yaml, "CFullLoader", yaml.FullLoader)
+
+
 def setup_yaml_constructors() -> None:
-    """Register all YAML constructors"""
-    yaml.add_constructor("!Argument", argument_constructor)
-    yaml.add_constructor("!PostProcessor", postprocessor_constructor)
-    yaml.add_constructor("!MetadataParser", metadataparser_constructor)
-    yaml.add_constructor("!Template", template_constructor)
+    """Register all YAML constructors (on the default loaders and on the LibYAML one)"""
+    for loader in {None, get_yaml_loader()}:
+        yaml.add_constructor("!Argument", argument_constructor, Loader=loader)
+        yaml.add_constructor("!PostProcessor", postprocessor_constructor, Loader=loader)
+        yaml.add_constructor("!MetadataParser", metadataparser_constructor, Loader=loader)
+        yaml.add_constructor("!Template", template_constructor, Loader=loader)
 
 
 def setup_yaml_representers() -> None:
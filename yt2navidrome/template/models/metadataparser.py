@@ -12,7 +12,7 @@ class MetadataParser:
     """Represents a parser used to process video information
     and convert it into metadata for the downloaded video file"""
 
-    source: str
+    source: str  # Video field: title, uploader, duration, upload_date, channel_id, tags or description
     pattern: str
     post_processors: list[PostProcessor] | None = None
 
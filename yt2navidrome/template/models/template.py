@@ -1,10 +1,16 @@
-from dataclasses import dataclass
+from dataclasses import dataclass, field
+from typing import TYPE_CHECKING
 
 import yaml
 from yaml.dumper import Dumper
 from yaml.loader import FullLoader
 
+from yt2navidrome.template.errors import InvalidPriorityError
 from yt2navidrome.template.models.metadataparser import MetadataParser
+from yt2navidrome.utils.duration import parse_duration
+
+if TYPE_CHECKING:
+    from yt2navidrome.template.compiled import CompiledTemplate
 
 
 @dataclass
@@ -15,6 +21,22 @@ class Template:
     url: str
     playlist: bool
     parsers: list[MetadataParser]
+    refresh_interval: str | float | None = None  # Used by serve, e.g. 6h (as written in the template)
+    priority: int = 0  # When templates share videos, metadata of the highest priority wins (then file order)
+
+    # Refresh interval in seconds, parsed from refresh_interval (which is kept as is, so that it is dumped back as is)
+    refresh_seconds: float | None = field(default=None, init=False, repr=False, compare=False)
+
+    # Compiled parsers, set by TemplateReader when the template is loaded
+    compiled: "CompiledTemplate | None" = field(default=None, init=False, repr=False, compare=False)
+
+    def __post_init__(self) -> None:
+        # Compared to other priorities when templates share videos, which fails late if it is not a number
+        if not isinstance(self.priority, int) or isinstance(self.priority, bool):
+            raise InvalidPriorityError(self.priority)
+
+        if self.refresh_interval is not None:
+            self.refresh_seconds = parse_duration(self.refresh_interval)
 
     def summary(cls) -> str:
         template_type = "playlist" if cls.playlist else "video"
@@ -26,9 +48,13 @@ def template_representer(dumper: Dumper, data: Template) -> yaml.nodes.MappingNo
     """
     Represents the Template dataclass instance as a YAML mapping.
     """
-    return dumper.represent_mapping(
-        "!Template", {"name": data.name, "url": data.url, "playlist": data.playlist, "parsers": data.parsers}
-    )
+    mapping = {"name": data.name, "url": data.url, "playlist": data.playlist, "parsers": data.parsers}
+    if data.refresh_interval is not None:
+        mapping.update({"refresh_interval": data.refresh_interval})
+    if data.priority:
+        mapping.update({"priority": data.priority})
+
+    return dumper.represent_mapping("!Template", mapping)
 
 
 # 2. Custom Constructor (YAML -> Python object)
@@ -1,21 +1,55 @@
+from collections.abc import Callable, Iterator
+from concurrent.futures import Future, ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from functools import partial
 from pathlib import Path
 
 import yaml
 
-from yt2navidrome.template.models import Template
+from yt2navidrome.config import TEMPLATES_PARALLEL_THRESHOLD
+from yt2navidrome.template.cache import TemplateCache
+from yt2navidrome.template.compiled import TemplateCompiler
+from yt2navidrome.template.errors import InvalidPriorityError, TemplateCompileError
+from yt2navidrome.template.models import Template, get_yaml_loader
+from yt2navidrome.utils.duration import InvalidDurationError
 from yt2navidrome.utils.logging import get_logger
 
 
+def read_template_file(file_path: Path) -> Template | None:
+    """
+    Parse a YAML template file and compile its parsers (run in worker processes when reading many files).
+
+    Args:
+        file_path: The path of the YAML file
+
+    Returns:
+        The Template (or None if the file does not contain a template)
+    """
+    # Open and read the YAML file
+    with open(file_path) as f:
+        template = yaml.load(f, Loader=get_yaml_loader())  # noqa: S506
+
+    # Check if data was loaded successfully and is a dictionary
+    if not isinstance(template, Template):
+        return None
+
+    # Compile parsers once so that invalid templates are reported now, not for every video
+    template.compiled = TemplateCompiler.compile(template)
+    return template
+
+
 class TemplateReader:
     logger = get_logger(__name__)
 
     @classmethod
-    def read_directory(cls, directory_path: Path) -> list[Template]:
+    def read_directory(cls, directory_path: Path, use_cache: bool = True) -> list[Template]:
         """
         Reads all YAML files in a directory and converts them into Template instances.
+        Templates unchanged since the previous read are loaded from the template cache.
 
         Args:
             directory_path: The path to the directory containing YAML files.
+            use_cache: Whether to use the template cache (otherwise all files are parsed again).
 
         Returns:
             A list of Template instances.
@@ -26,32 +60,88 @@ class TemplateReader:
             print(f"Error: Directory not found at {directory_path}")
             return []
 
-        templates: list[Template] = []
-
-        # Iterate through all files in the specified directory
-        for file_path in directory_path.iterdir():
-            # We only want files ending in .yaml or .yml (case-insensitive)
-            if file_path.name.lower().endswith((".yaml", ".yml")):
-                cls.logger.debug(f"Processing file: {file_path}")
-
-                try:
-                    # Open and read the YAML file
-                    with open(file_path) as f:
-                        template = yaml.load(f, Loader=yaml.FullLoader)  # noqa: S506
-
-                    # Check if data was loaded successfully and is a dictionary
-                    if isinstance(template, Template):
-                        templates.append(template)
-                        cls.logger.debug(f"Successfully created template : {template.summary()}")
-                    else:
-                        cls.logger.warning(f"File {file_path} is empty or not a valid Template.")
-
-                except yaml.YAMLError:
-                    cls.logger.exception(f"Error parsing YAML in {file_path}")
-                except TypeError:
-                    # This catches errors if the YAML structure doesn't match the dataclass fields
-                    cls.logger.exception(f"Error creating Template for {file_path}. Data mismatch")
-                except Exception:
-                    cls.logger.exception(f"An unexpected error occurred while processing {file_path}")
-
-        return templates
+        # We only want files ending in .yaml or .yml (case-insensitive)
+        file_paths = sorted(path for path in directory_path.iterdir() if path.name.lower().endswith((".yaml", ".yml")))
+        cache = TemplateCache.load(directory_path) if use_cache else TemplateCache(directory_path)
+
+        templates: dict[Path, Template] = {}
+        stats = {file_path: file_path.stat() for file_path in file_paths}
+        for file_path, stat in stats.items():
+            cached_template = cache.get(file_path.name, stat)
+            if cached_template:
+                templates[file_path] = cached_template
+
+        modified_paths = [file_path for file_path in file_paths if file_path not in templates]
+        cls.logger.debug(f"Templates loaded from cache: {len(templates)}, to parse: {len(modified_paths)}")
+
+        for file_path, template in cls.read_files(modified_paths):
+            if template:
+                templates[file_path] = template
+                cache.put(file_path.name, stats[file_path], template)
+
+        # Deleted and invalid templates are not kept in the cache
+        cache.discard({file_path.name for file_path in templates})
+        if use_cache:
+            cache.save()
+
+        return [templates[file_path] for file_path in file_paths if file_path in templates]
+
+    @classmethod
+    def read_files(cls, file_paths: list[Path]) -> Iterator[tuple[Path, Template | None]]:
+        """
+        Read template files, in parallel processes when there are many of them.
+
+        Args:
+            file_paths: The paths of the YAML files
+
+        Yields:
+            The path of each file and its Template (or None if the file is invalid)
+        """
+        if len(file_paths) < TEMPLATES_PARALLEL_THRESHOLD:
+            for file_path in file_paths:
+                yield file_path, cls.read_or_log(file_path, partial(read_template_file, file_path))
+            return
+
+        with ProcessPoolExecutor() as executor:
+            futures = {file_path: executor.submit(read_template_file, file_path) for file_path in file_paths}
+            for file_path, future in futures.items():
+                yield file_path, cls.read_or_log(file_path, partial(cls.get_result, file_path, future))
+
+    @classmethod
+    def get_result(cls, file_path: Path, future: "Future[Template | None]") -> Template | None:
+        """Return the template read by a worker process, reading it again in-process if the pool broke"""
+        try:
+            return future.result()
+        except BrokenProcessPool:
+            # Valid templates must not be dropped (and discarded from the cache) because another read failed
+            cls.logger.warning(f"Template pool failed, reading {file_path} in-process")
+            return read_template_file(file_path)
+
+    @classmethod
+    def read_or_log(cls, file_path: Path, read: Callable[[], Template | None]) -> Template | None:
+        """Run the read of a template file, logging why it failed (if it did)"""
+        cls.logger.debug(f"Processing file: {file_path}")
+
+        try:
+            template = read()
+        except yaml.YAMLError:
+            cls.logger.exception(f"Error parsing YAML in {file_path}")
+        except TemplateCompileError:
+            cls.logger.exception(f"Invalid parsers in template {file_path}")
+        except InvalidDurationError:
+            cls.logger.exception(f"Invalid refresh_interval in template {file_path}")
+        except InvalidPriorityError:
+            cls.logger.exception(f"Invalid priority in template {file_path}")
+        except TypeError:
+            # This catches errors if the YAML structure doesn't match the dataclass fields
+            cls.logger.exception(f"Error creating Template for {file_path}. Data mismatch")
+        except Exception:
+            cls.logger.exception(f"An unexpected error occurred while processing {file_path}")
+        else:
+            if template:
+                cls.logger.debug(f"Successfully created template : {template.summary()}")
+            else:
+                cls.logger.warning(f"File {file_path} is empty or not a valid Template.")
+            return template
+
+        return None
@@ -1,5 +1,3 @@
-import pyfiglet
-
 from yt2navidrome.config import PROJECT_NAME
 
 
@@ -7,5 +5,7 @@ def display_banner(font: str = "slant") -> None:
     """
     Displaying a nice looking ASCII banner :)
     """
+    import pyfiglet  # Only loaded when the banner is displayed
+
     f = pyfiglet.figlet_format(PROJECT_NAME.upper(), font=font)
     print(f)
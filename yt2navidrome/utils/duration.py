@@ -0,0 +1,55 @@
+import re
+
+DURATION_UNITS = {"s": 1, "m": 60, "h": 3600, "d": 86400, "w": 604800}
+DURATION_PATTERN = re.compile(r"(\d+(?:\.\d+)?)([smhdw]?)")
+
+
+class InvalidDurationError(ValueError):
+    """Raised when a duration can not be parsed"""
+
+    def __init__(self, value: object) -> None:
+        # The value is kept as the only arg so that the error can be pickled (e.g. from template worker processes)
+        super().__init__(value)
+        self.value = value
+
+    def __str__(self) -> str:
+        return f"{self.value!r} is not a valid duration (e.g. 90, 30m, 6h, 1d)"
+
+
+def parse_duration(value: str | float) -> float:
+    """
+    Parse a duration given in seconds or with units (e.g. 90, "30m", "6h", "1d12h").
+
+    Args:
+        value: The duration to parse
+
+    Returns:
+        The duration in seconds
+
+    Raises:
+        InvalidDurationError: If the value is not a valid duration
+    """
+    if isinstance(value, int | float) and not isinstance(value, bool):
+        if value < 0:
+            raise InvalidDurationError(value)
+        return float(value)
+
+    text = str(value).strip().lower()
+    parts = DURATION_PATTERN.findall(text)
+
+    # The whole value must be made of <number><unit> parts
+    if not parts or "".join(number + unit for number, unit in parts) != text:
+        raise InvalidDurationError(value)
+
+    return sum(float(number) * DURATION_UNITS[unit or "s"] for number, unit in parts)
+
+
+def format_duration(seconds: float) -> str:
+    """Format a duration in a compact human readable form (e.g. 45s, 12m, 6h30m, 1d2h)"""
+    remaining = round(seconds)
+    parts: list[str] = []
+    for unit in ("d", "h", "m", "s"):
+        count, remaining = divmod(remaining, DURATION_UNITS[unit])
+        if count:
+            parts.append(f"{count}{unit}")
+    return "".join(parts[:2]) or "0s"
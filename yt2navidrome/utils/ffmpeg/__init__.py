@@ -1,4 +1,5 @@
 from .helper import FFmpegHelper
 from .installer import FFmpegInstaller
+from .transcoder import FFmpegTranscoder
 
-__all__ = ["FFmpegInstaller", "FFmpegHelper"]
+__all__ = ["FFmpegInstaller", "FFmpegHelper", "FFmpegTranscoder"]
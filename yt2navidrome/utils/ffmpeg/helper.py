@@ -4,11 +4,13 @@ import tempfile
 from pathlib import Path
 from typing import Any, cast
 
-import ffmpeg_downloader as ffdl
-
+from yt2navidrome.utils.ffmpeg.installer import FFmpegInstaller
 from yt2navidrome.utils.logging import get_logger
+from yt2navidrome.utils.mp4 import MP4_EXTS, MP4Error, MP4TagReader, MP4TagWriter
 
-VIDEO_EXTS = {".m4a", ".mp4", ".mkv", ".avi", ".mov", ".webm", ".flv", ".wmv", ".m4v"}
+VIDEO_EXTS = {".m4a", ".mp4", ".mkv", ".avi", ".mov", ".webm", ".flv", ".wmv", ".m4v", ".mp3", ".opus", ".ogg"}
+NO_COVER_EXTS = {".opus", ".ogg"}  # Containers in which ffmpeg can not embed cover art
+COVER_EXTS = {".jpg", ".jpeg", ".png"}
 
 
 class FFmpegHelper:
@@ -36,14 +38,25 @@ class FFmpegHelper:
             return {}
 
         try:
-            command = [ffdl.ffprobe_path, "-v", "error", "-show_entries", "format:stream", "-of", "json", str(filepath)]
+            command = [
+                FFmpegInstaller.get_ffprobe_path(),
+                "-v",
+                "error",
+                "-show_entries",
+                "format:stream",
+                "-of",
+                "json",
+                str(filepath),
+            ]
 
             cls.logger.debug(f"Running: {' '.join(command)}")
             result = sp.run(command, capture_output=True, encoding="utf-8", check=True)  # noqa: S603
             return cast(dict[str, Any], json.loads(result.stdout))
 
         except FileNotFoundError:
-            cls.logger.exception(f"Failed to extract metadata: ffprobe command not found at {ffdl.ffprobe_path}")
+            cls.logger.exception(
+                f"Failed to extract metadata: ffprobe command not found at {FFmpegInstaller.get_ffprobe_path()}"
+            )
             return {}
 
         except sp.CalledProcessError:
@@ -53,7 +66,8 @@ class FFmpegHelper:
     @classmethod
     def get_tags(cls, filepath: Path) -> dict[str, str]:
         """
-        Return tags as a dict using ffprobe, or None on error.
+        Return tags as a dict, or None on error.
+        MP4 files are read in-process, ffprobe is used for other containers (or as a fallback).
 
         Args:
             filepath: Path to video file
@@ -63,6 +77,12 @@ class FFmpegHelper:
         """
         cls.logger.debug(f"Extracting tags from {filepath}")
 
+        if filepath.suffix.lower() in MP4_EXTS and filepath.is_file():
+            try:
+                return MP4TagReader.read_tags(filepath)
+            except (MP4Error, OSError):
+                cls.logger.debug(f"Failed to read MP4 tags from {filepath}, falling back to ffprobe", exc_info=True)
+
         metadata = cls.get_metadata(filepath)
 
         format: dict[str, Any] = metadata.get("format", {})  # noqa: A001
@@ -70,13 +90,133 @@ class FFmpegHelper:
         return tags
 
     @classmethod
-    def add_metadata(cls, filepath: Path, entries: dict[str, str]) -> None:
+    def add_metadata_in_place(cls, filepath: Path, entries: dict[str, str], cover: Path | None = None) -> bool:
         """
-        Add metadata to a video file with ffmpeg
+        Add metadata to an MP4 file in place, without copying the media data
 
         Args:
             filepath: Path to video file
             entries: Metadata entries to add
+            cover: Path to a JPEG or PNG image embedded as cover art (optional)
+
+        Returns:
+            True if the metadata was written, False if the file has to be rewritten with ffmpeg
+        """
+        if filepath.suffix.lower() not in MP4_EXTS:
+            return False
+
+        if cover and cover.suffix.lower() not in COVER_EXTS:
+            return False
+
+        try:
+            MP4TagWriter.write_tags(filepath, entries, cover=cover.read_bytes() if cover else None)
+        except (MP4Error, OSError, ValueError):
+            cls.logger.debug(f"Failed to write MP4 tags to {filepath}, falling back to ffmpeg", exc_info=True)
+            return False
+
+        return True
+
+    @classmethod
+    def build_metadata_command(
+        cls, filepath: Path, output_filepath: Path, entries: dict[str, str], cover: Path | None = None
+    ) -> list[str]:
+        """
+        Build the ffmpeg command adding metadata to a video file
+
+        Args:
+            filepath: Path to video file
+            output_filepath: Path where the updated video file is written
+            entries: Metadata entries to add
+            cover: Path to an image embedded as cover art (optional)
+
+        Returns:
+            The ffmpeg command
+        """
+        command = [
+            FFmpegInstaller.get_ffmpeg_path(),
+            "-v",
+            "error",
+            "-y",  # Overwrite output files without asking
+            "-i",
+            str(filepath),
+        ]
+
+        if cover and filepath.suffix.lower() in NO_COVER_EXTS:
+            cls.logger.debug(f"Cover art can not be embedded in {filepath.suffix} files, skipping it")
+            cover = None
+
+        # Embed the cover art while rewriting the file, replacing any existing one
+        if cover:
+            cls.logger.debug(f"Adding cover art: {cover}")
+            command.extend(["-i", str(cover), "-map", "0", "-map", "-0:v?", "-map", "1:0"])
+            command.extend(["-disposition:v:0", "attached_pic"])
+
+        # Add all metadata options
+        for key, value in entries.items():
+            cls.logger.debug(f"Adding metadata: {key} = {value}")
+            metadata_options = ["-metadata", f"{key}={value}"]
+            command.extend(metadata_options)
+
+        # ID3v2.3 is the version best supported by players
+        if filepath.suffix.lower() == ".mp3":
+            command.extend(["-id3v2_version", "3"])
+
+        # Add copy codec and the output file path
+        # -c copy avoids re-encoding, making the process fast
+        command.extend(["-c", "copy", str(output_filepath)])
+        return command
+
+    @classmethod
+    def resize_image(cls, source: Path, output: Path, size: int | None, square: bool, quality: int) -> bool:
+        """
+        Convert an image to JPEG, optionally cropped to a square (centered) and downsized
+
+        Args:
+            source: Path of the image
+            output: Path of the JPEG image to write
+            size: Maximum width/height in pixels (images are never upscaled), None to keep the size
+            square: Whether to crop the image to a square
+            quality: JPEG quality scale of FFmpeg, from 2 (best) to 31
+
+        Returns:
+            True if the image was written, False otherwise
+        """
+        filters = []
+        if square:
+            filters.append("crop=min(iw\\,ih):min(iw\\,ih)")
+        if size:
+            filters.append(f"scale=min({size}\\,iw):min({size}\\,ih):force_original_aspect_ratio=decrease")
+
+        command = [FFmpegInstaller.get_ffmpeg_path(), "-v", "error", "-y", "-i", str(source)]
+        if filters:
+            command.extend(["-vf", ",".join(filters)])
+        command.extend(["-frames:v", "1", "-q:v", str(quality), str(output)])
+
+        try:
+            cls.logger.debug(f"Running FFmpeg: {' '.join(command)}")
+            sp.run(command, capture_output=True, check=True)  # noqa: S603
+        except FileNotFoundError:
+            cls.logger.warning(
+                f"Failed to resize image: ffmpeg command not found at {FFmpegInstaller.get_ffmpeg_path()}"
+            )
+            return False
+        except sp.CalledProcessError as e:
+            cls.logger.warning(f"Failed to resize image {source}: {e.stderr.decode().strip()}")
+            return False
+
+        return output.is_file()
+
+    @classmethod
+    def add_metadata(cls, filepath: Path, entries: dict[str, str], cover: Path | None = None) -> None:
+        """
+        Add metadata to a video file.
+        MP4 files are updated in place without copying the media data,
+        ffmpeg is used for other containers (or as a fallback).
+
+        Args:
+            filepath: Path to video file
+            entries: Metadata entries to add
+            cover: Path to an image embedded as cover art in the same pass (optional)
         """
         cls.logger.info(f"Adding metadata to {filepath}")
 
@@ -88,36 +228,23 @@ class FFmpegHelper:
             cls.logger.error(f"Failed to add metadata: {filepath} is not a video file")
             return None
 
+        if cls.add_metadata_in_place(filepath, entries, cover):
+            return None
+
         original_filepath = filepath
 
         # 1. Create a temporary output file path
-        # Use a temp directory in the same parent directory as the file for same-disk operation
-        temp_dir = filepath.parent / "temp"
-        temp_dir.mkdir(exist_ok=True)
-        with tempfile.NamedTemporaryFile(delete=False, dir=temp_dir, suffix=filepath.suffix) as tmp:
+        # Next to the file for same-disk operation, with a name of its own so that files of a directory
+        # can be edited in parallel (hidden, so that it is skipped by library walks)
+        with tempfile.NamedTemporaryFile(
+            delete=False, dir=filepath.parent, prefix=f".{filepath.stem}.", suffix=filepath.suffix
+        ) as tmp:
             temp_filepath = Path(tmp.name)
 
             cls.logger.debug(f"Using temp file: {temp_filepath}")
 
             # 2. Preparing the ffmpeg command
-            command = [
-                ffdl.ffmpeg_path,
-                "-v",
-                "error",
-                "-y",  # Overwrite output files without asking
-                "-i",
-                str(filepath),
-            ]
-
-            # Add all metadata options
-            for key, value in entries.items():
-                cls.logger.debug(f"Adding metadata: {key} = {value}")
-                metadata_options = ["-metadata", f"{key}={value}"]
-                command.extend(metadata_options)
-
-            # Add copy codec and the temporary output file path
-            # -c copy avoids re-encoding, making the process fast
-            command.extend(["-c", "copy", str(temp_filepath)])
+            command = cls.build_metadata_command(filepath, temp_filepath, entries, cover)
 
             # 3. Executing the ffmpeg command
             try:
@@ -129,7 +256,9 @@ class FFmpegHelper:
                 temp_filepath.replace(original_filepath)
 
             except FileNotFoundError:
-                cls.logger.exception(f"Failed to add metadata: ffmpeg command not found at {ffdl.ffmpeg_path}")
+                cls.logger.exception(
+                    f"Failed to add metadata: ffmpeg command not found at {FFmpegInstaller.get_ffmpeg_path()}"
+                )
 
             except sp.CalledProcessError:
                 cls.logger.exception("Failed to add metadata: ffmpeg command error")
@@ -144,7 +273,3 @@ class FFmpegHelper:
                 if temp_filepath.exists():
                     cls.logger.debug(f"Cleaning up un-renamed temp file: {temp_filepath}")
                     temp_filepath.unlink()
-
-                # 6. Remove tempdir
-                if temp_dir.is_dir():
-                    temp_dir.rmdir()
@@ -1,20 +1,56 @@
+import json
+import os
 import subprocess
+import threading
+from pathlib import Path
+from typing import ClassVar
 
-import ffmpeg_downloader as ffdl
-
+from yt2navidrome.config import CACHE_DIR, FFMPEG_CACHE_FILENAME
 from yt2navidrome.utils.logging import get_logger
 
 
 class FFmpegInstaller:
     logger = get_logger(__name__)
 
+    # Paths of the ffmpeg and ffprobe binaries, once checked
+    _paths: ClassVar[tuple[str, str] | None] = None
+    # Result of the check (None until checked), guarded by a lock since workers check FFmpeg lazily
+    _installed: ClassVar[bool | None] = None
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+
     @classmethod
     def ensure_ffmpeg_installed(cls) -> bool:
-        """Determines the OS and ensures FFmpeg is installed."""
+        """
+        Determines the OS and ensures FFmpeg is installed.
+        The result is cached (in memory and on disk) so that ffmpeg_downloader is only loaded when needed.
+        Thread-safe: concurrent callers wait for a single check (and installation).
+        """
+        if cls._paths:
+            return True
+
+        with cls._lock:
+            if cls._paths:
+                return True
+            if cls._installed is None:
+                cls._installed = cls._check_or_install()
+            return cls._installed
+
+    @classmethod
+    def _check_or_install(cls) -> bool:
+        """Look for FFmpeg (in the cache then with ffmpeg_downloader), installing it if missing"""
+        cls._paths = cls._read_cache()
+        if cls._paths:
+            cls.logger.debug(f"FFmpeg found at {cls._paths[0]} (cached)")
+            return True
+
         cls.logger.debug("Checking if FFmpeg is installed")
 
+        # Loading ffmpeg_downloader is slow, it is only done when the cache is missing or outdated
+        import ffmpeg_downloader as ffdl
+
         if ffdl.installed():
             cls.logger.debug(f"FFmpeg already installed at {ffdl.ffmpeg_path}")
+            cls._write_cache(ffdl.ffmpeg_path, ffdl.ffprobe_path)
             return True
 
         # FFmpeg is not installed, proceed with OS-specific installation
@@ -27,4 +63,42 @@ class FFmpegInstaller:
             return False
 
         cls.logger.debug(f"FFmpeg is now installed at {ffdl.ffmpeg_path}")
+        cls._write_cache(ffdl.ffmpeg_path, ffdl.ffprobe_path)
         return True
+
+    @classmethod
+    def get_ffmpeg_path(cls) -> str:
+        """Return the path of the ffmpeg binary (falling back to the one in PATH)"""
+        cls.ensure_ffmpeg_installed()
+        return cls._paths[0] if cls._paths else "ffmpeg"
+
+    @classmethod
+    def get_ffprobe_path(cls) -> str:
+        """Return the path of the ffprobe binary (falling back to the one in PATH)"""
+        cls.ensure_ffmpeg_installed()
+        return cls._paths[1] if cls._paths else "ffprobe"
+
+    @classmethod
+    def _read_cache(cls) -> tuple[str, str] | None:
+        """Return the cached binary paths, if they still exist"""
+        try:
+            with open(Path(CACHE_DIR) / FFMPEG_CACHE_FILENAME, encoding="utf-8") as f:
+                data: dict[str, str] = json.load(f)
+            paths = (data["ffmpeg_path"], data["ffprobe_path"])
+        except (OSError, ValueError, KeyError, TypeError):
+            return None
+
+        return paths if all(os.path.isfile(path) for path in paths) else None
+
+    @classmethod
+    def _write_cache(cls, ffmpeg_path: str | None, ffprobe_path: str | None) -> None:
+        if not (ffmpeg_path and ffprobe_path):
+            return
+
+        cls._paths = (ffmpeg_path, ffprobe_path)
+        try:
+            cache_path = Path(CACHE_DIR) / FFMPEG_CACHE_FILENAME
+            cache_path.parent.mkdir(parents=True, exist_ok=True)
+            cache_path.write_text(json.dumps({"ffmpeg_path": ffmpeg_path, "ffprobe_path": ffprobe_path}))
+        except OSError:
+            cls.logger.debug("Failed to cache FFmpeg location", exc_info=True)
@@ -0,0 +1,105 @@
+import subprocess as sp
+import threading
+import time
+from concurrent.futures import Future, ThreadPoolExecutor
+from pathlib import Path
+from typing import ClassVar
+
+from yt2navidrome.config import TRANSCODE_WORKERS
+from yt2navidrome.utils.ffmpeg.installer import FFmpegInstaller
+from yt2navidrome.utils.logging import get_logger
+from yt2navidrome.utils.metrics import Metrics
+
+
+def run_transcode(command: list[str]) -> float:
+    """
+    Run an ffmpeg transcode (in a worker thread of the transcoding pool).
+
+    Args:
+        command: The ffmpeg command
+
+    Returns:
+        The number of seconds the transcode took
+
+    Raises:
+        CalledProcessError: If ffmpeg failed
+    """
+    start = time.perf_counter()
+    sp.run(command, capture_output=True, check=True)  # noqa: S603
+    return time.perf_counter() - start
+
+
+class FFmpegTranscoder:
+    """
+    Converts downloaded files with ffmpeg subprocesses, at most one per available core.
+
+    Transcodes are CPU bound in ffmpeg, not in Python: worker threads (which only wait for their
+    subprocess) are enough to bound them, and running them outside of the download workers lets
+    these go on with the next downloads while files are being encoded.
+    """
+
+    logger = get_logger(__name__)
+
+    _executor: ClassVar[ThreadPoolExecutor | None] = None
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+
+    @classmethod
+    def build_command(cls, source: Path, output: Path, codec: str, bitrate: str | None = None) -> list[str]:
+        """
+        Build the ffmpeg command converting the audio of a file
+
+        Args:
+            source: Path of the downloaded file
+            output: Path of the converted file (its extension selects the container)
+            codec: FFmpeg audio encoder ("copy" to remux the stream without re-encoding)
+            bitrate: Target bitrate of the encoder (optional)
+
+        Returns:
+            The ffmpeg command
+        """
+        command = [FFmpegInstaller.get_ffmpeg_path(), "-v", "error", "-y", "-i", str(source), "-vn", "-c:a", codec]
+        if bitrate and codec != "copy":
+            command.extend(["-b:a", bitrate])
+        command.append(str(output))
+        return command
+
+    @classmethod
+    def get_executor(cls) -> ThreadPoolExecutor:
+        """Return the transcoding pool, starting it on first use"""
+        with cls._lock:
+            if cls._executor is None:
+                cls.logger.debug(f"Starting transcoding pool with {TRANSCODE_WORKERS} workers")
+                cls._executor = ThreadPoolExecutor(max_workers=TRANSCODE_WORKERS, thread_name_prefix="transcode")
+            return cls._executor
+
+    @classmethod
+    def submit(cls, source: Path, output: Path, codec: str, bitrate: str | None = None) -> "Future[float]":
+        """
+        Convert the audio of a file in the transcoding pool.
+
+        Args:
+            source: Path of the downloaded file
+            output: Path of the converted file (its extension selects the container)
+            codec: FFmpeg audio encoder ("copy" to remux the stream without re-encoding)
+            bitrate: Target bitrate of the encoder (optional)
+
+        Returns:
+            A future resolved with the number of seconds the transcode took
+        """
+        cls.logger.info(f"Converting {source.name} to {output.suffix[1:]} ({codec})")
+        future = cls.get_executor().submit(run_transcode, cls.build_command(source, output, codec, bitrate))
+
+        def record(future: "Future[float]") -> None:
+            if not future.cancelled() and future.exception() is None:
+                Metrics.record("transcode", future.result())
+
+        future.add_done_callback(record)
+        return future
+
+    @classmethod
+    def shutdown(cls) -> None:
+        """Stop the transcoding pool (waiting for running transcodes)"""
+        with cls._lock:
+            executor, cls._executor = cls._executor, None
+        if executor:
+            executor.shutdown()
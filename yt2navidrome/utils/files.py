@@ -0,0 +1,119 @@
+import os
+import threading
+from abc import ABC, abstractmethod
+from pathlib import Path
+from typing import Any, ClassVar, Generic, TypeVar
+
+from yt2navidrome.utils.logging import get_logger
+
+T = TypeVar("T")
+C = TypeVar("C", bound="StatCache[Any]")
+
+# Cached value of a file, along with the mtime (in ns) and size of the file when it was cached
+StatCacheEntry = tuple[int, int, T]
+
+
+def write_atomic(path: Path, content: str | bytes) -> None:
+    """
+    Write a file atomically: readers see either the previous content or the new one, never a partial file.
+
+    Args:
+        path: The file to write (its parent directories are created if needed)
+        content: The content of the file (text is encoded in UTF-8)
+    """
+    path.parent.mkdir(parents=True, exist_ok=True)
+    # Hidden, so that it is skipped by library scans, and unique per thread, so that concurrent writers do not clash
+    temp_path = path.with_name(f".{path.name}.{os.getpid()}.{threading.get_ident()}.tmp")
+    try:
+        if isinstance(content, str):
+            temp_path.write_text(content, encoding="utf-8")
+        else:
+            temp_path.write_bytes(content)
+        os.replace(temp_path, path)
+    finally:
+        temp_path.unlink(missing_ok=True)
+
+
+class StatCache(ABC, Generic[T]):
+    """
+    Values computed from the files of a directory (e.g. parsed templates or tags), keyed by file and invalidated
+    when the mtime or the size of the file changes.
+
+    Subclasses define where the cache is stored and how it is serialized. The cache is replaced atomically
+    when saved, and only if it was modified.
+    """
+
+    logger = get_logger(__name__)
+    # Name of the cache in logs
+    description: ClassVar[str] = "cache"
+
+    def __init__(self, directory: Path, entries: dict[str, StatCacheEntry[T]] | None = None) -> None:
+        self.directory = directory
+        self.entries = entries or {}
+        self._modified = False
+
+    @classmethod
+    @abstractmethod
+    def get_path(cls, directory: Path) -> Path:
+        """Return the path of the cache of a directory"""
+
+    @classmethod
+    @abstractmethod
+    def decode(cls, content: bytes) -> dict[str, StatCacheEntry[T]]:
+        """Return the entries of a saved cache (empty if saved by another version), raise if it is invalid"""
+
+    @abstractmethod
+    def encode(self) -> bytes:
+        """Return the saved content of the cache"""
+
+    @classmethod
+    def load(cls: type[C], directory: Path) -> C:
+        """
+        Load the cache of a directory.
+
+        Args:
+            directory: The directory whose files are cached
+
+        Returns:
+            The cache (empty if there is none or if it can not be read)
+        """
+        path = cls.get_path(directory)
+        try:
+            entries = cls.decode(path.read_bytes())
+        except FileNotFoundError:
+            return cls(directory)
+        except Exception:
+            cls.logger.warning(f"Ignoring invalid {cls.description} {path}", exc_info=True)
+            return cls(directory)
+
+        return cls(directory, entries)
+
+    def get(self, key: str, stat: os.stat_result) -> T | None:
+        """Return the cached value of a file (or None if the file changed since it was cached)"""
+        entry = self.entries.get(key)
+        if entry and entry[0] == stat.st_mtime_ns and entry[1] == stat.st_size:
+            return entry[2]
+        return None
+
+    def put(self, key: str, stat: os.stat_result, value: T) -> None:
+        """Cache the value of a file"""
+        self.entries[key] = (stat.st_mtime_ns, stat.st_size, value)
+        self._modified = True
+
+    def discard(self, keys: set[str]) -> None:
+        """Remove the files which are not among the given ones (e.g. deleted or now invalid)"""
+        for key in self.entries.keys() - keys:
+            del self.entries[key]
+            self._modified = True
+
+    def save(self) -> None:
+        """Save the cache, replacing the previous one atomically (nothing is written if unchanged)"""
+        if not self._modified:
+            return
+
+        path = self.get_path(self.directory)
+        try:
+            write_atomic(path, self.encode())
+            self._modified = False
+        except Exception:
+            self.logger.warning(f"Failed to save {self.description} {path}", exc_info=True)
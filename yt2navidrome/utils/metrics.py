@@ -0,0 +1,179 @@
+import json
+import threading
+import time
+from collections.abc import Iterator
+from contextlib import contextmanager
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any, ClassVar
+
+from yt2navidrome.config import METRICS_PREFIX
+from yt2navidrome.utils.files import write_atomic
+from yt2navidrome.utils.logging import get_logger
+
+
+@dataclass
+class StageTimer:
+    """Accumulated timings of a stage"""
+
+    count: int = 0
+    total: float = 0.0
+    max: float = 0.0
+
+    def add(self, seconds: float) -> None:
+        self.count += 1
+        self.total += seconds
+        self.max = max(self.max, seconds)
+
+    def to_dict(self) -> dict[str, float]:
+        return {
+            "count": self.count,
+            "total": round(self.total, 6),
+            "mean": round(self.total / self.count, 6) if self.count else 0.0,
+            "max": round(self.max, 6),
+        }
+
+
+class Metrics:
+    """
+    Stage timers and counters of the download pipeline, shared by all threads of the process.
+
+    Metrics accumulate until reset, so that a long-running process (see serve) exports totals
+    over its whole lifetime, as expected from Prometheus counters.
+    """
+
+    logger = get_logger(__name__)
+
+    _lock: ClassVar[threading.Lock] = threading.Lock()
+    _timers: ClassVar[dict[str, StageTimer]] = {}
+    _counters: ClassVar[dict[str, float]] = {}
+    _started_at: ClassVar[float] = time.time()
+    # Start time of the yt-dlp postprocessors running in each thread
+    _postprocessor_starts: ClassVar[threading.local] = threading.local()
+
+    @classmethod
+    def reset(cls) -> None:
+        """Clear all metrics and restart the run clock"""
+        with cls._lock:
+            cls._timers.clear()
+            cls._counters.clear()
+            cls._started_at = time.time()
+
+    @classmethod
+    def record(cls, stage: str, seconds: float) -> None:
+        """
+        Record the duration of a stage.
+
+        Args:
+            stage: Name of the stage (e.g. download)
+            seconds: Time spent in the stage
+        """
+        with cls._lock:
+            cls._timers.setdefault(stage, StageTimer()).add(seconds)
+
+    @classmethod
+    @contextmanager
+    def timer(cls, stage: str) -> Iterator[None]:
+        """Time the enclosed block as a stage (recorded even if it raises)"""
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            cls.record(stage, time.perf_counter() - start)
+
+    @classmethod
+    def increment(cls, counter: str, value: float = 1) -> None:
+        """
+        Increment a counter.
+
+        Args:
+            counter: Name of the counter (e.g. bytes_downloaded)
+            value: Amount to add
+        """
+        with cls._lock:
+            cls._counters[counter] = cls._counters.get(counter, 0) + value
+
+    @classmethod
+    def postprocessor_hook(cls, status: dict[str, Any]) -> None:
+        """yt-dlp postprocessor hook timing each postprocessor as a stage (e.g. postprocessor.EmbedThumbnail)"""
+        name = status.get("postprocessor", "unknown")
+        starts: dict[str, float] = cls._postprocessor_starts.__dict__.setdefault("starts", {})
+
+        if status.get("status") == "started":
+            starts[name] = time.perf_counter()
+        elif status.get("status") == "finished" and name in starts:
+            cls.record(f"postprocessor.{name}", time.perf_counter() - starts.pop(name))
+
+    @classmethod
+    def summary(cls) -> dict[str, Any]:
+        """Return a JSON-serializable summary of the metrics"""
+        with cls._lock:
+            return {
+                "started_at": cls._started_at,
+                "duration": round(time.time() - cls._started_at, 6),
+                "stages": {stage: timer.to_dict() for stage, timer in sorted(cls._timers.items())},
+                "counters": dict(sorted(cls._counters.items())),
+            }
+
+    @classmethod
+    def format_prometheus(cls) -> str:
+        """Return the metrics in the Prometheus text exposition format"""
+        summary = cls.summary()
+        lines = [
+            f"# HELP {METRICS_PREFIX}_stage_seconds_total Time spent in each stage of the pipeline",
+            f"# TYPE {METRICS_PREFIX}_stage_seconds_total counter",
+            *(
+                f'{METRICS_PREFIX}_stage_seconds_total{{stage="{stage}"}} {timer["total"]}'
+                for stage, timer in summary["stages"].items()
+            ),
+            f"# HELP {METRICS_PREFIX}_stage_calls_total Number of times each stage ran",
+            f"# TYPE {METRICS_PREFIX}_stage_calls_total counter",
+            *(
+                f'{METRICS_PREFIX}_stage_calls_total{{stage="{stage}"}} {timer["count"]}'
+                for stage, timer in summary["stages"].items()
+            ),
+            f"# HELP {METRICS_PREFIX}_stage_max_seconds Longest run of each stage",
+            f"# TYPE {METRICS_PREFIX}_stage_max_seconds gauge",
+            *(
+                f'{METRICS_PREFIX}_stage_max_seconds{{stage="{stage}"}} {timer["max"]}'
+                for stage, timer in summary["stages"].items()
+            ),
+        ]
+
+        for counter, value in summary["counters"].items():
+            lines.append(f"# TYPE {METRICS_PREFIX}_{counter}_total counter")
+            lines.append(f"{METRICS_PREFIX}_{counter}_total {value:g}")
+
+        lines.extend([
+            f"# TYPE {METRICS_PREFIX}_run_duration_seconds gauge",
+            f"{METRICS_PREFIX}_run_duration_seconds {summary['duration']}",
+            f"# TYPE {METRICS_PREFIX}_last_export_timestamp_seconds gauge",
+            f"{METRICS_PREFIX}_last_export_timestamp_seconds {time.time():.3f}",
+        ])
+        return "\n".join(lines) + "\n"
+
+    @classmethod
+    def write_json(cls, path: Path) -> None:
+        """Write the JSON summary of the metrics to a file"""
+        write_atomic(path, json.dumps(cls.summary(), indent=2) + "\n")
+        cls.logger.debug(f"Metrics written to {path}")
+
+    @classmethod
+    def write_prometheus(cls, path: Path) -> None:
+        """Write the metrics to a file read by the textfile collector of the Prometheus node exporter"""
+        # Scrapers must never see a partially written file
+        write_atomic(path, cls.format_prometheus())
+        cls.logger.debug(f"Prometheus metrics written to {path}")
+
+    @classmethod
+    def log_summary(cls) -> None:
+        """Log the time spent in each stage and the counters"""
+        summary = cls.summary()
+        cls.logger.info(f"Run metrics ({summary['duration']:.1f}s):")
+        for stage, timer in summary["stages"].items():
+            cls.logger.info(
+                f"  {stage}: {timer['total']:.2f}s in {timer['count']} calls "
+                f"(mean {timer['mean']:.2f}s, max {timer['max']:.2f}s)"
+            )
+        for counter, value in summary["counters"].items():
+            cls.logger.info(f"  {counter}: {value:g}")
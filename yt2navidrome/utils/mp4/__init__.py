@@ -0,0 +1,5 @@
+from .atoms import MP4Error
+from .reader import MP4_EXTS, MP4TagReader
+from .writer import MP4TagWriter
+
+__all__ = ["MP4_EXTS", "MP4Error", "MP4TagReader", "MP4TagWriter"]
@@ -0,0 +1,183 @@
+import struct
+from collections.abc import Iterator
+from dataclasses import dataclass
+from typing import BinaryIO
+
+
+class MP4Error(Exception):
+    """Raised when a file is not a valid MP4 file or has an unsupported layout"""
+
+
+class InvalidAtomError(MP4Error):
+    """Raised when an atom header is truncated or has an invalid size"""
+
+    def __init__(self, offset: int, size: int | None = None) -> None:
+        reason = "Truncated atom header" if size is None else f"Invalid atom size {size}"
+        super().__init__(f"{reason} at offset {offset}")
+
+
+class MissingAtomError(MP4Error):
+    """Raised when a required atom is missing"""
+
+    def __init__(self, atom_type: str) -> None:
+        super().__init__(f"Not an MP4 file, no {atom_type} atom found")
+
+
+class UnsupportedLayoutError(MP4Error):
+    """Raised when the layout of a file does not allow an in-place update (e.g. fragmented MP4 files)"""
+
+    def __init__(self) -> None:
+        super().__init__("Unsupported MP4 layout for an in-place update")
+
+
+class UnsupportedMetadataError(MP4Error):
+    """Raised when the metadata is not stored as iTunes items (e.g. QuickTime metadata keys)"""
+
+    def __init__(self) -> None:
+        super().__init__("Unsupported MP4 metadata, QuickTime metadata keys are not read in-process")
+
+
+@dataclass
+class Atom:
+    """Represents an atom (a.k.a box) of an MP4 file"""
+
+    type: str
+    offset: int
+    size: int
+    header_size: int
+
+    @property
+    def data_offset(self) -> int:
+        return self.offset + self.header_size
+
+    @property
+    def end(self) -> int:
+        return self.offset + self.size
+
+
+def encode_atom_type(atom_type: str) -> bytes:
+    """Encode an atom type (e.g. '©nam') to its 4 bytes representation"""
+    return atom_type.encode("latin-1")
+
+
+def build_atom(atom_type: str, payload: bytes) -> bytes:
+    """Build an atom with a 32 bits size header"""
+    return struct.pack(">I", 8 + len(payload)) + encode_atom_type(atom_type) + payload
+
+
+def split_atoms(payload: bytes) -> list[tuple[str, bytes]]:
+    """Split an in-memory payload into the atoms it contains (type, raw bytes including the header)"""
+    atoms: list[tuple[str, bytes]] = []
+    offset = 0
+    while offset + 8 <= len(payload):
+        size, raw_type = struct.unpack_from(">I4s", payload, offset)
+        if size == 1 and offset + 16 <= len(payload):
+            size = struct.unpack_from(">Q", payload, offset + 8)[0]
+        elif size == 0:
+            size = len(payload) - offset
+        if size < 8 or offset + size > len(payload):
+            raise InvalidAtomError(offset, size)
+        atoms.append((raw_type.decode("latin-1"), payload[offset : offset + size]))
+        offset += size
+    return atoms
+
+
+def atom_payload(raw: bytes) -> bytes:
+    """Return the content of an in-memory atom, without its header"""
+    size = struct.unpack_from(">I", raw)[0]
+    return raw[16:] if size == 1 else raw[8:]
+
+
+def read_atom_header(f: BinaryIO, offset: int, end: int) -> Atom:
+    """
+    Read the header of the atom starting at offset.
+
+    Args:
+        f: The file to read from
+        offset: Position of the atom in the file
+        end: Position of the end of the parent atom (or of the file)
+
+    Returns:
+        The atom found at offset
+    """
+    f.seek(offset)
+    header = f.read(8)
+    if len(header) < 8:
+        raise InvalidAtomError(offset)
+
+    size, raw_type = struct.unpack(">I4s", header)
+    header_size = 8
+
+    if size == 1:
+        # 64 bits size stored right after the type
+        large_size = f.read(8)
+        if len(large_size) < 8:
+            raise InvalidAtomError(offset)
+        size = struct.unpack(">Q", large_size)[0]
+        header_size = 16
+    elif size == 0:
+        # Atom extends to the end of its parent
+        size = end - offset
+
+    if size < header_size or offset + size > end:
+        raise InvalidAtomError(offset, size)
+
+    return Atom(type=raw_type.decode("latin-1"), offset=offset, size=size, header_size=header_size)
+
+
+def iter_atoms(f: BinaryIO, start: int, end: int) -> Iterator[Atom]:
+    """Iterate over the atoms found between start and end, seeking over their content"""
+    offset = start
+    while offset + 8 <= end:
+        atom = read_atom_header(f, offset, end)
+        yield atom
+        offset = atom.end
+
+
+def children_offset(f: BinaryIO, atom: Atom) -> int:
+    """
+    Return the position of the first child of a container atom.
+
+    The meta atom is a full box (4 bytes of version and flags before its children)
+    in ISO files, but not in QuickTime files.
+    """
+    if atom.type == "meta":
+        f.seek(atom.data_offset)
+        if f.read(4) == b"\x00\x00\x00\x00":
+            return atom.data_offset + 4
+    return atom.data_offset
+
+
+def find_atom(f: BinaryIO, parent: Atom | None, atom_type: str, file_size: int) -> Atom | None:
+    """
+    Find the first child of a given type.
+
+    Args:
+        f: The file to read from
+        parent: The parent atom (or None for top-level atoms)
+        atom_type: The type of the atom to find
+        file_size: Size of the file
+
+    Returns:
+        The atom found (or None)
+    """
+    start, end = (children_offset(f, parent), parent.end) if parent else (0, file_size)
+    return next((atom for atom in iter_atoms(f, start, end) if atom.type == atom_type), None)
+
+
+def find_atom_path(f: BinaryIO, path: list[str], file_size: int) -> list[Atom]:
+    """
+    Follow a path of atoms from the top level (e.g. ['moov', 'udta', 'meta', 'ilst']).
+
+    Returns:
+        The atoms found along the path, stopping at the first missing one
+    """
+    atoms: list[Atom] = []
+    parent: Atom | None = None
+    for atom_type in path:
+        atom = find_atom(f, parent, atom_type, file_size)
+        if atom is None:
+            break
+        atoms.append(atom)
+        parent = atom
+    return atoms
@@ -0,0 +1,209 @@
+import struct
+from dataclasses import dataclass
+
+from yt2navidrome.utils.mp4.atoms import atom_payload, build_atom, split_atoms
+
+# iTunes item atoms and their FFmpeg tag names (as read by ffprobe and written by ffmpeg)
+TEXT_TAGS = {
+    "©nam": "title",
+    "©ART": "artist",
+    "aART": "album_artist",
+    "©alb": "album",
+    "©wrt": "composer",
+    "©day": "date",
+    "©gen": "genre",
+    "©cmt": "comment",
+    "©too": "encoder",
+    "©grp": "grouping",
+    "©lyr": "lyrics",
+    "cprt": "copyright",
+    "desc": "description",
+    "ldes": "synopsis",
+    "tvsh": "show",
+    "tven": "episode_id",
+    "tvnn": "network",
+    "keyw": "keywords",
+    "sonm": "sort_name",
+    "soar": "sort_artist",
+    "soaa": "sort_album_artist",
+    "soal": "sort_album",
+    "soco": "sort_composer",
+    "sosn": "sort_show",
+}
+INTEGER_TAGS = {
+    "cpil": "compilation",
+    "pgap": "gapless_playback",
+    "hdvd": "hd_video",
+    "stik": "media_type",
+    "tvsn": "season_number",
+    "tves": "episode_sort",
+}
+PAIR_TAGS = {"trkn": "track", "disk": "disc"}
+
+# Format of the value of integer items, as written by ffmpeg: a single unsigned byte, preceded by 3 bytes of padding
+# for the items listed here
+INTEGER_FORMATS = {"tvsn": ">3xB", "tves": ">3xB"}
+
+TAG_ATOMS = {tag: atom for atoms in (TEXT_TAGS, INTEGER_TAGS, PAIR_TAGS) for atom, tag in atoms.items()}
+
+FREEFORM_ATOM = "----"
+FREEFORM_MEAN = "com.apple.iTunes"
+COVER_ATOM = "covr"
+
+# Well-known types of the data atoms
+DATA_TYPE_IMPLICIT = 0
+DATA_TYPE_UTF8 = 1
+DATA_TYPE_UTF16 = 2
+DATA_TYPE_JPEG = 13
+DATA_TYPE_PNG = 14
+DATA_TYPE_INTEGER = 21
+
+
+class TagValueOutOfRangeError(ValueError):
+    """Raised when the value of a numeric tag does not fit in its atom"""
+
+    def __init__(self, key: str, value: str) -> None:
+        super().__init__(f"Value of {key} out of range: {value!r}")
+
+
+@dataclass
+class IlstItem:
+    """Represents an item of the ilst atom, keeping its raw bytes so that unknown items are preserved"""
+
+    type: str
+    raw: bytes
+    name: str | None = None  # Name of freeform items
+
+    @property
+    def key(self) -> str | None:
+        """FFmpeg tag name of the item (or None if unknown)"""
+        if self.type == FREEFORM_ATOM:
+            return self.name
+        return TEXT_TAGS.get(self.type) or INTEGER_TAGS.get(self.type) or PAIR_TAGS.get(self.type)
+
+
+def parse_ilst(payload: bytes) -> list[IlstItem]:
+    """
+    Parse the items of an ilst atom.
+
+    Args:
+        payload: The content of the ilst atom (without its header)
+
+    Returns:
+        The items of the ilst atom, in order
+    """
+    items: list[IlstItem] = []
+    for item_type, raw in split_atoms(payload):
+        item = IlstItem(type=item_type, raw=raw)
+
+        if item_type == FREEFORM_ATOM:
+            for child_type, child_raw in split_atoms(atom_payload(raw)):
+                if child_type == "name":
+                    item.name = atom_payload(child_raw)[4:].decode("utf-8", "replace")
+
+        items.append(item)
+    return items
+
+
+def get_item_data(item: IlstItem) -> tuple[int, bytes] | None:
+    """Return the type and value of the first data atom of an item"""
+    for child_type, child_raw in split_atoms(atom_payload(item.raw)):
+        child_payload = atom_payload(child_raw)
+        if child_type == "data" and len(child_payload) >= 8:
+            data_type = struct.unpack_from(">I", child_payload)[0] & 0xFFFFFF
+            return data_type, child_payload[8:]
+    return None
+
+
+def decode_item(item: IlstItem) -> str | None:
+    """
+    Decode the value of an item as ffprobe would.
+
+    Returns:
+        The value as a string (or None if the item is not a tag, e.g. cover art)
+    """
+    if item.key is None:
+        return None
+
+    data = get_item_data(item)
+    if data is None:
+        return None
+    data_type, value = data
+
+    if item.type in PAIR_TAGS:
+        if len(value) < 4:
+            return None
+        number = struct.unpack_from(">H", value, 2)[0]
+        total = struct.unpack_from(">H", value, 4)[0] if len(value) >= 6 else 0
+        return f"{number}/{total}" if total else str(number)
+
+    if item.type in INTEGER_TAGS:
+        # ffprobe reads a single unsigned byte, the last one of 4-byte items (the first ones being padding)
+        index = 3 if item.type in INTEGER_FORMATS else 0
+        return str(value[index]) if len(value) > index else None
+
+    if data_type == DATA_TYPE_INTEGER:
+        return str(int.from_bytes(value, "big", signed=True)) if value else None
+
+    if data_type == DATA_TYPE_UTF16:
+        return value.decode("utf-16-be", "replace")
+
+    return value.decode("utf-8", "replace")
+
+
+def build_data_atom(data_type: int, value: bytes) -> bytes:
+    """Build a data atom (type indicator and locale followed by the value)"""
+    return build_atom("data", struct.pack(">II", data_type, 0) + value)
+
+
+def pack_numbers(key: str, value: str, fmt: str, *numbers: int) -> bytes:
+    """Pack the numbers of a tag, raising ValueError (as int does for invalid numbers) if they are out of range"""
+    try:
+        return struct.pack(fmt, *numbers)
+    except struct.error as e:
+        raise TagValueOutOfRangeError(key, value) from e
+
+
+def encode_item(key: str, value: str) -> IlstItem:
+    """
+    Encode a tag as an ilst item, as ffmpeg would.
+    Tags without a dedicated atom are written as freeform items.
+
+    Args:
+        key: FFmpeg tag name
+        value: Value of the tag
+
+    Returns:
+        The encoded item
+
+    Raises:
+        ValueError: If the value of a numeric tag is not a number or does not fit in its atom
+    """
+    atom_type = TAG_ATOMS.get(key)
+
+    if atom_type in PAIR_TAGS:
+        number, _, total = value.partition("/")
+        payload = pack_numbers(key, value, ">HHHH", 0, int(number or 0), int(total or 0), 0)
+        return IlstItem(type=atom_type, raw=build_atom(atom_type, build_data_atom(DATA_TYPE_IMPLICIT, payload)))
+
+    if atom_type in INTEGER_TAGS:
+        payload = pack_numbers(key, value, INTEGER_FORMATS.get(atom_type, ">B"), int(value))
+        return IlstItem(type=atom_type, raw=build_atom(atom_type, build_data_atom(DATA_TYPE_INTEGER, payload)))
+
+    if atom_type is not None:
+        return IlstItem(
+            type=atom_type, raw=build_atom(atom_type, build_data_atom(DATA_TYPE_UTF8, value.encode("utf-8")))
+        )
+
+    payload = (
+        build_atom("mean", b"\x00\x00\x00\x00" + FREEFORM_MEAN.encode("utf-8"))
+        + build_atom("name", b"\x00\x00\x00\x00" + key.encode("utf-8"))
+        + build_data_atom(DATA_TYPE_UTF8, value.encode("utf-8"))
+    )
+    return IlstItem(type=FREEFORM_ATOM, raw=build_atom(FREEFORM_ATOM, payload), name=key)
+
+
+def encode_cover(image: bytes) -> IlstItem:
+    """Encode a JPEG or PNG image as a cover art item"""
+    data_type = DATA_TYPE_PNG if image.startswith(b"\x89PNG") else DATA_TYPE_JPEG
+    return IlstItem(type=COVER_ATOM, raw=build_atom(COVER_ATOM, build_data_atom(data_type, image)))
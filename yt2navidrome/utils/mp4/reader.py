@@ -0,0 +1,69 @@
+import struct
+from pathlib import Path
+
+from yt2navidrome.utils.logging import get_logger
+from yt2navidrome.utils.mp4.atoms import MissingAtomError, UnsupportedMetadataError, find_atom, find_atom_path
+from yt2navidrome.utils.mp4.ilst import decode_item, parse_ilst
+
+MP4_EXTS = {".m4a", ".mp4", ".m4v"}
+ILST_PATH = ["moov", "udta", "meta", "ilst"]
+
+
+class MP4TagReader:
+    logger = get_logger(__name__)
+
+    @classmethod
+    def read_tags(cls, filepath: Path) -> dict[str, str]:
+        """
+        Read the format tags of an MP4 file in-process, as ffprobe would report them.
+        Only the headers of the atoms are read while seeking to moov/udta/meta/ilst,
+        the media data is never loaded.
+
+        Args:
+            filepath: Path to the MP4 file
+
+        Returns:
+            A dict containing the tags
+
+        Raises:
+            MP4Error: If the file is not a valid MP4 file, or if its tags are not iTunes items
+        """
+        cls.logger.debug(f"Reading MP4 tags from {filepath}")
+
+        tags: dict[str, str] = {}
+
+        with open(filepath, "rb") as f:
+            file_size = f.seek(0, 2)
+
+            # Brands reported by ffprobe along with the tags
+            ftyp = find_atom(f, None, "ftyp", file_size)
+            if ftyp is None:
+                raise MissingAtomError("ftyp")
+
+            f.seek(ftyp.data_offset)
+            ftyp_payload = f.read(ftyp.size - ftyp.header_size)
+            if len(ftyp_payload) >= 8:
+                major_brand, minor_version = struct.unpack_from(">4sI", ftyp_payload)
+                compatible_brands = [ftyp_payload[i : i + 4] for i in range(8, len(ftyp_payload) - 3, 4)]
+                tags["major_brand"] = major_brand.decode("latin-1")
+                tags["minor_version"] = str(minor_version)
+                tags["compatible_brands"] = b"".join(compatible_brands).decode("latin-1")
+
+            # Then the iTunes metadata items
+            atoms = find_atom_path(f, ILST_PATH, file_size)
+            if not atoms or atoms[0].type != "moov":
+                raise MissingAtomError("moov")
+
+            # Items of QuickTime metadata are named by a keys atom, ffprobe has to read them
+            if len(atoms) >= 3 and find_atom(f, atoms[2], "keys", file_size):
+                raise UnsupportedMetadataError()
+
+            if len(atoms) == len(ILST_PATH):
+                ilst = atoms[-1]
+                f.seek(ilst.data_offset)
+                for item in parse_ilst(f.read(ilst.size - ilst.header_size)):
+                    value = decode_item(item)
+                    if item.key and value is not None:
+                        tags.setdefault(item.key, value)
+
+        return tags
@@ -0,0 +1,206 @@
+import os
+import struct
+from pathlib import Path
+from typing import BinaryIO
+
+from yt2navidrome.utils.logging import get_logger
+from yt2navidrome.utils.mp4.atoms import (
+    Atom,
+    InvalidAtomError,
+    MissingAtomError,
+    UnsupportedLayoutError,
+    UnsupportedMetadataError,
+    atom_payload,
+    build_atom,
+    iter_atoms,
+    split_atoms,
+)
+from yt2navidrome.utils.mp4.ilst import COVER_ATOM, IlstItem, encode_cover, encode_item, parse_ilst
+
+# Free space reserved in the moov atom whenever it has to be rewritten, so that next edits fit in place
+DEFAULT_PADDING = 4096
+
+# Handler of the iTunes metadata (meta atom)
+ITUNES_HDLR = build_atom("hdlr", b"\x00" * 8 + b"mdirappl" + b"\x00" * 9)
+
+
+class MP4TagWriter:
+    logger = get_logger(__name__)
+
+    @classmethod
+    def write_tags(cls, filepath: Path, entries: dict[str, str], cover: bytes | None = None) -> None:
+        """
+        Update the tags of an MP4 file in place, without copying the media data.
+
+        Only the moov atom is rewritten:
+        - in place when the new tags fit in the current moov atom and its free space (padding)
+        - at the same position when the moov atom is at the end of the file
+        - otherwise it is moved to the end of the file, the previous one being turned into a free atom
+
+        The media data never moves, so that chunk offsets remain valid.
+
+        Args:
+            filepath: Path to the MP4 file
+            entries: Tags to add or update (an empty value removes the tag)
+            cover: JPEG or PNG image to embed as cover art (optional)
+
+        Raises:
+            MP4Error: If the file is not a valid MP4 file, or if its tags are not iTunes items
+            ValueError: If the value of a numeric tag can not be encoded (nothing is written then)
+        """
+        cls.logger.debug(f"Writing MP4 tags to {filepath}")
+
+        with open(filepath, "r+b") as f:
+            file_size = f.seek(0, 2)
+            top_level_atoms = list(iter_atoms(f, 0, file_size))
+
+            moov_index = next((i for i, atom in enumerate(top_level_atoms) if atom.type == "moov"), None)
+            if moov_index is None:
+                raise MissingAtomError("moov")
+            moov = top_level_atoms[moov_index]
+
+            f.seek(moov.offset)
+            moov_raw = f.read(moov.size)
+            ilst_items = cls._update_items(cls._read_items(moov_raw), entries, cover)
+
+            # Free atoms right after moov can be used to grow it
+            available = moov.size
+            for atom in top_level_atoms[moov_index + 1 :]:
+                if atom.type != "free":
+                    break
+                available += atom.size
+
+            new_moov = cls._build_moov(moov_raw, ilst_items, padding=0)
+            free_space = available - len(new_moov)
+
+            if free_space == 0 or free_space >= 8:
+                # 1. Fits in place, the remaining space is kept as padding
+                cls.logger.debug(f"Rewriting moov in place ({free_space} bytes of padding)")
+                cls._write(f, moov.offset, cls._build_moov(moov_raw, ilst_items, padding=free_space))
+
+            elif moov.offset + available == file_size:
+                # 2. moov is the last atom: it can grow without moving anything else
+                cls.logger.debug("Rewriting moov at the end of the file")
+                new_moov = cls._build_moov(moov_raw, ilst_items, padding=DEFAULT_PADDING)
+                cls._write(f, moov.offset, new_moov)
+                f.truncate(moov.offset + len(new_moov))
+
+            elif any(atom.type == "moof" for atom in top_level_atoms):
+                # Fragmented files require moov to stay before the fragments
+                raise UnsupportedLayoutError()
+
+            else:
+                # 3. Append the new moov, then turn the previous one into a free atom
+                cls.logger.debug("Moving moov to the end of the file")
+                cls._close_last_atom(f, top_level_atoms[-1])
+                cls._write(f, file_size, cls._build_moov(moov_raw, ilst_items, padding=DEFAULT_PADDING))
+                cls._write(f, moov.offset + 4, b"free")
+
+    @classmethod
+    def _write(cls, f: BinaryIO, offset: int, data: bytes) -> None:
+        """Write data at offset and make sure it reached the disk"""
+        f.seek(offset)
+        f.write(data)
+        f.flush()
+        os.fsync(f.fileno())
+
+    @classmethod
+    def _close_last_atom(cls, f: BinaryIO, atom: Atom) -> None:
+        """Give an explicit size to the last atom if it extends to the end of the file (size 0)"""
+        f.seek(atom.offset)
+        if f.read(4) == b"\x00\x00\x00\x00":
+            if atom.size > 0xFFFFFFFF:
+                raise InvalidAtomError(atom.offset, atom.size)
+            cls._write(f, atom.offset, struct.pack(">I", atom.size))
+
+    @classmethod
+    def _find_child(cls, container: bytes, atom_type: str) -> bytes | None:
+        return next((raw for child_type, raw in split_atoms(container) if child_type == atom_type), None)
+
+    @classmethod
+    def _meta_prefix(cls, meta_payload: bytes) -> bytes:
+        """Return the version and flags of the meta atom (ISO full box) or nothing (QuickTime)"""
+        return meta_payload[:4] if meta_payload[:4] == b"\x00\x00\x00\x00" else b""
+
+    @classmethod
+    def _read_items(cls, moov_raw: bytes) -> list[IlstItem]:
+        """Read the ilst items from the moov atom"""
+        udta = cls._find_child(atom_payload(moov_raw), "udta")
+        meta = cls._find_child(atom_payload(udta), "meta") if udta else None
+        if not meta:
+            return []
+
+        meta_payload = atom_payload(meta)
+        meta_children = meta_payload[len(cls._meta_prefix(meta_payload)) :]
+        if cls._find_child(meta_children, "keys"):
+            # Items of QuickTime metadata are named by a keys atom, iTunes items can not be mixed with them
+            raise UnsupportedMetadataError()
+
+        ilst = cls._find_child(meta_children, "ilst")
+        return parse_ilst(atom_payload(ilst)) if ilst else []
+
+    @classmethod
+    def _update_items(cls, items: list[IlstItem], entries: dict[str, str], cover: bytes | None) -> list[IlstItem]:
+        """Apply the new tags to the ilst items, keeping the order and unknown items"""
+        updated: dict[str, IlstItem | None] = {
+            key: encode_item(key, value) if value else None for key, value in entries.items()
+        }
+
+        new_items: list[IlstItem] = []
+        for item in items:
+            if item.key in updated:
+                # Replace the first occurrence of the tag and drop the others
+                new_item = updated.pop(item.key)
+                if new_item:
+                    new_items.append(new_item)
+            elif item.key not in entries and not (cover and item.type == COVER_ATOM):
+                new_items.append(item)
+
+        new_items.extend(item for item in updated.values() if item)
+
+        if cover:
+            new_items.append(encode_cover(cover))
+
+        return new_items
+
+    @classmethod
+    def _build_moov(cls, moov_raw: bytes, items: list[IlstItem], padding: int) -> bytes:
+        """
+        Build a new moov atom holding the given ilst items.
+
+        Args:
+            moov_raw: The current moov atom
+            items: The ilst items
+            padding: Size of the free atom added after ilst (0 for none, at least 8 otherwise)
+
+        Returns:
+            The new moov atom
+        """
+        ilst = build_atom("ilst", b"".join(item.raw for item in items))
+        free = build_atom("free", b"\x00" * (padding - 8)) if padding else b""
+
+        # meta: version/flags, handler then ilst and the padding. Previous padding is dropped.
+        udta = cls._find_child(atom_payload(moov_raw), "udta")
+        meta = cls._find_child(atom_payload(udta), "meta") if udta else None
+
+        if meta:
+            meta_payload = atom_payload(meta)
+            prefix = cls._meta_prefix(meta_payload)
+            meta_children = [
+                raw for atom_type, raw in split_atoms(meta_payload[len(prefix) :]) if atom_type not in ("ilst", "free")
+            ]
+        else:
+            prefix = b"\x00\x00\x00\x00"
+            meta_children = [ITUNES_HDLR]
+
+        new_meta = build_atom("meta", prefix + b"".join(meta_children) + ilst + free)
+
+        # udta: replace meta, keeping other children
+        udta_children = (
+            [raw for atom_type, raw in split_atoms(atom_payload(udta)) if atom_type != "meta"] if udta else []
+        )
+        new_udta = build_atom("udta", b"".join(udta_children) + new_meta)
+
+        # moov: replace udta, keeping other children
+        moov_children = [raw for atom_type, raw in split_atoms(atom_payload(moov_raw)) if atom_type != "udta"]
+        return build_atom("moov", b"".join(moov_children) + new_udta)
@@ -0,0 +1,259 @@
+import json
+import random
+import threading
+import time
+from collections.abc import Callable
+from pathlib import Path
+from typing import ClassVar, TypeVar
+from urllib.parse import urlparse
+
+from yt2navidrome.config import (
+    DOWNLOADS_PER_HOST_BURST,
+    DOWNLOADS_PER_HOST_MAX_RATE,
+    DOWNLOADS_PER_HOST_MIN_RATE,
+    DOWNLOADS_PER_HOST_RATE,
+    RATE_DECREASE_COOLDOWN,
+    RATE_DECREASE_FACTOR,
+    RATE_INCREASE,
+    THROTTLING_BACKOFF_BASE,
+    THROTTLING_BACKOFF_MAX,
+    THROTTLING_RETRIES,
+)
+from yt2navidrome.utils.files import write_atomic
+from yt2navidrome.utils.logging import get_logger
+from yt2navidrome.utils.metrics import Metrics
+
+# Hosts served by the same backend share the same bucket
+HOST_ALIASES = {"youtu.be": "youtube.com"}
+
+T = TypeVar("T")
+
+
+class ThrottledError(Exception):
+    """Raised when a host signals that our requests are too frequent (e.g. HTTP 429)"""
+
+
+class TokenBucket:
+    """Thread-safe token bucket"""
+
+    def __init__(self, rate: float, capacity: float) -> None:
+        """
+        Args:
+            rate: Number of tokens added to the bucket per second
+            capacity: Maximum number of tokens in the bucket (i.e. the allowed burst)
+        """
+        self.rate = rate
+        self.capacity = capacity
+        self._tokens = capacity
+        self._last_refill = time.monotonic()
+        self._lock = threading.Lock()
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self._tokens = min(self.capacity, self._tokens + (now - self._last_refill) * self.rate)
+        self._last_refill = now
+
+    def increase_rate(self, increase: float, max_rate: float) -> float:
+        """
+        Add to the rate of the bucket, up to a maximum (concurrent increases all count).
+
+        Args:
+            increase: Tokens per second added to the rate
+            max_rate: Rate the bucket never exceeds
+
+        Returns:
+            The new rate
+        """
+        with self._lock:
+            if self.rate < max_rate:
+                self._refill()
+                self.rate = min(self.rate + increase, max_rate)
+            return self.rate
+
+    def decrease_rate(self, factor: float, min_rate: float) -> float:
+        """
+        Multiply the rate of the bucket, down to a minimum, and empty it so that no burst is allowed until it refills.
+
+        Args:
+            factor: Factor applied to the rate
+            min_rate: Rate the bucket never goes below
+
+        Returns:
+            The new rate
+        """
+        with self._lock:
+            self._refill()
+            self.rate = max(self.rate * factor, min_rate)
+            self._tokens = 0
+            return self.rate
+
+    def acquire(self, tokens: float = 1.0) -> float:
+        """
+        Take tokens from the bucket, blocking until enough of them are available.
+
+        Args:
+            tokens: Number of tokens to take
+
+        Returns:
+            The number of seconds spent waiting
+        """
+        waited = 0.0
+        while True:
+            with self._lock:
+                self._refill()
+                if self._tokens >= tokens:
+                    self._tokens -= tokens
+                    return waited
+                wait_time = (tokens - self._tokens) / self.rate
+
+            time.sleep(wait_time)
+            waited += wait_time
+
+
+class HostRateLimiter:
+    """
+    Rate limits requests with one token bucket per host, shared by all threads of the run.
+
+    The rate of each host adapts to its responses (additive increase, multiplicative decrease):
+    it slowly grows while requests succeed and is halved as soon as the host throttles us.
+    Learned rates can be saved and loaded back by the next runs.
+    """
+
+    logger = get_logger(__name__)
+
+    _buckets: ClassVar[dict[str, TokenBucket]] = {}
+    _buckets_lock: ClassVar[threading.Lock] = threading.Lock()
+    _last_decrease: ClassVar[dict[str, float]] = {}
+    _loaded_rates: ClassVar[dict[str, float]] = {}  # Rates learned by previous runs, used by new buckets
+
+    @staticmethod
+    def get_host(url: str) -> str:
+        """Return the normalized host of a URL (e.g. www.youtube.com -> youtube.com)"""
+        hostname = (urlparse(url).hostname or "").lower()
+        host = ".".join(hostname.split(".")[-2:])
+        return HOST_ALIASES.get(host, host)
+
+    @classmethod
+    def get_bucket(cls, host: str) -> TokenBucket:
+        """Return the token bucket of a host, creating it if needed"""
+        with cls._buckets_lock:
+            if host not in cls._buckets:
+                rate = cls._loaded_rates.get(host, DOWNLOADS_PER_HOST_RATE)
+                cls._buckets[host] = TokenBucket(rate=rate, capacity=DOWNLOADS_PER_HOST_BURST)
+            return cls._buckets[host]
+
+    @classmethod
+    def acquire(cls, url: str) -> None:
+        """
+        Block until a request to the host of the given URL is allowed.
+
+        Args:
+            url: The URL about to be requested
+        """
+        host = cls.get_host(url)
+        waited = cls.get_bucket(host).acquire()
+        Metrics.record("rate_limit_wait", waited)
+        if waited:
+            cls.logger.debug(f"Waited {waited:.1f}s before requesting {host} to avoid rate limits")
+
+    @classmethod
+    def report_success(cls, url: str) -> None:
+        """Increase the rate of the host of a successful request (additive increase)"""
+        cls.get_bucket(cls.get_host(url)).increase_rate(RATE_INCREASE, DOWNLOADS_PER_HOST_MAX_RATE)
+
+    @classmethod
+    def report_throttled(cls, url: str) -> None:
+        """Decrease the rate of the host of a throttled request (multiplicative decrease)"""
+        host = cls.get_host(url)
+        bucket = cls.get_bucket(host)
+
+        # Concurrent requests are usually throttled together: only the first signal counts
+        with cls._buckets_lock:
+            now = time.monotonic()
+            if now - cls._last_decrease.get(host, -RATE_DECREASE_COOLDOWN) < RATE_DECREASE_COOLDOWN:
+                return
+            cls._last_decrease[host] = now
+
+        rate = bucket.decrease_rate(RATE_DECREASE_FACTOR, DOWNLOADS_PER_HOST_MIN_RATE)
+        cls.logger.warning(f"Throttled by {host}. Slowing down to one request every {1 / rate:.0f}s")
+
+    @staticmethod
+    def get_backoff(attempt: int) -> float:
+        """Return the delay before retrying a throttled request (exponential backoff with full jitter)"""
+        return random.uniform(0, min(THROTTLING_BACKOFF_MAX, THROTTLING_BACKOFF_BASE * 2**attempt))  # noqa: S311
+
+    @classmethod
+    def call(cls, url: str, request: Callable[[], T], rate_limited: bool = True) -> T:
+        """
+        Run a request to the host of a URL, retrying with backoff while the host throttles us.
+
+        Args:
+            url: The URL requested
+            request: Function sending the request, raising ThrottledError when throttled
+            rate_limited: Whether the request waits for its turn in the bucket of the host
+
+        Returns:
+            The result of the request
+
+        Raises:
+            ThrottledError: If the request is still throttled after all retries
+        """
+        attempt = 0
+        while True:
+            if rate_limited:
+                cls.acquire(url)
+
+            try:
+                result = request()
+            except ThrottledError:
+                Metrics.increment("throttled_requests")
+                cls.report_throttled(url)
+                if attempt >= THROTTLING_RETRIES:
+                    raise
+
+                backoff = cls.get_backoff(attempt)
+                cls.logger.warning(f"Request to {url} throttled. Retrying in {backoff:.0f}s...")
+                Metrics.increment("request_retries")
+                Metrics.record("throttling_backoff", backoff)
+                time.sleep(backoff)
+                attempt += 1
+            else:
+                # Only rate limited requests drive the rate up (others are not paced by it)
+                if rate_limited:
+                    cls.report_success(url)
+                return result
+
+    @classmethod
+    def load(cls, path: Path) -> None:
+        """
+        Load the rates learned by previous runs (hosts already requested by this run keep their rate).
+
+        Args:
+            path: The file the rates were saved to
+        """
+        try:
+            with open(path, encoding="utf-8") as f:
+                rates: dict[str, float] = json.load(f)
+        except FileNotFoundError:
+            return
+        except (OSError, ValueError):
+            cls.logger.warning(f"Ignoring invalid rate limits file {path}", exc_info=True)
+            return
+
+        with cls._buckets_lock:
+            for host, rate in rates.items():
+                if isinstance(rate, int | float) and rate > 0:
+                    cls._loaded_rates[host] = min(max(rate, DOWNLOADS_PER_HOST_MIN_RATE), DOWNLOADS_PER_HOST_MAX_RATE)
+
+    @classmethod
+    def save(cls, path: Path) -> None:
+        """
+        Save the learned rates, so that the next runs start from them.
+
+        Args:
+            path: The file to save the rates to
+        """
+        with cls._buckets_lock:
+            rates = {**cls._loaded_rates, **{host: bucket.rate for host, bucket in cls._buckets.items()}}
+
+        write_atomic(path, json.dumps(rates, indent=1))
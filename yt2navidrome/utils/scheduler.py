@@ -0,0 +1,86 @@
+import heapq
+import random
+import time
+from collections.abc import Hashable
+from typing import Generic, TypeVar
+
+K = TypeVar("K", bound=Hashable)
+
+
+class JitterScheduler(Generic[K]):
+    """
+    Priority queue of recurring jobs, each with its own interval.
+
+    Every due time is randomly shifted by a fraction of the interval (the jitter),
+    so that jobs sharing the same interval drift apart instead of running in bursts.
+    """
+
+    def __init__(self, jitter: float = 0.1) -> None:
+        """
+        Args:
+            jitter: Maximum shift of due times, as a fraction of the interval (e.g. 0.1 for +/- 10%)
+        """
+        self.jitter = jitter
+        self._heap: list[tuple[float, int, K]] = []
+        self._current: dict[K, int] = {}  # Sequence number of the live entry of each job (others are stale)
+        self._sequence = 0
+
+    def __len__(self) -> int:
+        return len(self._current)
+
+    def __contains__(self, key: K) -> bool:
+        return key in self._current
+
+    def jittered(self, interval: float) -> float:
+        """Return the interval randomly shifted by the jitter"""
+        return interval * random.uniform(1 - self.jitter, 1 + self.jitter)  # noqa: S311
+
+    def schedule(self, key: K, delay: float) -> None:
+        """
+        Schedule (or reschedule) a job.
+
+        Args:
+            key: The job
+            delay: Seconds before the job is due (not jittered)
+        """
+        self._sequence += 1
+        self._current[key] = self._sequence
+        heapq.heappush(self._heap, (time.monotonic() + delay, self._sequence, key))
+
+    def schedule_next(self, key: K, interval: float) -> None:
+        """Schedule the next run of a recurring job, one jittered interval from now"""
+        self.schedule(key, self.jittered(interval))
+
+    def cancel(self, key: K) -> None:
+        """Cancel a job (its heap entry is dropped lazily)"""
+        self._current.pop(key, None)
+
+    def _drop_stale(self) -> None:
+        while self._heap and self._current.get(self._heap[0][2]) != self._heap[0][1]:
+            heapq.heappop(self._heap)
+
+    def next_delay(self) -> float | None:
+        """Return the seconds before the next job is due (or None if there is no job)"""
+        self._drop_stale()
+        if not self._heap:
+            return None
+        return max(0.0, self._heap[0][0] - time.monotonic())
+
+    def pop_due(self) -> list[K]:
+        """
+        Remove the jobs that are due from the queue.
+
+        Returns:
+            The due jobs, earliest first
+        """
+        due: list[K] = []
+        now = time.monotonic()
+
+        self._drop_stale()
+        while self._heap and self._heap[0][0] <= now:
+            _, _, key = heapq.heappop(self._heap)
+            del self._current[key]
+            due.append(key)
+            self._drop_stale()
+
+        return due